@@ -0,0 +1,37 @@
+from apple_health.export_xml import find_export_xml, read_export_xml
+from apple_health.ingest import read_csv_members, read_metric_csv
+from apple_health.cache import content_key, load_frame, load_index, store_frame, store_index
+from apple_health.compact import compact_frame, frame_nbytes
+from apple_health.normalize import (
+    DAY_NAMES, GROUP_KEYS, HOME_TZ, MONTH_NAMES, day_dates, dow_labels, group_values, key_labels, local_timestamps,
+    month_labels, normalize_frame, parse_apple_dates,
+)
+from apple_health.partition import day_range_from_dates, partition_by_source, select_rows, source_ranges
+from apple_health.rollup import RollupStore, build_rollup, daily_means, daily_totals, merge_rollups
+from apple_health.downsample import downsample, lttb_indices, minmax_indices
+from apple_health.matrix import (
+    DailyMatrix, build_daily_matrix, corr_frame, lagged_corr, pairwise_corr, rolling_corr, strongest_lags,
+)
+from apple_health.incremental import high_water_mark, ingest_since, merge_incremental, new_rows
+from apple_health.memo import ComputeCache, compute_cache, frame_fingerprint, frame_identity, register_frame
+from apple_health.progress import FAILED, READING, READY, WAITING, ProgressReader, member_progress
+from apple_health.registry import DatasetRegistry, index_zip
+from apple_health.sleep import (
+    ASLEEP_STAGES, NIGHT_BOUNDARY_HOUR, SLEEP_STAGES, encode_stages, night_keys, sleep_nights, stage_codes, stage_totals,
+)
+from apple_health.dedup import DEFAULT_PRIORITY, deduplicate_sources, preferred_source, source_priority
+from apple_health.summary import (
+    DAILY_METRICS, combine_energy, daily_metrics, deduplicated_daily, rollup_table, summary_metrics,
+)
+from apple_health.profiling import PROFILE_ENABLED, Profiler, active_profiler, profile_span, profiled
+from apple_health.heart import (
+    DEFAULT_MAX_HR, ZONE_BOUNDS, ZONE_COLUMNS, HeartRateEngine, daily_heart_rate, intraday_heart_rate, resting_baseline,
+)
+from apple_health.bouts import (
+    BOUT_METRICS, MIN_BOUT_MINUTES, bout_summary, detect_bouts, interval_join, workout_bouts,
+)
+from apple_health.workspace import (
+    DONE, PENDING, RUNNING, Workspace, ingest_export, job_status, prune_uploads, shared_pool, shared_stats,
+    store_upload, submit_export,
+)
+from apple_health.cohort import cohort_summary, cohort_table, cohort_trend
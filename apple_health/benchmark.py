@@ -0,0 +1,311 @@
+"""Sentetik dışa aktarımlarla aşama bazında süre ve en yüksek bellek ölçümü.
+
+Kullanım: python -m apple_health.benchmark --years 5 --hr-per-hour 60 -o sonuc.json --compare onceki.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from apple_health.bouts import bout_summary, detect_bouts
+from apple_health.dedup import deduplicate_sources
+from apple_health.downsample import downsample
+from apple_health.export_xml import read_export_xml
+from apple_health.heart import daily_heart_rate, resting_baseline
+from apple_health.ingest import read_csv_members
+from apple_health.matrix import build_daily_matrix, lagged_corr, pairwise_corr
+from apple_health.normalize import group_values
+from apple_health.partition import select_rows
+from apple_health.rollup import RollupStore
+from apple_health.sleep import sleep_nights, stage_totals
+from apple_health.summary import combine_energy, daily_metrics, deduplicated_daily, summary_metrics
+
+NS_PER_SECOND = 1_000_000_000
+SOURCE_NAMES = ["Benchmark Apple Watch", "Benchmark iPhone"]
+START = np.datetime64("2015-01-01T00:00:00", "ns")
+# Tip -> (birim, kaynak başına günlük örnek, alt, üst); anlık ölçümler
+POINT_SPECS = {
+    "WalkingSpeed": ("km/hr", 20, 3.0, 6.0),
+    "WalkingStepLength": ("cm", 20, 50.0, 80.0),
+    "RestingHeartRate": ("count/min", 1, 50.0, 65.0),
+    "HeartRateVariabilitySDNN": ("ms", 6, 20.0, 80.0),
+    "OxygenSaturation": ("%", 12, 0.94, 1.0),
+    "RespiratoryRate": ("count/min", 12, 12.0, 18.0),
+    "WalkingHeartRateAverage": ("count/min", 1, 90.0, 110.0),
+    "VO2Max": ("mL/min·kg", 0.2, 35.0, 45.0),
+    "BodyMass": ("kg", 0.2, 70.0, 80.0),
+}
+SLEEP_PATTERN = ["InBed", "AsleepCore", "AsleepDeep", "AsleepCore", "AsleepREM", "Awake", "AsleepCore", "AsleepDeep",
+                 "AsleepCore", "AsleepREM", "AsleepCore", "AsleepREM", "Awake", "AsleepCore"]
+
+
+def _source_names(count):
+    return (SOURCE_NAMES + [f"Benchmark Kaynak {i}" for i in range(3, count + 1)])[:count]
+
+
+def _intervals(rng, days, per_day, first_hour=7, last_hour=23, min_seconds=60, max_seconds=600):
+    # Gün içi uyanık saatlere dağılmış, başlangıca göre sıralı aralıklar (ns)
+    n = int(days * per_day)
+    day = np.sort(rng.integers(0, days, n))
+    second = rng.integers(first_hour * 3600, last_hour * 3600, n)
+    start = np.sort(day * 86400 + second) * NS_PER_SECOND
+    duration = rng.integers(min_seconds, max_seconds, n) * NS_PER_SECOND
+    return start, start + duration
+
+
+def _frame(type_name, source, unit, start, end, value):
+    return pd.DataFrame({
+        "type": type_name, "sourceName": source, "unit": unit,
+        "startDate": start, "endDate": end, "value": value,
+    })
+
+
+def synthetic_frames(years=3, sources=2, heart_rate_per_hour=60, seed=0):
+    """Gerçekçi dağılımlı sentetik kayıtlar: {tip adı: DataFrame}; tarihler epoch nanosaniye.
+
+    Adım/mesafe/enerji aralıkları kaynaklar arasında çakışır; nabız ilk kaynaktan saatte
+    heart_rate_per_hour anlık örnektir; uyku her kaynaktan hafif kaymalı gece bölütleridir.
+    """
+    rng = np.random.default_rng(seed)
+    days = int(years * 365)
+    names = _source_names(sources)
+    parts = {}
+
+    def add(type_name, frame):
+        parts.setdefault(type_name, []).append(frame)
+
+    for i, source in enumerate(names):
+        start, end = _intervals(rng, days, 120 if i == 0 else 80)
+        steps = np.round((end - start) / NS_PER_SECOND * rng.uniform(0.5, 2.0, len(start)))
+        add("StepCount", _frame("StepCount", source, "count", start, end, steps))
+        add("DistanceWalkingRunner", _frame("DistanceWalkingRunner", source, "km", start, end,
+                                            np.round(steps * 0.00075, 4)))
+        start, end = _intervals(rng, days, 200, min_seconds=60, max_seconds=180)
+        energy = (end - start) / NS_PER_SECOND * rng.uniform(0.05, 0.15, len(start))
+        add("ActiveEnergyBurned", _frame("ActiveEnergyBurned", source, "kcal", start, end, np.round(energy, 3)))
+        start = (np.arange(days * 48) * 1800) * NS_PER_SECOND
+        add("BasalEnergyBurned", _frame("BasalEnergyBurned", source, "kcal", start, start + 1800 * NS_PER_SECOND,
+                                        np.round(rng.uniform(30, 40, len(start)), 3)))
+        for type_name, (unit, per_day, lo, hi) in POINT_SPECS.items():
+            start, _ = _intervals(rng, days, per_day, 0, 24)
+            add(type_name, _frame(type_name, source, unit, start, start, np.round(rng.uniform(lo, hi, len(start)), 3)))
+        # Uyku: her gece 23:00 civarı başlayan ~30 dakikalık bölütler; kaynaklar birkaç dakika kayar
+        night = np.repeat(np.arange(days), len(SLEEP_PATTERN))
+        offset = np.tile(np.arange(len(SLEEP_PATTERN)) * 1800, days)
+        jitter = np.repeat(rng.integers(-3600, 3600, days), len(SLEEP_PATTERN)) + rng.integers(-300, 300, len(night))
+        start = (night * 86400 + 23 * 3600 + offset + jitter) * NS_PER_SECOND
+        end = start + 1800 * NS_PER_SECOND
+        stage = np.tile(SLEEP_PATTERN, days)
+        sleep = _frame("SleepAnalysis", source, "", start, end, np.char.add("HKCategoryValueSleepAnalysis", stage))
+        sleep["sleep_type"] = stage
+        sleep["sleep_duration_hours"] = (end - start) / (3600 * NS_PER_SECOND)
+        add("SleepAnalysis", sleep)
+
+    # Nabız: saat başına heart_rate_per_hour anlık örnek, gün içi döngü + gürültü
+    n = int(days * 24 * heart_rate_per_hour)
+    start = np.sort(rng.integers(0, days * 86400, n)) * NS_PER_SECOND
+    hour = (start // (3600 * NS_PER_SECOND)) % 24
+    value = 65 + 20 * np.sin((hour - 8) / 24 * 2 * np.pi) + rng.normal(0, 8, n)
+    add("HeartRate", _frame("HeartRate", names[0], "count/min", start, start, np.round(value)))
+    return {name: pd.concat(frames, ignore_index=True) for name, frames in parts.items()}
+
+
+def _apple_dates(ns):
+    # "2015-01-01 07:00:00 +0300" biçimi, satır satır strftime çağrılmadan
+    text = np.datetime_as_string((START + ns.astype("timedelta64[ns]")).astype("datetime64[s]"), unit="s")
+    return np.char.add(np.char.replace(text, "T", " "), " +0300")
+
+
+def write_synthetic_export(path, frames, kind="csv"):
+    """Sentetik kayıtları panelin okuduğu biçimde zip'e yazar: tip başına CSV ya da export.xml."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        if kind == "csv":
+            for type_name, df in frames.items():
+                out = df.copy()
+                out["creationDate"] = _apple_dates(out["endDate"].to_numpy())
+                out["startDate"] = _apple_dates(out["startDate"].to_numpy())
+                out["endDate"] = _apple_dates(out["endDate"].to_numpy())
+                with z.open(f"{type_name}.csv", "w") as f, io.TextIOWrapper(f, encoding="utf-8") as text:
+                    out.to_csv(text, index=False)
+            return
+        with z.open("apple_health_export/export.xml", "w") as f, io.TextIOWrapper(f, encoding="utf-8") as text:
+            text.write('<?xml version="1.0" encoding="UTF-8"?>\n<HealthData locale="tr_TR">\n')
+            for type_name, df in frames.items():
+                prefix = "HKCategoryTypeIdentifier" if type_name == "SleepAnalysis" else "HKQuantityTypeIdentifier"
+                hk_type = prefix + ("DistanceWalkingRunning" if type_name == "DistanceWalkingRunner" else type_name)
+                start = _apple_dates(df["startDate"].to_numpy())
+                end = _apple_dates(df["endDate"].to_numpy())
+                lines = (
+                    f' <Record type="{hk_type}" sourceName="' + df["sourceName"].astype(str)
+                    + '" unit="' + df["unit"].astype(str) + '" creationDate="' + end + '" startDate="' + start
+                    + '" endDate="' + end + '" value="' + df["value"].astype(str) + '"/>\n'
+                )
+                text.writelines(lines)
+            text.write("</HealthData>\n")
+
+
+def synthetic_export(work_dir, years=3, sources=2, heart_rate_per_hour=60, seed=0, kind="csv"):
+    """Parametrelere göre adlandırılmış sentetik zip'in yolu; dosya varsa yeniden üretilmez."""
+    os.makedirs(work_dir, exist_ok=True)
+    path = os.path.join(work_dir, f"synthetic_{years}y_{sources}s_{heart_rate_per_hour}hr_{seed}_{kind}.zip")
+    if not os.path.exists(path):
+        write_synthetic_export(path, synthetic_frames(years, sources, heart_rate_per_hour, seed), kind)
+    return path
+
+
+def measure(fn, repeat=3):
+    """fn'i repeat kez zamanlar, ardından bir kez tracemalloc altında en yüksek belleği ölçer."""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - started)
+    # İzleme çalışmayı yavaşlattığı için bellek ayrı bir çalıştırmada ölçülür
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(runs), "runs": runs, "peak_mb": peak / 1024 ** 2}, result
+
+
+def _read_zip(path, kind):
+    with zipfile.ZipFile(path) as z:
+        if kind == "csv":
+            return read_csv_members(z, [n for n in z.namelist() if n.endswith(".csv")])
+        return read_export_xml(z, "apple_health_export/export.xml")[0]
+
+
+def _figures(frames):
+    import plotly.express as px
+
+    heart = frames["HeartRate"]
+    reduced = downsample(heart[["startDate", "value"]], "startDate", "value", max_points=1200, method="lttb")
+    line = px.line(reduced, x="startDate", y="value")
+    daily = deduplicated_daily(frames["StepCount"])
+    bar = px.bar(daily, x="date", y="value")
+    return len(line.to_json()) + len(bar.to_json())
+
+
+def stages(path, kind="csv"):
+    """Ölçülen aşamalar: ad -> (girdi tablolarından çalışan fonksiyon)."""
+    return {
+        # Yükleme döngüsü: zip okuma ve CSV/XML ayrıştırma
+        "zip_read_parse": lambda frames: _read_zip(path, kind),
+        "rollups": lambda frames: RollupStore().sync(frames),
+        # Eski preprocess_step_count + get_step_grouped_data
+        "step_grouping": lambda frames: [
+            group_values(select_rows(frames["StepCount"]), key, "sum") for key in ("date", "month_name", "hour", "dow")
+        ],
+        # get_grouped_distance
+        "distance_grouping": lambda frames: [
+            group_values(frames["DistanceWalkingRunner"], key, "sum") for key in ("date", "month_name", "dow")
+        ],
+        "source_dedup": lambda frames: deduplicate_sources(frames["StepCount"]),
+        # get_daily_total_energy
+        "daily_total_energy": lambda frames: combine_energy(
+            deduplicated_daily(frames["ActiveEnergyBurned"]), deduplicated_daily(frames["BasalEnergyBurned"])
+        ),
+        # get_sleep_metrics
+        "sleep_metrics": lambda frames: stage_totals(sleep_nights(frames["SleepAnalysis"])),
+        # Gün içi nabız: bölgeler, dinlenme tabanı ve sıçramalar
+        "heart_rate_days": lambda frames: resting_baseline(daily_heart_rate(frames["HeartRate"])),
+        # Yürüyüş bout'ları ve nabız/enerji/mesafe örneklerinin aralık birleştirmesi
+        "bout_join": lambda frames: bout_summary(detect_bouts(frames["StepCount"], frames["WalkingSpeed"]), frames),
+        # tab5 birleştirme döngüsü: ortak gün ekseni + tüm çiftlerin (gecikmeli) korelasyonu
+        "correlation": lambda frames: _correlate(daily_metrics(frames)),
+        "figure_construction": _figures,
+        "summary_metrics": lambda frames: summary_metrics(daily_metrics(frames)),
+    }
+
+
+def _correlate(daily):
+    series = {c: pd.Series(daily[c].to_numpy(), index=daily["date"].to_numpy().astype("datetime64[D]").view("i8"))
+              for c in daily.columns if c != "date"}
+    matrix = build_daily_matrix(series)
+    return pairwise_corr(matrix.values), lagged_corr(matrix.values, 30)
+
+
+def run_benchmark(path, kind="csv", repeat=3, only=None):
+    """Tüm aşamaları çalıştırır; {"rows", "stages"} sözlüğü döner."""
+    results = {}
+    frames = None
+    for name, fn in stages(path, kind).items():
+        if only and name not in only and name != "zip_read_parse":
+            continue
+        results[name], output = measure(lambda: fn(frames), repeat)
+        if name == "zip_read_parse":
+            frames = output
+    return {"rows": {t: len(df) for t, df in frames.items()}, "stages": results}
+
+
+def compare(current, baseline):
+    """İki sonuç dosyasının aşama sürelerini ve bellek tepelerini karşılaştıran tablo."""
+    rows = []
+    for name, stage in current["stages"].items():
+        base = baseline["stages"].get(name)
+        rows.append({
+            "stage": name,
+            "seconds": stage["seconds"],
+            "baseline_seconds": base["seconds"] if base else None,
+            "ratio": stage["seconds"] / base["seconds"] if base and base["seconds"] else None,
+            "peak_mb": stage["peak_mb"],
+            "baseline_peak_mb": base["peak_mb"] if base else None,
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m apple_health.benchmark", description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=3, help="Kaç yıllık veri üretileceği")
+    parser.add_argument("--sources", type=int, default=2, help="Kaynak (cihaz) sayısı")
+    parser.add_argument("--hr-per-hour", type=int, default=60, help="Saat başına nabız örneği")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kind", choices=("csv", "xml"), default="csv",
+                        help="Zip içeriği: tip başına CSV ya da export.xml")
+    parser.add_argument("--repeat", type=int, default=3, help="Aşama başına zamanlama tekrarı")
+    parser.add_argument("--only", nargs="*", help="Yalnızca bu aşamalar (zip okuma her zaman çalışır)")
+    parser.add_argument("--work-dir", default="benchmark_data", help="Sentetik zip'lerin saklandığı dizin")
+    parser.add_argument("-o", "--out", default=None, help="Sonuç JSON dosyası")
+    parser.add_argument("--compare", default=None, help="Karşılaştırılacak önceki sonuç JSON dosyası")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    path = synthetic_export(args.work_dir, args.years, args.sources, args.hr_per_hour, args.seed, args.kind)
+    generated = time.perf_counter() - started
+    result = run_benchmark(path, args.kind, args.repeat, args.only)
+    result["meta"] = {
+        "years": args.years, "sources": args.sources, "hr_per_hour": args.hr_per_hour, "seed": args.seed,
+        "kind": args.kind, "repeat": args.repeat, "export": os.path.basename(path),
+        "export_mb": os.path.getsize(path) / 1024 ** 2, "generate_seconds": generated,
+        "total_rows": sum(result["rows"].values()),
+        # Linux'ta KB cinsindendir
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+        "machine": platform.machine(), "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    table = pd.DataFrame([
+        {"stage": name, "seconds": stage["seconds"], "peak_mb": stage["peak_mb"]}
+        for name, stage in result["stages"].items()
+    ])
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            table = compare(result, json.load(f))
+    print(f"{result['meta']['total_rows']:,} satır · {result['meta']['export_mb']:,.1f} MB zip")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
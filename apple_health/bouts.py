@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from apple_health.dedup import _union, deduplicate_sources
+from apple_health.partition import select_rows
+
+NS_PER_MINUTE = 60_000_000_000
+# Adım temposu (adım/dk) ya da yürüme hızı (km/sa) eşiği aşan aralıklar aktif sayılır
+MIN_CADENCE = 60
+MIN_SPEED_KMH = 3.0
+# Aktif aralıklar arasındaki bu kadar dakikalık boşluklar aynı bout'a dahil edilir
+MAX_GAP_MINUTES = 3
+MIN_BOUT_MINUTES = 10
+# Algılanan bout'larda bu tempo ve üstü koşu sayılır
+RUN_CADENCE = 140
+# Bout kolonu -> (tip adı, birleştirme); "sum" kaynak önceliğiyle tekilleştirilir ve bout içinde kalan
+# süre oranında sayılır, "mean"/"max" bout içinde başlayan örneklerden hesaplanır
+BOUT_METRICS = {
+    "steps": ("StepCount", "sum"),
+    "distance_km": ("DistanceWalkingRunner", "sum"),
+    "active_energy_kcal": ("ActiveEnergyBurned", "sum"),
+    "heart_rate_bpm": ("HeartRate", "mean"),
+    "heart_rate_max": ("HeartRate", "max"),
+    "walking_speed_kmh": ("WalkingSpeed", "mean"),
+}
+BOUT_COLUMNS = ["start", "end", "day", "minutes", "activity", "origin"]
+
+
+def _intervals(df):
+    start = df["startDate"].to_numpy().view("i8")
+    end = df["endDate"].to_numpy().view("i8") if "endDate" in df else start
+    return start, np.maximum(end, start)
+
+
+def _bout_frame(start, end, activity, origin):
+    return pd.DataFrame({
+        "start": start.view("datetime64[ns]"),
+        "end": end.view("datetime64[ns]"),
+        "day": (start // (24 * 60 * NS_PER_MINUTE)).astype(np.int32),
+        "minutes": (end - start) / NS_PER_MINUTE,
+        "activity": activity,
+        "origin": origin,
+    }, columns=BOUT_COLUMNS)
+
+
+def workout_bouts(workouts):
+    """Workout kayıtlarını ayrık, başlangıca göre sıralı bout tablosuna çevirir.
+
+    Çakışan antrenmanlardan (ör. saat ve üçüncü taraf uygulama aynı yürüyüşü kaydetmişse) önce başlayan tutulur.
+    """
+    start, end = _intervals(workouts)
+    order = np.argsort(start, kind="stable")
+    start, end = start[order], end[order]
+    kept = np.ones(len(start), dtype=bool)
+    kept[1:] = start[1:] >= np.maximum.accumulate(end)[:-1]
+    activity = workouts["workoutActivityType"].astype(str).to_numpy()[order] \
+        if "workoutActivityType" in workouts else np.full(len(start), None)
+    return _bout_frame(start[kept], end[kept], activity[kept], "workout")
+
+
+def detect_bouts(steps=None, speed=None, min_cadence=MIN_CADENCE, min_speed_kmh=MIN_SPEED_KMH,
+                 max_gap_minutes=MAX_GAP_MINUTES, min_minutes=MIN_BOUT_MINUTES):
+    """Adım temposu ya da yürüme hızı eşiğini aşan aralıkları, kısa boşlukları kapatarak bout'lara birleştirir.
+
+    Kaynaklar birlikte taranır; aynı yürüyüşü bildiren iPhone ve saat aralıkları tek bout'ta birleşir.
+    Etkinlik (yürüyüş/koşu) bout_summary'de tempoya göre atanır.
+    """
+    starts, ends = [], []
+    if steps is not None and len(steps):
+        start, end = _intervals(steps)
+        minutes = (end - start) / NS_PER_MINUTE
+        with np.errstate(invalid="ignore", divide="ignore"):
+            active = (minutes > 0) & (steps["value"].to_numpy(dtype=np.float64) / minutes >= min_cadence)
+        starts.append(start[active])
+        ends.append(end[active])
+    if speed is not None and len(speed):
+        start, end = _intervals(speed)
+        active = speed["value"].to_numpy(dtype=np.float64) >= min_speed_kmh
+        starts.append(start[active])
+        ends.append(end[active])
+    if not starts:
+        return _bout_frame(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), None, "detected")
+    start, end = np.concatenate(starts), np.concatenate(ends)
+    order = np.argsort(start, kind="stable")
+    start, end = _union(start[order], end[order], gap=max_gap_minutes * NS_PER_MINUTE)
+    long_enough = end - start >= min_minutes * NS_PER_MINUTE
+    return _bout_frame(start[long_enough], end[long_enough], None, "detected")
+
+
+def interval_join(start, end, bout_start, bout_end):
+    """Örnek aralıklarını ayrık ve sıralı bout aralıklarına ikili aramayla bağlar; çapraz birleştirme yapmaz.
+
+    Örnekler sıralı olmak zorunda değildir: O(n log m). Her örnek için kesiştiği ilk bout'un indeksi
+    (yoksa -1) ve örnek süresinin o bout içinde kalan oranı döner; anlık örneklerin oranı 1'dir.
+    """
+    if not len(bout_start):
+        return np.full(len(start), -1), np.zeros(len(start))
+    # Bitişi örneğin başlangıcından sonra olan ilk bout; aralıklar yarı açıktır [başlangıç, bitiş)
+    j = np.searchsorted(bout_end, start, side="right")
+    found = j < len(bout_start)
+    j = np.minimum(j, len(bout_start) - 1)
+    overlap = np.minimum(end, bout_end[j]) - np.maximum(start, bout_start[j])
+    length = end - start
+    point = length <= 0
+    inside = found & np.where(point, start >= bout_start[j], overlap > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where(point, 1.0, overlap / np.where(point, 1, length))
+    return np.where(inside, j, -1), np.where(inside, fraction, 0.0)
+
+
+def bout_summary(bouts, frames, priority=None):
+    """Her bout için adım, mesafe, aktif enerji, ortalama/en yüksek nabız ve ortalama hız.
+
+    frames bir sözlük ya da DatasetRegistry olabilir; yalnızca BOUT_METRICS tipleri ve yalnızca bout'ların
+    kapsadığı günler okunur.
+    """
+    summary = bouts.reset_index(drop=True).copy()
+    if summary.empty:
+        for name in BOUT_METRICS:
+            summary[name] = pd.Series(dtype="float64")
+        summary["cadence"] = pd.Series(dtype="float64")
+        return summary
+    bout_start = summary["start"].to_numpy().view("i8")
+    bout_end = summary["end"].to_numpy().view("i8")
+    date_range = (summary["start"].min().normalize(), summary["end"].max())
+    m = len(summary)
+    joined = {}
+    for name, (type_name, agg) in BOUT_METRICS.items():
+        if type_name not in frames:
+            continue
+        if (type_name, agg == "sum") not in joined:
+            df = select_rows(frames[type_name], None, date_range)
+            if agg == "sum":
+                df = deduplicate_sources(df, priority)
+            index, fraction = interval_join(*_intervals(df), bout_start, bout_end)
+            hit = index >= 0
+            joined[type_name, agg == "sum"] = (
+                index[hit], fraction[hit], df["value"].to_numpy(dtype=np.float64)[hit]
+            )
+        index, fraction, value = joined[type_name, agg == "sum"]
+        if agg == "sum":
+            summary[name] = np.bincount(index, value * fraction, m)
+        elif agg == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                summary[name] = np.bincount(index, value, m) / np.bincount(index, minlength=m)
+        else:
+            peak = np.full(m, np.nan)
+            np.fmax.at(peak, index, value)
+            summary[name] = peak
+    detected = summary["activity"].isna()
+    if "steps" in summary:
+        summary["cadence"] = summary["steps"] / summary["minutes"]
+        summary.loc[detected, "activity"] = np.where(
+            summary.loc[detected, "cadence"] >= RUN_CADENCE, "Running", "Walking"
+        )
+    else:
+        # Adım yoksa bout'lar yalnızca yürüme hızından algılanmıştır; tempo bilinmez, yürüyüş sayılır
+        summary.loc[detected, "activity"] = "Walking"
+    return summary
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import pyarrow as pa
+
+from apple_health.normalize import HOME_TZ
+
+# Ortam değişkenleriyle ayarlanabilir: HEALTH_CACHE_DIR, HEALTH_CACHE_MAX_BYTES
+CACHE_DIR = os.environ.get("HEALTH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "health_dashboard"))
+CACHE_MAX_BYTES = int(os.environ.get("HEALTH_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+FRAME_SUFFIX = ".arrow"
+INDEX_FILE = "index.json"
+HASH_CHUNK = 8 * 1024 * 1024
+# Saklanan tabloların şeması değiştiğinde artırılır; eski kayıtlar kullanılmaz
+FORMAT_VERSION = 5
+
+
+def content_key(fileobj):
+    """Yüklenen zip'in içeriğinden önbellek anahtarı üretir."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(str(FORMAT_VERSION).encode())
+    # Gün anahtarları ev saat dilimine bağlıdır; farklı ayarla yazılmış tablolar kullanılmaz
+    digest.update(str(HOME_TZ).encode())
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def _entry_dir(key, cache_dir):
+    return os.path.join(cache_dir, key)
+
+
+def _dir_size(path):
+    # Başka bir yazıcı (iş parçacığı ya da süreç) aynı anda dosya taşıyıp silebilir; kaybolan girdiler sayılmaz
+    size = 0
+    try:
+        entries = list(os.scandir(path))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if entry.name.startswith(".staging-"):
+            continue
+        try:
+            if entry.is_file():
+                size += entry.stat().st_size
+        except FileNotFoundError:
+            continue
+    return size
+
+
+def _read_frame(path):
+    # Dosya bellek eşlemeli açılır ve kolonlar kopyalanmadan eşlenen sayfalara bağlanır (salt okunur); aynı
+    # dışa aktarımı açan oturumlar sayfa önbelleğini paylaşır. Kategori sözlükleri ve boş değerli kolonlar kopyalanır
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _write_frame(path, df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def load_frame(key, type_name, cache_dir=None):
+    """Tek bir tipin önbellekteki tablosu; yoksa None."""
+    path = _entry_dir(key, cache_dir or CACHE_DIR)
+    file_path = os.path.join(path, type_name + FRAME_SUFFIX)
+    try:
+        os.utime(path)
+        return _read_frame(file_path)
+    except FileNotFoundError:
+        # Kayıt yok ya da eşzamanlı bir evict ile silindi
+        return None
+
+
+def load_index(key, cache_dir=None):
+    """Kayda yazılmış zip üye dizini; yoksa None."""
+    file_path = os.path.join(_entry_dir(key, cache_dir or CACHE_DIR), INDEX_FILE)
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_index(key, index, cache_dir=None):
+    """Zip dizinini yazar; index sözlük ya da önceden serileştirilmiş JSON metni olabilir."""
+    path = _entry_dir(key, cache_dir or CACHE_DIR)
+    staging = None
+    try:
+        os.makedirs(path, exist_ok=True)
+        fd, staging = tempfile.mkstemp(prefix=".staging-", dir=path)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(index if isinstance(index, str) else json.dumps(index))
+        os.replace(staging, os.path.join(path, INDEX_FILE))
+    except OSError:
+        if staging is not None and os.path.exists(staging):
+            os.remove(staging)
+
+
+def store_frame(key, type_name, df, cache_dir=None, max_bytes=None):
+    """Tek bir tipi mevcut (ya da yeni) önbellek kaydına ekler; yazım geçici dosya üzerinden atomiktir."""
+    cache_dir = cache_dir or CACHE_DIR
+    path = _entry_dir(key, cache_dir)
+    file_path = os.path.join(path, type_name + FRAME_SUFFIX)
+    if os.path.isfile(file_path):
+        return
+    staging = None
+    try:
+        # Kayıt dizini eşzamanlı bir evict ile arada silinebilir; yazım o durumda atlanır
+        os.makedirs(path, exist_ok=True)
+        fd, staging = tempfile.mkstemp(prefix=".staging-", dir=path)
+        os.close(fd)
+        _write_frame(staging, df)
+        os.replace(staging, file_path)
+    except (pa.ArrowException, OSError):
+        if staging is not None and os.path.exists(staging):
+            os.remove(staging)
+        return
+    evict(max_bytes or CACHE_MAX_BYTES, cache_dir)
+
+
+def evict(max_bytes, cache_dir=None):
+    """Toplam boyut sınırı aşılırsa en uzun süredir kullanılmayan kayıtları siler."""
+    cache_dir = cache_dir or CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.startswith(".staging-"):
+            continue
+        try:
+            if entry.is_dir():
+                entries.append((entry.stat().st_mtime, _dir_size(entry.path), entry.path))
+        except FileNotFoundError:
+            # Eşzamanlı bir evict kaydı zaten silmiş
+            continue
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
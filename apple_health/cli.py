@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from apple_health.cache import content_key
+from apple_health.ingest import DEFAULT_WORKERS
+from apple_health.registry import DatasetRegistry
+from apple_health.summary import daily_metrics, rollup_table, summary_metrics
+
+FORMATS = ("parquet", "json")
+
+
+def load_export(f):
+    """Açık zip dosyasını paneldeki gibi tembel bir tablo sözlüğü olarak açar; dosya kullanım boyunca açık kalır."""
+    return DatasetRegistry(f, content_key(f))
+
+
+def _write_table(df, path, fmt):
+    if fmt == "parquet":
+        df.to_parquet(path + ".parquet", index=False)
+    else:
+        df.to_json(path + ".json", orient="records", date_format="iso", force_ascii=False)
+
+
+def process_export(path, out_dir, fmt="parquet", priority=None):
+    """Tek bir dışa aktarımın günlük değerlerini, kaynak özetlerini ve özet metriklerini yazar.
+
+    Çıktılar out_dir/<zip adı>/ altına daily, rollups ve summary.json olarak yazılır;
+    özet metrikler sözlük olarak da döner.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"'{fmt}' desteklenmeyen bir çıktı biçimidir.")
+    started = time.perf_counter()
+    target = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0])
+    os.makedirs(target, exist_ok=True)
+    # Tablolar zip'ten tembel okunur; dosya yalnızca kayıt kullanılırken açık tutulur
+    with open(path, "rb") as zip_file:
+        frames = load_export(zip_file)
+        daily = daily_metrics(frames, priority)
+        _write_table(daily, os.path.join(target, "daily"), fmt)
+        _write_table(rollup_table(frames), os.path.join(target, "rollups"), fmt)
+    summary = summary_metrics(daily)
+    summary["export"] = os.path.basename(path)
+    summary["seconds"] = time.perf_counter() - started
+    with open(os.path.join(target, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def find_exports(path):
+    """Verilen yol bir dizinse içindeki zip dosyaları, değilse yalnızca kendisi."""
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".zip"))
+    return [path]
+
+
+def process_exports(paths, out_dir, fmt="parquet", priority=None, max_workers=None):
+    """Dışa aktarımları süreç havuzunda paralel işler; {zip adı: özet} döndürür."""
+    max_workers = min(max_workers or DEFAULT_WORKERS, len(paths)) or 1
+    if max_workers == 1:
+        return {os.path.basename(p): process_export(p, out_dir, fmt, priority) for p in paths}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {os.path.basename(p): pool.submit(process_export, p, out_dir, fmt, priority) for p in paths}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m apple_health",
+        description="Apple Health dışa aktarımlarından günlük özetleri ve özet metrikleri üretir.",
+    )
+    parser.add_argument("path", help="Dışa aktarım zip dosyası ya da zip dosyalarını içeren dizin")
+    parser.add_argument("-o", "--out", default="health_output", help="Çıktı dizini")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="parquet", help="Tablo çıktı biçimi")
+    parser.add_argument("-p", "--priority", default=None,
+                        help="Virgülle ayrılmış kaynak önceliği (varsayılan: HEALTH_SOURCE_PRIORITY)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Paralel süreç sayısı")
+    args = parser.parse_args(argv)
+
+    paths = find_exports(args.path)
+    if not paths:
+        parser.error(f"{args.path} içinde zip dosyası bulunamadı.")
+    priority = [s.strip() for s in args.priority.split(",") if s.strip()] if args.priority else None
+    summaries = process_exports(paths, args.out, args.format, priority, args.workers)
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summaries, f, ensure_ascii=False, indent=2)
+    json.dump(summaries, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return 0
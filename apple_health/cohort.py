@@ -0,0 +1,45 @@
+import pandas as pd
+
+from apple_health.summary import SUMMARY_METRICS
+
+# Çeyrekleri de verilen dağılım kolonları
+COHORT_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def cohort_table(dailies):
+    """Üye başına günlük tabloları (daily_metrics çıktısı) tek uzun tabloda birleştirir: member, date, metrikler.
+
+    member kolonu ekleme sırasını koruyan kategoridir; grafiklerde üyeler hep aynı sırada çizilir.
+    """
+    pieces = []
+    for name, daily in dailies.items():
+        piece = daily.copy(deep=False)
+        piece.insert(0, "member", name)
+        pieces.append(piece)
+    if not pieces:
+        return pd.DataFrame({"member": pd.Categorical([]), "date": pd.Series(dtype="datetime64[ns]")})
+    table = pd.concat(pieces, ignore_index=True)
+    table["member"] = pd.Categorical(table["member"], categories=list(dailies))
+    return table
+
+
+def cohort_summary(table, columns=None, distribution="steps"):
+    """Üye başına gün sayısı ve günlük metrik ortalamaları; distribution kolonu için çeyrekler de eklenir."""
+    columns = [c for c in (columns or SUMMARY_METRICS.values()) if c in table]
+    grouped = table.groupby("member", observed=False)
+    summary = grouped[columns].mean()
+    summary.insert(0, "days", grouped["date"].count())
+    if distribution in table:
+        quantiles = grouped[distribution].quantile(list(COHORT_QUANTILES)).unstack()
+        for q in COHORT_QUANTILES:
+            summary[f"{distribution}_p{int(q * 100)}"] = quantiles[q]
+    return summary.reset_index()
+
+
+def cohort_trend(table, column, freq="W"):
+    """Üye başına dönem (varsayılan hafta) ortalaması: member, date, value; verisi olmayan dönemler atlanır."""
+    if column not in table:
+        return pd.DataFrame(columns=["member", "date", "value"])
+    period = table["date"].dt.to_period(freq).dt.start_time.rename("date")
+    trend = table.groupby([table["member"], period], observed=True)[column].mean()
+    return trend.dropna().rename("value").reset_index()
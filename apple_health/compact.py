@@ -0,0 +1,39 @@
+import pandas as pd
+from pandas.api.types import is_float_dtype, is_numeric_dtype, is_object_dtype
+
+from apple_health.sleep import encode_stages
+
+# Panelde kullanılmayan kolonlar; date/dow tamsayı day/weekday kolonlarından türetilir
+DROP_COLUMNS = ["type", "creationDate", "sourceVersion", "device", "date", "dow"]
+CATEGORY_COLUMNS = ["sourceName", "unit", "sleep_type", "workoutActivityType", "durationUnit",
+                    "totalDistanceUnit", "totalEnergyBurnedUnit"]
+
+
+def compact_frame(df):
+    """Yüklenen tabloyu kalıcı bellek biçimine indirger.
+
+    Tekrarlı metinler kategori (sözlük kodlu), ölçümler float32 olur; startDate/endDate
+    zaten int64 epoch nanosaniye tutan datetime64 kolonlarıdır.
+    """
+    df = df.drop(columns=[c for c in DROP_COLUMNS if c in df])
+    for col in CATEGORY_COLUMNS:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    if "sleep_type" in df:
+        # Evre filtreleri metin araması yerine kod karşılaştırmasıdır
+        df["sleep_type"] = encode_stages(df["sleep_type"])
+    for col in df.columns:
+        if is_float_dtype(df[col]) and df[col].dtype != "float32":
+            df[col] = df[col].astype("float32")
+    if "value" in df and is_numeric_dtype(df["value"]):
+        # Adım gibi tamsayı sayımlar da tek tip float32 ölçüm kolonunda tutulur
+        df["value"] = df["value"].astype("float32")
+    elif "value" in df and is_object_dtype(df["value"]):
+        # Kategori tipli kayıtlarda (uyku evreleri gibi) değerler de tekrarlı metindir
+        df["value"] = df["value"].astype("category")
+    return df
+
+
+def frame_nbytes(frames):
+    """Tabloların toplam bellek kullanımı (bayt); kategori sözlükleri dahil."""
+    return sum(int(df.memory_usage(deep=True).sum()) for df in frames if df is not None)
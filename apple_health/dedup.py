@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from apple_health.partition import source_ranges
+
+# Ortam değişkeniyle ayarlanabilir: HEALTH_SOURCE_PRIORITY="Ali Haydar’s Apple Watch,Ali Haydar Akca’s iPhone"
+DEFAULT_PRIORITY = [s.strip() for s in os.environ.get("HEALTH_SOURCE_PRIORITY", "").split(",") if s.strip()]
+
+
+def source_priority(sources, priority=None):
+    """Kaynakları öncelik sırasına dizer.
+
+    Listedeki kaynaklar listedeki sırayla gelir; kalanlar Sağlık uygulamasındaki gibi önce saatler,
+    sonra ada göre sıralanır.
+    """
+    priority = DEFAULT_PRIORITY if priority is None else priority
+    listed = [s for s in priority if s in sources]
+    rest = sorted((s for s in sources if s not in listed), key=lambda s: ("Watch" not in s, s))
+    return listed + rest
+
+
+def _union(start, end, gap=0):
+    # Başlangıca göre sıralı aralıkları ayrık aralıklara birleştirir; aradaki boşluğu gap'i aşmayanlar birleşir
+    if not len(start):
+        return start, end
+    run_end = np.maximum.accumulate(end)
+    first = np.empty(len(start), dtype=bool)
+    first[0] = True
+    first[1:] = start[1:] > run_end[:-1] + gap
+    heads = np.flatnonzero(first)
+    tails = np.append(heads[1:] - 1, len(start) - 1)
+    return start[heads], run_end[tails]
+
+
+def _covered(start, end, cov_start, cov_end):
+    # [start, end) aralıklarının ayrık kapsama kümesiyle kesişen uzunluğu; önek toplamı + ikili arama
+    if not len(cov_start):
+        return np.zeros(len(start), dtype=np.int64), np.zeros(len(start), dtype=bool)
+    lengths = cov_end - cov_start
+    before = np.concatenate([[0], np.cumsum(lengths)])
+
+    def cumulative(t):
+        i = np.searchsorted(cov_start, t, side="right") - 1
+        inside = np.clip(t - cov_start[np.maximum(i, 0)], 0, lengths[np.maximum(i, 0)])
+        return np.where(i >= 0, before[np.maximum(i, 0)] + inside, 0)
+
+    # Süresiz (anlık) örnekler bir kapsama aralığının içindeyse tamamen örtülmüş sayılır
+    i = np.searchsorted(cov_start, start, side="right") - 1
+    point_inside = (i >= 0) & (start < cov_end[np.maximum(i, 0)])
+    return cumulative(end) - cumulative(start), point_inside
+
+
+def _source_rows(df, source, ranges):
+    if ranges is not None:
+        start, stop = ranges.get(source, (0, 0))
+        return np.arange(start, stop)
+    return np.flatnonzero((df["sourceName"] == source).to_numpy())
+
+
+def deduplicate_sources(df, priority=None):
+    """Aynı zaman aralığını bildiren kaynakları öncelik sırasıyla tek seriye indirger.
+
+    Kaynaklar öncelik sırasıyla işlenir; her örneğin daha öncelikli kaynakların kapsadığı kısmı
+    düşülür, değeri kalan süre oranında tutulur (adım, mesafe gibi birikimli ölçümler için).
+    Tamamen örtülen satırlar atılır. Kaynak başına birkaç vektörel geçiştir, O(n log n).
+    """
+    if df.empty or "sourceName" not in df:
+        return df
+    sources = df["sourceName"].cat.categories if isinstance(df["sourceName"].dtype, pd.CategoricalDtype) \
+        else pd.unique(df["sourceName"].dropna())
+    ranges = source_ranges(df)
+    present = list(ranges) if ranges is not None else list(sources)
+    starts = df["startDate"].to_numpy().view("i8")
+    ends = df["endDate"].to_numpy().view("i8")
+    kept = np.ones(len(df))
+    cov_start = cov_end = np.empty(0, dtype=np.int64)
+    for source in source_priority(present, priority):
+        rows = _source_rows(df, source, ranges)
+        if not len(rows):
+            continue
+        rows = rows[np.argsort(starts[rows], kind="stable")]
+        start, end = starts[rows], np.maximum(ends[rows], starts[rows])
+        covered, point_inside = _covered(start, end, cov_start, cov_end)
+        length = end - start
+        with np.errstate(invalid="ignore", divide="ignore"):
+            kept[rows] = np.where(length > 0, 1 - covered / length, np.where(point_inside, 0.0, 1.0))
+        merged_start = np.concatenate([cov_start, start])
+        merged_end = np.concatenate([cov_end, end])
+        order = np.argsort(merged_start, kind="stable")
+        cov_start, cov_end = _union(merged_start[order], merged_end[order])
+    keep = np.flatnonzero(kept > 0)
+    result = df.iloc[keep].reset_index(drop=True)
+    result["value"] = (result["value"].to_numpy(dtype=np.float64) * kept[keep]).astype(result["value"].dtype)
+    return result
+
+
+def preferred_source(df, priority=None):
+    """Tablodaki en öncelikli kaynak (ortalama gibi birikimli olmayan ölçümler için); yoksa None."""
+    ranges = source_ranges(df)
+    present = list(ranges) if ranges is not None else list(pd.unique(df["sourceName"].dropna()))
+    ordered = source_priority(present, priority)
+    return ordered[0] if ordered else None
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.view("i8").astype("float64")
+    return values.astype("float64")
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: görsel şekli koruyan threshold adet noktanın indeksleri."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = _as_float(y)
+    # İlk ve son nokta sabit, aradakiler threshold - 2 kovaya bölünür; sınırlar tamsayı bölmeyle bulunur ki
+    # kayan nokta yuvarlaması tam sayıya denk gelen sınırları bir nokta kaydırmasın
+    edges = 1 + np.arange(threshold - 1, dtype=np.int64) * (n - 2) // (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(areas))
+        selected[i + 1] = prev
+    return selected
+
+
+def minmax_indices(y, n_buckets):
+    """Her kovanın en küçük ve en büyük noktası; tepe değerleri kaybolmaz."""
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    values = pd.Series(_as_float(y))
+    buckets = np.arange(n) * n_buckets // n
+    grouped = values.groupby(buckets)
+    return np.unique(np.concatenate([grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy()]))
+
+
+def downsample(df, x, y, max_points, method="lttb", group=None):
+    """Her iz (group değeri) için en fazla max_points nokta bırakır; df x'e göre sıralı olmalıdır."""
+    if group is not None:
+        parts = [
+            downsample(part, x, y, max_points, method)
+            for _, part in df.groupby(group, observed=True, sort=False)
+        ]
+        return pd.concat(parts) if parts else df
+    if len(df) <= max_points:
+        return df
+    df = df[df[y].notna()]
+    if method == "minmax":
+        idx = minmax_indices(df[y].to_numpy(), max_points // 2)
+    elif method == "lttb":
+        idx = lttb_indices(df[x].to_numpy(), df[y].to_numpy(), max_points)
+    else:
+        raise ValueError(f"'{method}' desteklenmeyen bir örnekleme yöntemidir.")
+    return df.iloc[idx]
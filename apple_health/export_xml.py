@@ -0,0 +1,216 @@
+import time
+from xml.parsers import expat
+
+import pandas as pd
+
+from apple_health.compact import compact_frame
+from apple_health.normalize import normalize_frame
+from apple_health.partition import partition_by_source
+from apple_health.progress import ProgressReader
+from apple_health.sleep import SLEEP_PREFIX, encode_stages
+
+TYPE_PREFIXES = ("HKQuantityTypeIdentifier", "HKCategoryTypeIdentifier", "HKDataType")
+WORKOUT_PREFIX = "HKWorkoutActivityType"
+# export.xml içindeki tip adı -> sekmelerin beklediği isim
+TYPE_ALIASES = {"DistanceWalkingRunning": "DistanceWalkingRunner"}
+
+# creationDate panelde kullanılmadığı için hiç okunmaz
+RECORD_COLUMNS = ["sourceName", "unit", "startDate", "endDate", "value"]
+WORKOUT_COLUMNS = [
+    "workoutActivityType", "sourceName", "duration", "durationUnit",
+    "totalDistance", "totalDistanceUnit", "totalEnergyBurned", "totalEnergyBurnedUnit",
+    "startDate", "endDate",
+]
+WORKOUT_NUMERIC = ["duration", "totalDistance", "totalEnergyBurned"]
+# Tüm tiplerde metin olarak bekleyen en fazla satır; aşılınca her tipin tamponu kalıcı biçime indirgenir
+CHUNK_ROWS = 100_000
+
+
+def find_export_xml(file_names):
+    for name in file_names:
+        if name.startswith("__MACOSX"):
+            continue
+        if name.rsplit("/", 1)[-1] == "export.xml":
+            return name
+    return None
+
+
+def short_type_name(hk_type):
+    for prefix in TYPE_PREFIXES:
+        if hk_type.startswith(prefix):
+            hk_type = hk_type[len(prefix):]
+            break
+    return TYPE_ALIASES.get(hk_type, hk_type)
+
+
+class _ChunkBuffer:
+    # Satırları sütun listelerinde biriktirir; flush'ta parça hemen kalıcı biçime (tamsayı gün anahtarları,
+    # kategoriler, float32) indirgenir, ham metinler yalnızca henüz indirgenmemiş satırlar için tutulur
+    def __init__(self, columns, numeric, finalize):
+        self.columns = columns
+        self.numeric = numeric
+        self.finalize = finalize
+        self.rows = {c: [] for c in columns}
+        self.size = 0
+        self.chunks = []
+
+    def append(self, attrs):
+        for c in self.columns:
+            self.rows[c].append(attrs.get(c))
+        self.size += 1
+
+    def flush(self):
+        if not self.size:
+            return
+        chunk = pd.DataFrame(self.rows, columns=self.columns)
+        self.rows = {c: [] for c in self.columns}
+        self.size = 0
+        for c in self.numeric:
+            chunk[c] = pd.to_numeric(chunk[c], errors="coerce")
+        self.chunks.append(self.finalize(chunk))
+
+    def frame(self):
+        self.flush()
+        df = _concat_chunks(self.chunks)
+        self.chunks = []
+        # Kaynağa göre bölümleme birleşik tabloda bir kez yapılır
+        return partition_by_source(df)
+
+
+def _concat_chunks(chunks):
+    # Parçaların kategori sözlükleri farklıdır; sıralı birleşim sözlüğüne taşınır ki birleştirmede kolonlar
+    # object'e dönmesin. Uyku evreleri sonra yeniden sabit sıraya (SLEEP_STAGES) alınır
+    if len(chunks) == 1:
+        return chunks[0]
+    for name, dtype in chunks[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = sorted({c for chunk in chunks for c in chunk[name].cat.categories})
+            for chunk in chunks:
+                chunk[name] = chunk[name].cat.set_categories(categories)
+    df = pd.concat(chunks, ignore_index=True)
+    if "sleep_type" in df:
+        df["sleep_type"] = encode_stages(df["sleep_type"])
+    return df
+
+
+def _workout_statistics(attrs, stats):
+    # Yeni iOS sürümlerinde mesafe/enerji WorkoutStatistics alt elemanlarında gelir
+    for stat in stats:
+        stat_type = stat.get("type", "")
+        if stat_type.endswith("ActiveEnergyBurned") and attrs.get("totalEnergyBurned") is None:
+            attrs["totalEnergyBurned"] = stat.get("sum")
+            attrs["totalEnergyBurnedUnit"] = stat.get("unit")
+        elif "Distance" in stat_type and attrs.get("totalDistance") is None:
+            attrs["totalDistance"] = stat.get("sum")
+            attrs["totalDistanceUnit"] = stat.get("unit")
+
+
+def _compact_records(type_name, df):
+    # Parça başına: tarihler çözülür, metinler kategoriye, ölçümler float32'ye indirgenir
+    if type_name == "SleepAnalysis":
+        df["sleep_type"] = df["value"].str.replace(SLEEP_PREFIX, "", regex=False)
+        start = pd.to_datetime(df["startDate"], format="%Y-%m-%d %H:%M:%S %z", utc=True)
+        end = pd.to_datetime(df["endDate"], format="%Y-%m-%d %H:%M:%S %z", utc=True)
+        df["sleep_duration_hours"] = (end - start).dt.total_seconds() / 3600
+    return compact_frame(normalize_frame(df))
+
+
+def read_export_xml(zip_ref, member, since=None, types=None, progress=None):
+    """export.xml'i zip üyesinden açmadan, sabit bellekle akış halinde okur.
+
+    Tip adına göre DataFrame sözlüğü ve işleme istatistiklerini döndürür. since ({tip adı: Timestamp})
+    verilirse eşikten önce başlayan kayıtlar, types verilirse listede olmayan tipler satıra
+    dönüştürülmeden atlanır. progress (member_progress) verilirse okunan bayt ve kayıt sayısı yazılır.
+    """
+    buffers = {}
+    workouts = _ChunkBuffer(WORKOUT_COLUMNS, WORKOUT_NUMERIC, lambda df: compact_frame(normalize_frame(df)))
+    counter = {"records": 0, "workouts": 0, "skipped": 0, "pending": 0}
+    # Yerel saat önekleri ("YYYY-MM-DD HH:MM:SS") sözlük sırasıyla karşılaştırılabilir
+    marks = {name: ts.strftime("%Y-%m-%d %H:%M:%S") for name, ts in (since or {}).items()}
+
+    def is_old(type_name, attrs):
+        if types is not None and type_name not in types:
+            return True
+        mark = marks.get(type_name)
+        return mark is not None and (attrs.get("startDate") or "")[:19] < mark
+
+    def pending():
+        counter["pending"] += 1
+        if counter["pending"] >= CHUNK_ROWS:
+            # Bellek tip sayısından bağımsız kalsın diye sınır tüm tamponlar için ortaktır
+            for buffer in [*buffers.values(), workouts]:
+                buffer.flush()
+            counter["pending"] = 0
+
+    def on_record(attrs):
+        type_name = short_type_name(attrs.get("type", ""))
+        if is_old(type_name, attrs):
+            counter["skipped"] += 1
+            return
+        buffer = buffers.get(type_name)
+        if buffer is None:
+            numeric = [] if attrs.get("type", "").startswith("HKCategoryTypeIdentifier") else ["value"]
+            buffer = buffers[type_name] = _ChunkBuffer(
+                RECORD_COLUMNS, numeric, lambda df, name=type_name: _compact_records(name, df)
+            )
+        buffer.append(attrs)
+        counter["records"] += 1
+        if progress is not None:
+            progress["rows"] += 1
+        pending()
+
+    def on_workout(attrs, stats):
+        if is_old("Workout", attrs):
+            counter["skipped"] += 1
+            return
+        _workout_statistics(attrs, stats)
+        attrs["workoutActivityType"] = attrs.get("workoutActivityType", "").replace(WORKOUT_PREFIX, "")
+        workouts.append(attrs)
+        counter["workouts"] += 1
+        pending()
+
+    # expat olayları doğrudan işlenir: yalnızca kök altındaki Record/Workout öznitelikleri (ve antrenmanın
+    # WorkoutStatistics alt elemanları) okunur, belge ağacı kurulmaz. xmltodict akış modunda da okunan
+    # öğeleri köke eklediğinden bellek dosya boyuyla büyüyordu
+    depth = 0
+    workout = None
+
+    def start(name, attrs):
+        nonlocal depth, workout
+        depth += 1
+        if depth == 2 and attrs:
+            if name == "Record":
+                on_record(attrs)
+            elif name == "Workout":
+                workout = (attrs, [])
+        elif depth == 3 and workout is not None and name == "WorkoutStatistics":
+            workout[1].append(attrs)
+
+    def end(name):
+        nonlocal depth, workout
+        if depth == 2 and workout is not None:
+            on_workout(*workout)
+            workout = None
+        depth -= 1
+
+    started = time.perf_counter()
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    with zip_ref.open(member) as f:
+        parser.ParseFile(f if progress is None else ProgressReader(f, progress, count_lines=False))
+
+    frames = {name: buffer.frame() for name, buffer in buffers.items()}
+    if counter["workouts"]:
+        frames["Workout"] = workouts.frame()
+    elapsed = time.perf_counter() - started
+    # Atlanan kayıtlar da XML'den ayrıştırılmıştır
+    total = counter["records"] + counter["workouts"] + counter["skipped"]
+    stats = {
+        "records": counter["records"],
+        "workouts": counter["workouts"],
+        "skipped": counter["skipped"],
+        "seconds": elapsed,
+        "records_per_sec": total / elapsed if elapsed > 0 else 0.0,
+    }
+    return frames, stats
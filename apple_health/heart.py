@@ -0,0 +1,188 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from apple_health.memo import frame_identity
+from apple_health.normalize import NS_PER_DAY, day_dates
+from apple_health.partition import select_rows
+
+NS_PER_SECOND = 1_000_000_000
+DEFAULT_MAX_HR = 190
+# Bölge alt sınırları (maksimum nabzın oranı); ilk sınırın altı zone0'dır
+ZONE_BOUNDS = [0.5, 0.6, 0.7, 0.8, 0.9]
+ZONE_COLUMNS = [f"zone{i}" for i in range(len(ZONE_BOUNDS) + 1)]
+# Örnek, aynı gündeki bir sonraki örneğe kadar geçerlidir; daha uzun boşluklar (saat takılı değil) sayılmaz
+MAX_SAMPLE_GAP_SECONDS = 600
+# Dinlenme nabzı: günün süre ağırlıklı %10'luk dilimi
+RESTING_QUANTILE = 0.1
+# İki komşusundan da bu kadar yüksek olan ve yakın aralıklı tek örnek sıçrama (çoğunlukla ölçüm hatası) sayılır
+SPIKE_BPM = 30
+SPIKE_WINDOW_SECONDS = 120
+# Dinlenme tabanı önceki günlerin kayan medyanıdır; sapması bu kadar standart sapmayı aşan gün anormaldir
+BASELINE_DAYS = 28
+BASELINE_MIN_DAYS = 7
+ANOMALY_Z = 2.5
+DAILY_COLUMNS = ["day", "samples", "minutes", "mean_bpm", "min_bpm", "max_bpm", "resting_bpm", "spikes",
+                 *ZONE_COLUMNS]
+
+
+def _samples(df):
+    # Değeri olan örnekler zamana göre tek akışa dizilir; kaynaklar birleşik sayılır, çakışan örneğin süresi 0'dır
+    value = df["value"].to_numpy(dtype=np.float64)
+    known = ~np.isnan(value)
+    start = df["startDate"].to_numpy().view("i8")[known]
+    order = np.argsort(start, kind="stable")
+    return start[order], value[known][order], df["day"].to_numpy()[known][order].astype(np.int64)
+
+
+def _sample_pass(start, value, day, max_hr):
+    # Süre, bölge ve sıçrama bayrağı; tümü komşu örnek farklarıyla tek geçişte
+    n = len(start)
+    same_day = day[1:] == day[:-1]
+    gap = np.diff(start)
+    until = (day + 1) * NS_PER_DAY
+    until[:-1] = np.where(same_day, start[1:], until[:-1])
+    duration = np.clip(until - start, 0, MAX_SAMPLE_GAP_SECONDS * NS_PER_SECOND) / NS_PER_SECOND
+    zone = np.searchsorted(np.asarray(ZONE_BOUNDS) * max_hr, value, side="right")
+    close = same_day & (gap <= SPIKE_WINDOW_SECONDS * NS_PER_SECOND)
+    jump = np.diff(value)
+    spike = np.zeros(n, dtype=bool)
+    spike[1:-1] = close[:-1] & close[1:] & (jump[:-1] >= SPIKE_BPM) & (-jump[1:] >= SPIKE_BPM)
+    return duration, zone, spike
+
+
+def daily_heart_rate(df, max_hr=DEFAULT_MAX_HR):
+    """Nabız örneklerini gün başına özetler: bölgelerde geçen süre (dakika), süre ağırlıklı ortalama,
+    dinlenme nabzı ve sıçrama sayısı.
+
+    Örnek süreleri ardışık startDate farklarından çıkarılır (en fazla MAX_SAMPLE_GAP_SECONDS, gün
+    sonunda kesilir); böylece her günün sonucu yalnızca o günün örneklerine bağlıdır.
+    """
+    start, value, day = _samples(df)
+    if not len(start):
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    duration, zone, spike = _sample_pass(start, value, day, max_hr)
+    n = len(start)
+    first = np.flatnonzero(np.concatenate([[True], day[1:] != day[:-1]]))
+    counts = np.diff(np.append(first, n))
+    k = len(first)
+    index = np.repeat(np.arange(k), counts)
+
+    seconds = np.bincount(index, duration, k)
+    zones = np.bincount(index * len(ZONE_COLUMNS) + zone, duration, k * len(ZONE_COLUMNS))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(index, value * duration, k) / seconds
+    # Süre ağırlıklı yüzdelik: (gün, değer) sıralı birikimli süre üzerinde ikili arama. Sıralama tek
+    # anahtarladır (gün * değer aralığı + değer); lexsort'tan birkaç kat hızlıdır
+    span = value.max() - value.min() + 1
+    by_value = np.argsort(index * span + (value - value.min()), kind="stable")
+    cumulative = np.cumsum(duration[by_value])
+    before = np.concatenate([[0.0], cumulative])[first]
+    pos = np.searchsorted(cumulative, before + RESTING_QUANTILE * seconds, side="left")
+    pos = np.clip(pos, first, first + counts - 1)
+
+    result = pd.DataFrame({
+        "day": day[first].astype(np.int32),
+        "samples": counts,
+        "minutes": seconds / 60,
+        "mean_bpm": mean,
+        "min_bpm": np.minimum.reduceat(value, first),
+        "max_bpm": np.maximum.reduceat(value, first),
+        "resting_bpm": value[by_value][pos],
+        "spikes": np.bincount(index, spike, k).astype(np.int64),
+    })
+    for j, name in enumerate(ZONE_COLUMNS):
+        result[name] = zones[j::len(ZONE_COLUMNS)] / 60
+    return result
+
+
+def resting_baseline(daily, window=BASELINE_DAYS, min_days=BASELINE_MIN_DAYS, threshold=ANOMALY_Z):
+    """Günlük tabloya dinlenme tabanını (önceki günlerin kayan medyanı), z-skorunu ve anomali bayrağını ekler.
+
+    Pencere takvim günleriyle kayar; verisi olmayan günler pencerede boş sayılır.
+    """
+    daily = daily.copy()
+    if daily.empty:
+        for name in ("baseline_bpm", "baseline_z"):
+            daily[name] = pd.Series(dtype="float64")
+        daily["anomaly"] = pd.Series(dtype=bool)
+        return daily
+    resting = pd.Series(daily["resting_bpm"].to_numpy(dtype=np.float64), index=daily["day"].to_numpy())
+    full = resting.reindex(np.arange(resting.index.min(), resting.index.max() + 1))
+    prior = full.shift(1).rolling(window, min_periods=min_days)
+    baseline = prior.median().reindex(resting.index).to_numpy()
+    spread = prior.std().reindex(resting.index).to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(spread > 0, (resting.to_numpy() - baseline) / spread, np.nan)
+    daily["baseline_bpm"] = baseline
+    daily["baseline_z"] = z
+    daily["anomaly"] = np.abs(np.nan_to_num(z)) >= threshold
+    return daily
+
+
+def intraday_heart_rate(df, day, sources=None, max_hr=DEFAULT_MAX_HR):
+    """Tek günün örnekleri: zaman, değer, süre (saniye), bölge ve sıçrama bayrağı."""
+    date = day_dates(day)
+    start, value, days = _samples(select_rows(df, sources, (date, date)))
+    duration, zone, spike = _sample_pass(start, value, days, max_hr)
+    return pd.DataFrame({
+        "time": start.view("datetime64[ns]"),
+        "value": value,
+        "seconds": duration,
+        "zone": zone.astype(np.int8),
+        "spike": spike,
+    })
+
+
+class HeartRateEngine:
+    """Gün içi nabız analizi; günlük sonuçlar (tablo, kaynaklar, maksimum nabız) başına gün gün önbelleklenir.
+
+    Tarih aralığı genişletildiğinde yalnızca henüz hesaplanmamış günlerin örnekleri taranır. Dinlenme
+    tabanı için aralıktan önceki BASELINE_DAYS gün de hesaplanır; sonuç önbellekte ne olduğundan bağımsızdır.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.computed_days = 0
+        self.scanned_rows = 0
+        self._entries = OrderedDict()
+
+    def daily(self, df, sources=None, day_range=None, max_hr=DEFAULT_MAX_HR):
+        """[ilk gün, son gün] aralığının günlük tablosu (resting_baseline kolonlarıyla); aralık yoksa tümü."""
+        key = (frame_identity(df), tuple(sources) if sources is not None else None, max_hr)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {
+                "covered": np.empty(0, dtype=np.int64), "table": pd.DataFrame(columns=DAILY_COLUMNS),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        if day_range is None:
+            if df.empty:
+                return resting_baseline(entry["table"])
+            day_range = (int(df["day"].min()), int(df["day"].max()))
+        lo, hi = int(day_range[0]), int(day_range[1])
+
+        wanted = np.arange(lo - BASELINE_DAYS, hi + 1)
+        missing = wanted[~np.isin(wanted, entry["covered"])]
+        if len(missing):
+            # Eksik günler ardışık aralıklara bölünür; her aralık kaynak bölümlerinden dilimlenerek okunur
+            breaks = np.flatnonzero(np.diff(missing) != 1)
+            firsts = missing[np.concatenate([[0], breaks + 1])]
+            lasts = missing[np.append(breaks, len(missing) - 1)]
+            parts = [select_rows(df, sources, (day_dates(a), day_dates(b))) for a, b in zip(firsts, lasts)]
+            rows = pd.concat(parts) if len(parts) > 1 else parts[0]
+            computed = daily_heart_rate(rows, max_hr)
+            table = pd.concat([entry["table"], computed], ignore_index=True) if len(entry["table"]) else computed
+            entry["table"] = table.sort_values("day", ignore_index=True)
+            entry["covered"] = np.union1d(entry["covered"], missing)
+            self.computed_days += len(missing)
+            self.scanned_rows += len(rows)
+
+        table = resting_baseline(entry["table"])
+        return table[(table["day"] >= lo) & (table["day"] <= hi)].reset_index(drop=True)
+
+    def nbytes(self):
+        return sum(int(e["table"].memory_usage(deep=False).sum()) for e in self._entries.values())
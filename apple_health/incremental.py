@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from apple_health.memo import frame_fingerprint, register_frame
+from apple_health.partition import partition_by_source, source_ranges
+
+DEDUP_KEYS = ["sourceName", "startDate", "endDate", "value"]
+# Ortam değişkeniyle ayarlanabilir: HEALTH_INGEST_OVERLAP_DAYS
+# Saatin geç eşitlediği, high-water mark'tan eski kayıtlar bu pencere içinde yakalanır
+OVERLAP = pd.Timedelta(days=int(os.environ.get("HEALTH_INGEST_OVERLAP_DAYS", 7)))
+
+
+def high_water_mark(df):
+    """Tablodaki en geç startDate; bölümlü tablolarda yalnızca kaynak bölümlerinin son satırları okunur."""
+    if "startDate" not in df or df.empty:
+        return None
+    ranges = source_ranges(df) if "sourceName" in df else None
+    if not ranges:
+        return df["startDate"].max()
+    return df["startDate"].iloc[[stop - 1 for _, stop in ranges.values()]].max()
+
+
+def ingest_since(frames):
+    """Tip başına artımlı okuma eşiği: high-water mark eksi örtüşme penceresi."""
+    marks = {}
+    for type_name, df in frames.items():
+        mark = high_water_mark(df)
+        if mark is not None and pd.notna(mark):
+            marks[type_name] = mark - OVERLAP
+    return marks
+
+
+def _rows_since(df, since):
+    # Bölümlü tablolarda her kaynağın eşik sonrası kuyruğu ikili aramayla bulunur
+    ranges = source_ranges(df) if "sourceName" in df else None
+    if not ranges:
+        return df[df["startDate"] >= since]
+    start = df["startDate"].to_numpy()
+    bound = np.datetime64(since)
+    tails = [df.iloc[a + np.searchsorted(start[a:b], bound):b] for a, b in sorted(ranges.values())]
+    return pd.concat(tails) if tails else df.iloc[0:0]
+
+
+def _row_keys(df):
+    keys = [c for c in DEDUP_KEYS if c in df]
+    # Kategori kolonları kodlarıyla değil değerleriyle özetlenir; farklı sözlükler karşılaştırılabilir
+    return pd.util.hash_pandas_object(df[keys], index=False).to_numpy()
+
+
+def new_rows(old, incoming, since=None):
+    """incoming içinde old'da olmayan satırlar: eşik sonrası adaylar (kaynak, başlangıç, bitiş, değer) ile ayıklanır."""
+    if since is None:
+        mark = high_water_mark(old)
+        if mark is None or pd.isna(mark):
+            return incoming
+        since = mark - OVERLAP
+    candidates = incoming[incoming["startDate"] >= since]
+    if candidates.empty:
+        return candidates
+    fresh = ~np.isin(_row_keys(candidates), _row_keys(_rows_since(old, since)))
+    return candidates[fresh]
+
+
+def _align_categories(old, rows):
+    # Birleştirmede kategori kolonları object'e dönmesin diye sözlükler ortaklaştırılır
+    old, rows = old.copy(deep=False), rows.copy(deep=False)
+    for col in old.columns:
+        if not isinstance(old[col].dtype, pd.CategoricalDtype) or col not in rows:
+            continue
+        new_values = rows[col].astype("category") if not isinstance(rows[col].dtype, pd.CategoricalDtype) else rows[col]
+        categories = old[col].cat.categories.union(new_values.cat.categories)
+        if not old[col].cat.categories.equals(categories):
+            old[col] = old[col].cat.set_categories(categories)
+        rows[col] = new_values.cat.set_categories(categories)
+    return old, rows
+
+
+def _unknown_source_count(df):
+    # Kaynağı olmayan satırlar (kod -1) bölümlü tabloda en baştadır
+    return int(np.searchsorted(df["sourceName"].cat.codes.to_numpy(), 0))
+
+
+def append_rows(old, rows):
+    """rows'u old'a kaynak bölümlerini koruyarak ekler; (yeni tablo, hizalanmış rows) döner.
+
+    Yalnızca eşik öncesine düşen geç satırı olan kaynak bölümü yeniden sıralanır.
+    """
+    old, rows = _align_categories(old, rows)
+    if "sourceName" not in old:
+        frame = pd.concat([old, rows], ignore_index=True)
+        return frame.sort_values("startDate", kind="stable", ignore_index=True), rows
+    rows = partition_by_source(rows)
+    old_ranges, new_ranges = source_ranges(old), source_ranges(rows)
+    if old_ranges is None:
+        return partition_by_source(pd.concat([old, rows], ignore_index=True)), rows
+
+    pieces = [old.iloc[:_unknown_source_count(old)], rows.iloc[:_unknown_source_count(rows)]]
+    for source in old["sourceName"].cat.categories:
+        old_part = old.iloc[slice(*old_ranges[source])] if source in old_ranges else None
+        new_part = rows.iloc[slice(*new_ranges[source])] if source in new_ranges else None
+        if old_part is not None and new_part is not None and (
+            new_part["startDate"].iloc[0] < old_part["startDate"].iloc[-1]
+        ):
+            pieces.append(pd.concat([old_part, new_part]).sort_values("startDate", kind="stable"))
+        else:
+            pieces.extend(part for part in (old_part, new_part) if part is not None)
+    return pd.concat(pieces, ignore_index=True), rows
+
+
+def merge_incremental(current, incoming, since=None):
+    """Yeni dışa aktarımı mevcut tablolara ekler; (güncel tablolar, {tip adı: eklenen satırlar}) döner.
+
+    Yeni satırı olmayan tipler aynı nesne olarak kalır, böylece türetilmiş sonuçlar geçerliliğini korur.
+    Değişen tablolar aynı veri kümesi kimliğiyle bir sonraki sürüm olarak kaydedilir.
+    """
+    since = since or {}
+    frames, appended = {}, {}
+    for type_name, df in incoming.items():
+        old = current.get(type_name)
+        if old is None or "startDate" not in df or "startDate" not in old:
+            frames[type_name] = df
+            continue
+        rows = new_rows(old, df, since.get(type_name))
+        if rows.empty:
+            frames[type_name] = old
+            continue
+        frame, rows = append_rows(old, rows)
+        fingerprint = frame_fingerprint(old)
+        if fingerprint is not None:
+            register_frame(frame, fingerprint[0], fingerprint[1] + 1)
+        frames[type_name] = frame
+        appended[type_name] = rows
+    return frames, appended
@@ -0,0 +1,64 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from apple_health.compact import DROP_COLUMNS, compact_frame
+from apple_health.normalize import normalize_frame
+from apple_health.partition import partition_by_source
+
+CSV_DTYPES = {"sourceName": "category", "unit": "category", "sleep_type": "category"}
+
+# Ortam değişkenleriyle ayarlanabilir: HEALTH_INGEST_WORKERS=8, HEALTH_INGEST_EXECUTOR=process
+DEFAULT_WORKERS = int(os.environ.get("HEALTH_INGEST_WORKERS", min(8, os.cpu_count() or 1)))
+DEFAULT_EXECUTOR = os.environ.get("HEALTH_INGEST_EXECUTOR", "thread")
+
+
+def csv_type_name(name):
+    return name.rsplit("/", 1)[-1].replace(".csv", "")  # örn: "StepCount"
+
+
+def read_metric_csv(f, since=None):
+    """Tek metrik CSV'sini okur; since verilirse yalnızca startDate >= since olan satırlar tutulur."""
+    df = pd.read_csv(f, dtype=CSV_DTYPES, usecols=lambda c: c not in DROP_COLUMNS)
+    df = normalize_frame(df)
+    if since is not None and "startDate" in df:
+        df = df[df["startDate"] >= since].reset_index(drop=True)
+    return partition_by_source(compact_frame(df))
+
+
+def _read_zip_member(zip_ref, name, since):
+    with zip_ref.open(name) as f:
+        return read_metric_csv(f, since)
+
+
+def _read_csv_bytes(data, since):
+    return read_metric_csv(io.BytesIO(data), since)
+
+
+def read_csv_members(zip_ref, names, max_workers=None, executor=None, since=None):
+    """Zip içindeki CSV üyelerini eşzamanlı açıp okur; {tip adı: DataFrame} döndürür.
+
+    since: {tip adı: Timestamp}; artımlı yüklemede her tip için okuma eşiği.
+    """
+    max_workers = max_workers or DEFAULT_WORKERS
+    executor = executor or DEFAULT_EXECUTOR
+    since = since or {}
+    if executor == "process":
+        # Süreçler ZipFile nesnesini paylaşamaz, üyeler burada açılıp bayt olarak gönderilir
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                csv_type_name(n): pool.submit(_read_csv_bytes, zip_ref.read(n), since.get(csv_type_name(n)))
+                for n in names
+            }
+            return {type_name: future.result() for type_name, future in futures.items()}
+    if executor != "thread":
+        raise ValueError(f"'{executor}' desteklenmeyen bir çalıştırıcı türüdür.")
+    # ZipFile okuma için iş parçacıkları arasında paylaşılabilir; zlib açma GIL'i bırakır
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            csv_type_name(n): pool.submit(_read_zip_member, zip_ref, n, since.get(csv_type_name(n)))
+            for n in names
+        }
+        return {type_name: future.result() for type_name, future in futures.items()}
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+
+from apple_health.partition import day_range_from_dates
+
+
+class DailyMatrix:
+    """Tüm metriklerin ortak gün ekseninde hizalandığı tek, bitişik (gün x metrik) float64 blok."""
+
+    def __init__(self, days, columns, values):
+        self.days = days
+        self.columns = list(columns)
+        self.values = values
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.days.nbytes
+
+    def select(self, columns, date_range=None, complete=True):
+        """İstenen kolonların (günler, blok) çifti; complete ise yalnızca tüm kolonları dolu günler kalır."""
+        days = self.days
+        block = self.values[:, [self._positions[c] for c in columns]]
+        if date_range is not None:
+            lo, hi = day_range_from_dates(date_range)
+            start, stop = np.searchsorted(days, [lo, hi + 1])
+            days, block = days[start:stop], block[start:stop]
+        if complete:
+            keep = ~np.isnan(block).any(axis=1)
+            days, block = days[keep], block[keep]
+        return days, block
+
+    def covered_days(self, columns):
+        """Kolonlardan en az birinin dolu olduğu günler."""
+        block = self.values[:, [self._positions[c] for c in columns]]
+        return self.days[~np.isnan(block).all(axis=1)]
+
+
+def build_daily_matrix(series):
+    """Gün indeksli Series sözlüğünü (ad -> günlük değer) tek bir DailyMatrix'e hizalar.
+
+    Gün ekseni kesintisizdir; verisiz günler NaN satırdır, böylece satır farkı takvim günü farkıdır.
+    """
+    series = {name: s for name, s in series.items() if s is not None and len(s)}
+    if not series:
+        return DailyMatrix(np.empty(0, dtype=np.int64), [], np.empty((0, 0)))
+    first = min(int(s.index.min()) for s in series.values())
+    last = max(int(s.index.max()) for s in series.values())
+    days = np.arange(first, last + 1, dtype=np.int64)
+    values = np.full((len(days), len(series)), np.nan)
+    for j, s in enumerate(series.values()):
+        values[s.index.to_numpy(dtype=np.int64) - first, j] = s.to_numpy(dtype=np.float64)
+    return DailyMatrix(days, series, values)
+
+
+def _centered(values):
+    # Sayısal kararlılık için kolonlar kendi ortalamalarına göre kaydırılır, NaN'lar 0 olur
+    present = ~np.isnan(values)
+    mask = present.astype(np.float64)
+    n = mask.sum(axis=0)
+    means = np.where(n > 0, np.nansum(values, axis=0) / np.maximum(n, 1), 0.0)
+    return mask, np.where(present, values - means, 0.0)
+
+
+def _pearson(counts, sum_x, sum_y, sum_xx, sum_yy, sum_xy, min_periods):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = sum_x / counts
+        mean_y = sum_y / counts
+        cov = sum_xy / counts - mean_x * mean_y
+        var_x = sum_xx / counts - mean_x ** 2
+        var_y = sum_yy / counts - mean_y ** 2
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[counts < min_periods] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def pairwise_corr(values):
+    """NaN'ları çift bazında dışlayan Pearson korelasyon matrisi ve her çiftin ortak gün sayısı.
+
+    Tüm çiftler dört matris çarpımıyla birlikte hesaplanır.
+    """
+    mask, centered = _centered(values)
+
+    counts = mask.T @ mask
+    # sums[i, j]: i kolonunun j ile ortak günlerdeki toplamı
+    sums = centered.T @ mask
+    squares = (centered ** 2).T @ mask
+    products = centered.T @ centered
+    corr = _pearson(counts, sums, sums.T, squares, squares.T, products, min_periods=2)
+    return corr, counts.astype(np.int64)
+
+
+def _shift(values, lag):
+    # shifted[t] = values[t + lag]; seri dışına taşan günler NaN
+    shifted = np.full_like(values, np.nan)
+    if abs(lag) >= len(values):
+        return shifted
+    if lag >= 0:
+        shifted[:len(values) - lag] = values[lag:]
+    else:
+        shifted[-lag:] = values[:lag]
+    return shifted
+
+
+def _xcorr(a, b, nfft, max_lag):
+    # c[l, i, j] = sum_t a[t, i] * b[t + l, j]; l = -max_lag..max_lag, nfft >= n + max_lag olmalı
+    fa = np.fft.rfft(a, n=nfft, axis=0)
+    fb = np.fft.rfft(b, n=nfft, axis=0)
+    full = np.fft.irfft(np.conj(fa)[:, :, None] * fb[:, None, :], n=nfft, axis=0)
+    return np.concatenate([full[nfft - max_lag:], full[:max_lag + 1]])
+
+
+def lagged_corr(values, max_lag, min_periods=3):
+    """Tüm çiftler için -max_lag..max_lag gün gecikmeli Pearson korelasyonları.
+
+    corr[l, i, j], i metriğinin t günü ile j metriğinin t + l günü arasındaki korelasyondur;
+    pozitif gecikme i'nin j'yi öncelediği anlamına gelir. Çift bazında NaN dışlamalı toplamlar
+    FFT çapraz korelasyonlarıyla tüm gecikmeler için aynı anda bulunur.
+    """
+    n = len(values)
+    max_lag = max(0, min(max_lag, n - 1))
+    mask, centered = _centered(values)
+    nfft = 1 << int(np.ceil(np.log2(max(n + max_lag, 2))))
+    counts = np.rint(_xcorr(mask, mask, nfft, max_lag))
+    corr = _pearson(
+        counts,
+        _xcorr(centered, mask, nfft, max_lag),
+        _xcorr(mask, centered, nfft, max_lag),
+        _xcorr(centered ** 2, mask, nfft, max_lag),
+        _xcorr(mask, centered ** 2, nfft, max_lag),
+        _xcorr(centered, centered, nfft, max_lag),
+        min_periods,
+    )
+    return np.arange(-max_lag, max_lag + 1), corr, counts.astype(np.int64)
+
+
+def rolling_corr(values, window, lag=0, min_periods=None):
+    """Tüm çiftler için kayan pencereli korelasyon: corr[t, i, j], t ile biten pencerede i(t) ~ j(t + lag).
+
+    Pencere toplamları kümülatif toplamların farkıyla bulunur; pencere başına tarama yapılmaz.
+    """
+    if min_periods is None:
+        min_periods = max(3, window // 2)
+    mask, centered = _centered(values)
+    mask_y, centered_y = np.nan_to_num(_shift(mask, lag)), np.nan_to_num(_shift(centered, lag))
+    # Yalnızca iki metriğin de dolu olduğu günler katkı verir
+    pair = mask[:, :, None] * mask_y[:, None, :]
+    x = centered[:, :, None] * pair
+    y = centered_y[:, None, :] * pair
+
+    def window_sum(a):
+        total = np.cumsum(a, axis=0)
+        out = total.copy()
+        out[window:] -= total[:-window]
+        return out
+
+    corr = _pearson(
+        window_sum(pair), window_sum(x), window_sum(y),
+        window_sum(x * centered[:, :, None]), window_sum(y * centered_y[:, None, :]),
+        window_sum(x * centered_y[:, None, :]), min_periods,
+    )
+    corr[:window - 1] = np.nan
+    return corr
+
+
+def strongest_lags(columns, lags, corr, counts):
+    """Her çift (x < y) için mutlak değerce en güçlü gecikme; |r| değerine göre azalan sırada."""
+    strength = np.where(np.isnan(corr), -1.0, np.abs(corr))
+    best = strength.argmax(axis=0)
+    i, j = np.triu_indices(len(columns), k=1)
+    lag_index = best[i, j]
+    names = np.asarray(columns, dtype=object)
+    pairs = pd.DataFrame({
+        "x": names[i], "y": names[j], "lag": lags[lag_index],
+        "r": corr[lag_index, i, j], "n": counts[lag_index, i, j],
+    })
+    pairs = pairs[pairs["r"].notna()]
+    return pairs.iloc[np.argsort(-pairs["r"].abs().to_numpy(), kind="stable")].reset_index(drop=True)
+
+
+def corr_frame(columns, corr, counts):
+    """Korelasyon ve ortak gün sayısı matrislerini etiketli DataFrame'lere çevirir."""
+    return pd.DataFrame(corr, index=columns, columns=columns), pd.DataFrame(counts, index=columns, columns=columns)
@@ -0,0 +1,138 @@
+import functools
+import itertools
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+# Ortam değişkeniyle ayarlanabilir: HEALTH_COMPUTE_CACHE_MAX_BYTES
+COMPUTE_CACHE_MAX_BYTES = int(os.environ.get("HEALTH_COMPUTE_CACHE_MAX_BYTES", 512 * 1024 ** 2))
+
+# id(df) -> df; kimlik kontrolü, türetilmiş kopyaların attrs üzerinden parmak izini devralmasını engeller
+_registered = weakref.WeakValueDictionary()
+# Kayıtsız tablolara frame_identity'de verilen kimlikler; id() gibi çöp toplamadan sonra yeniden kullanılmaz
+_anonymous_ids = itertools.count()
+_anonymous_lock = threading.Lock()
+
+
+def register_frame(df, dataset_id, version=0):
+    """DataFrame'e içerik özetlemesi gerektirmeyen bir (veri kümesi, sürüm) parmak izi verir."""
+    df.attrs["fingerprint"] = (dataset_id, version)
+    _registered[id(df)] = df
+    return df
+
+
+def frame_fingerprint(df):
+    if _registered.get(id(df)) is df:
+        return df.attrs["fingerprint"]
+    return None
+
+
+def frame_identity(df):
+    """Tablonun parmak izi; kayıtsız tablo önce tekil bir kimlikle kaydedilir, nesne kimliğine (id) dayanılmaz."""
+    with _anonymous_lock:
+        fingerprint = frame_fingerprint(df)
+        if fingerprint is None:
+            fingerprint = register_frame(df, ("anonymous", next(_anonymous_ids))).attrs["fingerprint"]
+    return fingerprint
+
+
+def _token(value):
+    if isinstance(value, pd.DataFrame):
+        fingerprint = frame_fingerprint(value)
+        if fingerprint is not None:
+            return ("frame",) + fingerprint
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # Kayıtsız (küçük, türetilmiş) tablolar için içerik özeti kullanılır
+        columns = tuple(value.columns) if isinstance(value, pd.DataFrame) else value.name
+        return ("content", columns, value.shape, int(pd.util.hash_pandas_object(value, index=True).sum()))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_token(v) for v in value)
+    if isinstance(value, dict):
+        return ("dict",) + tuple(sorted((k, _token(v)) for k, v in value.items()))
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=False))
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+def _shallow(value):
+    # Çağıran taraf sonuca kolon eklediğinde önbellekteki nesne değişmesin
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, tuple):
+        return tuple(_shallow(v) for v in value)
+    return value
+
+
+class ComputeCache:
+    """Parmak izi anahtarlı, bayt sınırlı LRU önbellek; isabet/ıska sayaçlarını tutar."""
+
+    def __init__(self, max_bytes=COMPUTE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, value):
+        size = _nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self.nbytes}
+
+    def memoize(self, fn):
+        """st.cache_data yerine: DataFrame argümanları içerikleriyle değil parmak izleriyle anahtarlanır."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__module__, fn.__qualname__, _token(args), _token(kwargs))
+            entry = self.get(key)
+            if entry is None:
+                value = fn(*args, **kwargs)
+                self.put(key, value)
+            else:
+                value = entry[0]
+            result = _shallow(value)
+            if isinstance(result, pd.DataFrame):
+                # Sonuç da sonraki çağrılarda ucuz anahtarlanabilsin
+                register_frame(result, key)
+            return result
+        return wrapper
+
+
+compute_cache = ComputeCache()
@@ -0,0 +1,166 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytz
+from pandas.api.types import is_datetime64_any_dtype
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+]
+NS_PER_HOUR = 3_600_000_000_000
+NS_PER_DAY = 24 * NS_PER_HOUR
+NS_PER_MINUTE = NS_PER_HOUR // 60
+NAT = np.iinfo(np.int64).min
+# Ortam değişkeniyle ayarlanabilir: HEALTH_HOME_TZ="Europe/Istanbul". Verilirse tüm kayıtlar bu saat
+# diliminin yerel saatine (yaz saati dahil) çevrilir; verilmezse her kayıt kendi UTC farkındaki yerel
+# saatiyle günlere ayrılır (seyahatte kaydedilen örnek, kaydedildiği yerin gününe düşer)
+HOME_TZ = os.environ.get("HEALTH_HOME_TZ") or None
+if HOME_TZ is not None:
+    # Geçersiz saat dilimi adı yüklemede değil başlangıçta hata versin
+    pytz.timezone(HOME_TZ)
+# Apple tarih biçimi: "2024-01-05 08:12:33 +0300"
+_DATE_WIDTH = 25
+_MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int32)
+
+
+def _days_from_civil(year, month, day):
+    # Proleptik Gregoryen takvim tarihinden 1970-01-01'e göre gün sayısı (tamsayı aritmetiği, döngüsüz)
+    year = year - (month <= 2)
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    return era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + doy - 719468
+
+
+def parse_apple_dates(col):
+    """Apple tarih metinlerini ayrıştırır: (yerel saat ns, UTC farkı dakika, fark var mı).
+
+    Metinler sabit genişlikli bayt dizisine çevrilip rakamlar sütun sütun okunur; to_datetime'ın
+    karışık UTC farklarında düştüğü nesne yolundan kaçınılır. Çözülemeyen değerler NaT olur.
+    """
+    raw = np.asarray(col.to_numpy(), dtype=f"S{_DATE_WIDTH}")
+    b = raw.view(np.uint8).reshape(len(raw), _DATE_WIDTH)
+
+    def number(first, width):
+        # Bayt kolonlarından tamsayı; uint8 çıkarmada rakam olmayanlar 9'dan büyük değere taşar
+        digits = b[:, first:first + width] - np.uint8(48)
+        ok = (digits <= 9).all(axis=1)
+        value = digits[:, 0].astype(np.int32)
+        for i in range(1, width):
+            value *= 10
+            value += digits[:, i]
+        return value, ok
+
+    year, ok_year = number(0, 4)
+    month, ok_month = number(5, 2)
+    day, ok_day = number(8, 2)
+    hour, ok_hour = number(11, 2)
+    minute, ok_minute = number(14, 2)
+    second, ok_second = number(17, 2)
+    valid = ok_year & ok_month & ok_day & ok_hour & ok_minute & ok_second
+    valid &= (b[:, 4] == 45) & (b[:, 7] == 45) & ((b[:, 10] == 32) | (b[:, 10] == 84))
+    valid &= (b[:, 13] == 58) & (b[:, 16] == 58)
+    # Düzeni doğru ama takvimde olmayan tarih/saatler (ör. "2024-13-45 25:61:00") to_datetime gibi NaT olur
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = _MONTH_DAYS[np.clip(month, 1, 12) - 1] + (leap & (month == 2))
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+    valid &= (hour <= 23) & (minute <= 59) & (second <= 59)
+    seconds = _days_from_civil(year, month, day).astype(np.int64) * 86400 + (hour * 60 + minute) * 60 + second
+    local = np.where(valid, seconds * 1_000_000_000, NAT)
+
+    sign = b[:, 20]
+    offset_hours, ok_hours = number(21, 2)
+    offset_minutes, ok_minutes = number(23, 2)
+    has_offset = valid & ((sign == 43) | (sign == 45)) & ok_hours & ok_minutes
+    offset = offset_hours * 60 + offset_minutes
+    offset = np.where(has_offset, np.where(sign == 45, -offset, offset), 0).astype(np.int16)
+    return local, offset, has_offset
+
+
+def local_timestamps(col, home_tz=HOME_TZ):
+    """Tarih kolonunu saat dilimsiz datetime64'e çevirir: home_tz verilirse o dilimin, yoksa kaydın yerel saati.
+
+    Metin kolonlarda (yerel saat, UTC farkı) çifti de döner; diğerlerinde fark None'dır.
+    """
+    if isinstance(col.dtype, pd.DatetimeTZDtype):
+        if home_tz is not None:
+            col = col.dt.tz_convert(pytz.timezone(home_tz))
+        return col.dt.tz_localize(None), None
+    if is_datetime64_any_dtype(col):
+        return col, None
+    local, offset, has_offset = parse_apple_dates(col)
+    if home_tz is not None:
+        # UTC'ye çevrilip ev saat dilimine taşınır; yaz saati geçişleri saat dilimi veritabanından gelir
+        utc = local - offset.astype(np.int64) * NS_PER_MINUTE
+        home = pd.DatetimeIndex(utc.view("datetime64[ns]")).tz_localize("UTC").tz_convert(pytz.timezone(home_tz))
+        # Farkı olmayan metinler zaten ev saatinde kabul edilir
+        local = np.where(has_offset, home.tz_localize(None).asi8, local)
+    return pd.Series(local.view("datetime64[ns]"), index=col.index, name=col.name), offset
+
+
+def normalize_frame(df, home_tz=HOME_TZ):
+    """startDate/endDate'i bir kez çözer ve gruplamalarda kullanılan tamsayı kolonlarını ekler.
+
+    day: 1970-01-01'den beri gün sayısı (int32), weekday: 0=Pazartesi. Tüm gruplamalar bu kolonları
+    kullanır; saat dilimi işi yüklemede bir kez yapılır. Metin tarihlerde kaydın UTC farkı utc_offset
+    (dakika) olarak saklanır.
+    """
+    if "startDate" not in df:
+        return df
+    df["startDate"], offset = local_timestamps(df["startDate"], home_tz)
+    if offset is not None:
+        df["utc_offset"] = offset
+    if "endDate" in df:
+        df["endDate"] = local_timestamps(df["endDate"], home_tz)[0]
+    df = df[df["startDate"].notna()].reset_index(drop=True)
+
+    ns = df["startDate"].to_numpy().view("i8")
+    day = ns // NS_PER_DAY
+    months = df["startDate"].to_numpy().astype("datetime64[M]").view("i8")
+    df["day"] = day.astype("int32")
+    df["hour"] = (ns // NS_PER_HOUR % 24).astype("int8")
+    # 1970-01-01 Perşembe (3) gününe denk gelir
+    df["weekday"] = ((day + 3) % 7).astype("int8")
+    df["month"] = (months % 12 + 1).astype("int8")
+    df["year"] = (months // 12 + 1970).astype("int16")
+    return df
+
+
+def day_dates(day):
+    return pd.to_datetime(day, unit="D")
+
+
+def dow_labels(weekday):
+    return pd.Categorical.from_codes(np.asarray(weekday), categories=DAY_NAMES, ordered=True)
+
+
+def month_labels(month):
+    return pd.Categorical.from_codes(np.asarray(month) - 1, categories=MONTH_NAMES, ordered=True)
+
+
+# Grup adı -> yükleme sırasında hazırlanan tamsayı anahtar kolonu
+GROUP_KEYS = {"date": "day", "month_name": "month", "dow": "weekday", "year": "year", "hour": "hour"}
+
+
+def key_labels(values, group_col):
+    """Tamsayı anahtarları grafik etiketlerine çevirir (gün -> tarih, ay -> ay adı, ...)."""
+    if group_col == "date":
+        return day_dates(values)
+    if group_col == "month_name":
+        return month_labels(values)
+    if group_col == "dow":
+        return dow_labels(values)
+    return values
+
+
+def group_values(df, group_col, agg, by=("sourceName",), value_col="value"):
+    """df'yi kopyalamadan tamsayı anahtar üzerinde gruplar; etiket kolonu yalnızca sonuca eklenir."""
+    if group_col not in GROUP_KEYS:
+        raise ValueError(f"'{group_col}' desteklenmeyen bir grup kolonudur.")
+    key = GROUP_KEYS[group_col]
+    grouped = df.groupby([key, *by], observed=True)[value_col].agg(agg).reset_index()
+    grouped.insert(0, group_col, key_labels(grouped.pop(key), group_col))
+    return grouped
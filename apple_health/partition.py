@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from apple_health.normalize import NS_PER_DAY
+
+
+def partition_by_source(df):
+    """Tabloyu kaynağa, kaynak içinde startDate'e göre sıralar; her kaynak bitişik bir satır aralığı olur."""
+    if "sourceName" not in df:
+        return df
+    if not isinstance(df["sourceName"].dtype, pd.CategoricalDtype):
+        df["sourceName"] = df["sourceName"].astype("category")
+    ranges = source_ranges(df)
+    if ranges is not None and _days_sorted(df, ranges.values()):
+        return df
+    keys = ["sourceName", "startDate"] if "startDate" in df else ["sourceName"]
+    return df.sort_values(keys, kind="stable", ignore_index=True)
+
+
+def source_ranges(df, sources=None):
+    """Kaynak -> satır aralığı dizini; sourceName kodları sıralı değilse None döner.
+
+    Aralıklar kategori kodları üzerinde ikili aramayla bulunur, tabloyu taramaz.
+    """
+    col = df["sourceName"]
+    if not isinstance(col.dtype, pd.CategoricalDtype):
+        return None
+    codes = col.cat.codes
+    if not codes.is_monotonic_increasing:
+        return None
+    codes = codes.to_numpy()
+    categories = col.cat.categories
+    wanted = categories if sources is None else [s for s in sources if s in categories]
+    ranges = {}
+    for source in wanted:
+        code = categories.get_loc(source)
+        start, stop = np.searchsorted(codes, [code, code + 1])
+        if stop > start:
+            ranges[source] = (int(start), int(stop))
+    return ranges
+
+
+def _days_sorted(df, ranges):
+    # Her kaynak kendi içinde sıralı olmalı; kaynak sınırlarında gün geri dönebilir
+    if "day" not in df:
+        return False
+    day = df["day"]
+    return all(day.iloc[a:b].is_monotonic_increasing for a, b in ranges)
+
+
+def day_range_from_dates(date_range):
+    """(başlangıç, bitiş) tarih aralığını kapsanan gün anahtarlarına çevirir."""
+    lo = pd.Timestamp(date_range[0]).value
+    hi = pd.Timestamp(date_range[1]).value
+    return -(-lo // NS_PER_DAY), hi // NS_PER_DAY
+
+
+def select_rows(df, sources=None, date_range=None):
+    """Kaynak ve tarih filtresi: maske taraması yerine hazır bölümlerin dilimlenmesi."""
+    ranges = source_ranges(df, sources)
+    day_range = day_range_from_dates(date_range) if date_range is not None else None
+    if ranges is None or (day_range is not None and not _days_sorted(df, ranges.values())):
+        # Bölümlenmemiş tablolar için eski yol
+        mask = np.ones(len(df), dtype=bool)
+        if sources is not None:
+            mask &= df["sourceName"].isin(sources).to_numpy()
+        if day_range is not None:
+            mask &= ((df["day"] >= day_range[0]) & (df["day"] <= day_range[1])).to_numpy()
+        return df[mask]
+
+    ranges = sorted(ranges.values())
+    if day_range is not None:
+        day = df["day"].to_numpy()
+        ranges = [
+            (a + np.searchsorted(day[a:b], day_range[0], "left"), a + np.searchsorted(day[a:b], day_range[1], "right"))
+            for a, b in ranges
+        ]
+    merged = []
+    for a, b in ranges:
+        if b <= a:
+            continue
+        if merged and merged[-1][1] == a:
+            merged[-1] = (merged[-1][0], b)
+        else:
+            merged.append((a, b))
+    if not merged:
+        return df.iloc[0:0]
+    if len(merged) == 1:
+        return df.iloc[merged[0][0]:merged[0][1]]
+    return pd.concat([df.iloc[a:b] for a, b in merged])
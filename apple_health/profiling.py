@@ -0,0 +1,142 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+from apple_health.memo import _nbytes, compute_cache
+
+# Ortam değişkeniyle açılabilir: HEALTH_PROFILE=1
+PROFILE_ENABLED = os.environ.get("HEALTH_PROFILE", "").lower() in ("1", "true", "yes", "on")
+# Dışa aktarılan iz dosyasında tutulacak en fazla yeniden çalıştırma sayısı
+PROFILE_MAX_RUNS = int(os.environ.get("HEALTH_PROFILE_MAX_RUNS", 20))
+
+# Streamlit her oturumun betiğini kendi iş parçacığında çalıştırır; etkin profilci iş parçacığına özeldir
+_local = threading.local()
+
+
+def _rows(value):
+    # Girdi/çıktıdaki DataFrame ve Series satırlarının toplamı; tablo olmayan değerler sayılmaz
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_rows(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_rows(v) for v in value.values())
+    return 0
+
+
+class Profiler:
+    """Yeniden çalıştırma başına aşama ölçümleri: süre, giren/çıkan satır, önbellek isabet/ıska, bayt.
+
+    Kapalıyken profile_span ve profiled neredeyse maliyetsizdir. Önbellek sayaçları süreç genelindedir;
+    aynı anda çalışan başka oturumlar isabet/ıska farklarına karışabilir.
+    """
+
+    def __init__(self, enabled=PROFILE_ENABLED, cache=compute_cache, max_runs=PROFILE_MAX_RUNS):
+        self.enabled = enabled
+        self.cache = cache
+        self.run = 0
+        self.events = []
+        self.history = deque(maxlen=max_runs)
+        self._origin = time.perf_counter()
+        self._depth = 0
+
+    def start_run(self):
+        """Yeni bir yeniden çalıştırma başlatır; önceki çalıştırmanın ölçümleri iz geçmişine alınır."""
+        if self.events:
+            self.history.append(self.events)
+        self.run += 1
+        self.events = []
+        self._depth = 0
+
+    def activate(self):
+        """Bu iş parçacığındaki profile_span/profiled çağrılarının bu profilciye yazılmasını sağlar."""
+        _local.profiler = self
+        return self
+
+    @contextmanager
+    def span(self, name, kind="compute", rows_in=None):
+        """Bir bloğu ölçer; verilen sözlüğe rows_out ve bytes yazılabilir."""
+        event = {"run": self.run, "name": name, "kind": kind, "depth": self._depth, "rows_in": rows_in,
+                 "rows_out": None, "bytes": None}
+        hits, misses = self.cache.hits, self.cache.misses
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            yield event
+        finally:
+            ended = time.perf_counter()
+            self._depth -= 1
+            event["start_ms"] = (started - self._origin) * 1000
+            event["ms"] = (ended - started) * 1000
+            event["cache_hits"] = self.cache.hits - hits
+            event["cache_misses"] = self.cache.misses - misses
+            self.events.append(event)
+
+    def table(self, events=None):
+        """Ölçümler başlangıç sırasıyla tek tablo olarak."""
+        events = self.events if events is None else events
+        columns = ["run", "name", "kind", "depth", "start_ms", "ms", "rows_in", "rows_out", "cache_hits",
+                   "cache_misses", "bytes"]
+        return pd.DataFrame(sorted(events, key=lambda e: e["start_ms"]), columns=columns)
+
+    def totals(self, events=None):
+        """Ölçüm türüne göre toplamlar; iç içe ölçümler yalnızca en dış düzeyde sayılır."""
+        table = self.table(events)
+        outer = table[table["depth"] == 0]
+        return outer.groupby("kind").agg(
+            count=("ms", "size"), ms=("ms", "sum"), cache_hits=("cache_hits", "sum"),
+            cache_misses=("cache_misses", "sum"), bytes=("bytes", "sum"),
+        ).sort_values("ms", ascending=False).reset_index()
+
+    def trace(self):
+        """Geçmiş ve güncel çalıştırmaların Chrome iz olayı (chrome://tracing, Perfetto) biçimi."""
+        events = []
+        for run_events in [*self.history, self.events]:
+            for e in run_events:
+                events.append({
+                    "name": e["name"], "cat": e["kind"], "ph": "X", "pid": 1, "tid": e["run"],
+                    "ts": e["start_ms"] * 1000, "dur": e["ms"] * 1000,
+                    "args": {k: e[k] for k in ("rows_in", "rows_out", "cache_hits", "cache_misses", "bytes")},
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.trace(), f, ensure_ascii=False)
+        return path
+
+
+def active_profiler():
+    """Bu iş parçacığında etkin ve açık profilci; yoksa None."""
+    profiler = getattr(_local, "profiler", None)
+    return profiler if profiler is not None and profiler.enabled else None
+
+
+def profile_span(name, kind="compute", rows_in=None):
+    """Etkin profilci varsa bloğu ölçer, yoksa None veren boş bağlam döner."""
+    profiler = active_profiler()
+    return profiler.span(name, kind, rows_in) if profiler is not None else nullcontext(None)
+
+
+def profiled(fn=None, kind="compute"):
+    """Fonksiyon çağrılarını etkin profilciye yazar: girdi/çıktı satırları ve sonucun bellekteki boyutu."""
+    if fn is None:
+        return functools.partial(profiled, kind=kind)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profiler = active_profiler()
+        if profiler is None:
+            return fn(*args, **kwargs)
+        with profiler.span(fn.__name__, kind, rows_in=_rows(args) + _rows(kwargs)) as event:
+            result = fn(*args, **kwargs)
+            event["rows_out"] = _rows(result)
+            event["bytes"] = _nbytes(result)
+        return result
+    return wrapper
@@ -0,0 +1,26 @@
+WAITING, READING, READY, FAILED = "waiting", "reading", "ready", "failed"
+
+
+def member_progress(member, size, types):
+    """Tek zip üyesinin okuma ilerlemesi; arka plan iş parçacıkları yerinde günceller."""
+    return {"member": member, "types": list(types), "state": WAITING, "bytes": 0, "size": size, "rows": 0,
+            "error": None}
+
+
+class ProgressReader:
+    """Dosya nesnesini sarar; okunan (açılmış) baytları ve isteğe bağlı olarak satır sonlarını sayar.
+
+    pandas ve expat dosyayı parça parça read() ile okur; sayaçlar ayrıştırma sürerken ilerler.
+    """
+
+    def __init__(self, f, progress, count_lines=True):
+        self.f = f
+        self.progress = progress
+        self.count_lines = count_lines
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.progress["bytes"] += len(data)
+        if self.count_lines:
+            self.progress["rows"] += data.count(b"\n")
+        return data
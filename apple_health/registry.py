@@ -0,0 +1,412 @@
+import json
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from apple_health.cache import load_frame, load_index, store_frame, store_index
+from apple_health.export_xml import find_export_xml, read_export_xml
+from apple_health.incremental import ingest_since, merge_incremental
+from apple_health.ingest import csv_type_name, read_csv_members, read_metric_csv
+from apple_health.memo import frame_fingerprint, register_frame
+from apple_health.profiling import profile_span
+from apple_health.progress import FAILED, READING, READY, ProgressReader, member_progress
+
+# Ortam değişkenleriyle ayarlanabilir: HEALTH_FRAME_CACHE_MAX_BYTES, HEALTH_BACKGROUND_WORKERS
+FRAME_CACHE_MAX_BYTES = int(os.environ.get("HEALTH_FRAME_CACHE_MAX_BYTES", 1024 ** 3))
+BACKGROUND_WORKERS = int(os.environ.get("HEALTH_BACKGROUND_WORKERS", min(4, os.cpu_count() or 1)))
+COUNT_CHUNK = 8 * 1024 * 1024
+
+
+def _count_rows(zip_ref, name):
+    # Satır sayısı için CSV açılır ama ayrıştırılmaz; başlık satırı düşülür
+    lines = 0
+    last = b"\n"
+    with zip_ref.open(name) as f:
+        for chunk in iter(lambda: f.read(COUNT_CHUNK), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def index_zip(zip_ref, count_rows=False):
+    """Zip üyelerinin dizini: {"members": {tip adı: üye bilgisi}, "xml": export.xml üyesi ya da None}.
+
+    CSV'ler varsayılan olarak açılmaz; satır sayıları üye ilk okunduğunda yazılır. count_rows=True ise
+    CSV'ler dizinlemede açılıp satırları sayılır.
+    """
+    members = {}
+    for info in zip_ref.infolist():
+        if not info.filename.endswith(".csv"):
+            continue
+        members[csv_type_name(info.filename)] = {
+            "member": info.filename, "kind": "csv",
+            "compressed": info.compress_size, "size": info.file_size,
+            "rows": _count_rows(zip_ref, info.filename) if count_rows else None,
+        }
+    xml = find_export_xml(zip_ref.namelist())
+    index = {"members": members, "xml": None}
+    if xml is not None:
+        info = zip_ref.getinfo(xml)
+        # Tipler export.xml ilk kez okunduğunda "types" altına yazılır
+        index["xml"] = {"member": xml, "compressed": info.compress_size, "size": info.file_size, "types": None}
+    return index
+
+
+class DatasetRegistry(Mapping):
+    """Yüklenen zip'in tembel tablo sözlüğü.
+
+    Yüklemede yalnızca üyeler dizinlenir; bir tipin tablosu ilk erişimde (disk önbelleğinden, CSV
+    üyesinden ya da export.xml'den) okunur ve bayt sınırlı bir LRU'da tutulur. LRU'dan düşen tablo
+    bir sonraki erişimde aynı parmak iziyle yeniden okunur. load_in_background ile tipler arka planda
+    da okunabilir; aynı tipi isteyen taraf devam eden okumayı bekler, tip iki kez ayrıştırılmaz.
+    """
+
+    def __init__(self, zip_file, key, max_bytes=None, count_rows=False):
+        self.key = key
+        self.max_bytes = max_bytes or FRAME_CACHE_MAX_BYTES
+        self.loads = 0
+        self.evictions = 0
+        self.xml_stats = None
+        self._zip_file = zip_file
+        self._zip_ref = None
+        self._frames = OrderedDict()
+        # Arka plan ve betik iş parçacıkları aynı kaydı kullanır
+        self._lock = threading.RLock()
+        self._running = {}
+        self._read_types = set()
+        self._background = None
+        # Dizin yazımları sırayla yapılır; daha yeni bir anlık görüntü yazıldıysa eskisi atlanır
+        self._index_write = threading.Lock()
+        self._index_version = 0
+        self._index_written = 0
+        self.index = load_index(key)
+        if self.index is None:
+            with profile_span("zip index", "ingest"):
+                self.index = index_zip(self._zip(), count_rows=count_rows)
+            store_index(key, self.index)
+        # Zip üyesi -> okuma ilerlemesi (bayt, satır, durum)
+        self.progress = OrderedDict(
+            (m["member"], member_progress(m["member"], m["size"], [t])) for t, m in self.index["members"].items()
+        )
+        xml = self.index["xml"]
+        if xml is not None:
+            self.progress[xml["member"]] = member_progress(xml["member"], xml["size"], xml["types"] or [])
+
+    def _zip(self):
+        # Tek ZipFile paylaşılır; aynı dosya nesnesi üzerinde ayrı ZipFile'lar eşzamanlı okunursa konumlar karışır
+        with self._lock:
+            if self._zip_ref is None:
+                self._zip_ref = zipfile.ZipFile(self._zip_file)
+            return self._zip_ref
+
+    def _once(self, key, fn):
+        # Aynı iş eşzamanlı istenirse bir kez çalışır; diğer çağıranlar sonucunu bekler
+        with self._lock:
+            future = self._running.get(key)
+            owner = future is None
+            if owner:
+                future = self._running[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._running[key]
+
+    def _xml_types(self, evict=True):
+        xml = self.index["xml"]
+        if xml is None:
+            return {}
+        if xml["types"] is None:
+            # Hangi tiplerin bulunduğu ancak export.xml okununca bilinir
+            self._once(xml["member"], lambda: self._load_xml(evict=evict))
+        return xml["types"]
+
+    def types(self):
+        """Dizindeki tüm tip adları (export.xml tipleri gerekiyorsa XML okunarak)."""
+        return list(self.index["members"]) + [t for t in self._xml_types() if t not in self.index["members"]]
+
+    def __contains__(self, type_name):
+        return type_name in self._frames or type_name in self.index["members"] or type_name in self._xml_types()
+
+    def __iter__(self):
+        return iter(self.types())
+
+    def __len__(self):
+        return len(self.types())
+
+    def __getitem__(self, type_name):
+        with self._lock:
+            df = self._frames.get(type_name)
+            if df is not None:
+                self._frames.move_to_end(type_name)
+                return df
+        if type_name not in self:
+            raise KeyError(type_name)
+        return self._once(type_name, lambda: self._fetch(type_name))
+
+    def _fetch(self, type_name, evict=True):
+        with self._lock:
+            df = self._frames.get(type_name)
+        if df is None:
+            df = self._materialize(type_name)
+            self._put(type_name, df, evict)
+        return df
+
+    def loaded(self):
+        """Şu an bellekte olan tablolar; erişim sırasını değiştirmez."""
+        with self._lock:
+            return dict(self._frames)
+
+    def nbytes(self):
+        with self._lock:
+            return sum(int(df.memory_usage(deep=True).sum()) for df in self._frames.values())
+
+    def _register(self, type_name, df):
+        if frame_fingerprint(df) is None:
+            register_frame(df, f"{self.key}/{type_name}")
+        return df
+
+    def _save_index(self):
+        # Dizin yalnızca kilit altında değişir; JSON anlık görüntüsü kilit altında alınır, dosyaya kilit dışında
+        # yazılır. Böylece eşzamanlı bir değişiklik serileştirmeyi bozamaz
+        with self._lock:
+            self._index_version += 1
+            version = self._index_version
+            text = json.dumps(self.index)
+        with self._index_write:
+            if version > self._index_written:
+                store_index(self.key, text)
+                self._index_written = version
+
+    def _record_sources(self, type_name, df):
+        # Kaynak adları dizine yazılır (kilit altında çağrılır); tablo bellekten düşse de kaynak listesi küçülmez.
+        # Dizin değiştiyse True döner
+        if "sourceName" not in df:
+            return False
+        column = df["sourceName"]
+        names = sorted(str(s) for s in (column.cat.categories if hasattr(column, "cat") else column.dropna().unique()))
+        recorded = self.index.setdefault("sources", {})
+        if recorded.get(type_name) == names:
+            return False
+        recorded[type_name] = names
+        return True
+
+    def sources(self, types):
+        """Verilen tiplerin okunurken kaydedilen kaynak adları (birleşim, sıralı); tablo okumaz."""
+        recorded = self.index.get("sources", {})
+        return sorted({s for type_name in types for s in recorded.get(type_name, [])})
+
+    def _put(self, type_name, df, evict=True):
+        # evict=False: tablo yalnızca yer varsa tutulur (arka plan okuması istenen tabloları çıkarmasın)
+        with self._lock:
+            self._read_types.add(type_name)
+            sources_changed = self._record_sources(type_name, df)
+            if evict or self.nbytes() + int(df.memory_usage(deep=True).sum()) <= self.max_bytes:
+                self._frames[type_name] = self._register(type_name, df)
+                self._frames.move_to_end(type_name)
+                # Son eklenen tablo sınırı tek başına aşsa da tutulur
+                while self.nbytes() > self.max_bytes and len(self._frames) > 1:
+                    self._frames.popitem(last=False)
+                    self.evictions += 1
+        if sources_changed:
+            self._save_index()
+
+    def _materialize(self, type_name):
+        with self._lock:
+            self.loads += 1
+        with profile_span(f"read {type_name}", "ingest") as event:
+            df = self._read(type_name)
+            if event is not None:
+                event["rows_out"] = len(df)
+                event["bytes"] = int(df.memory_usage(deep=False).sum())
+        return df
+
+    def _read(self, type_name):
+        member = self.index["members"].get(type_name)
+        progress = self.progress[member["member"]] if member is not None else None
+        df = load_frame(self.key, type_name)
+        if df is not None:
+            if progress is not None:
+                progress.update(state=READY, bytes=progress["size"], rows=len(df))
+            return df
+        if member is None:
+            return self._once(self.index["xml"]["member"], self._load_xml)[type_name]
+        progress.update(state=READING, bytes=0, rows=0)
+        try:
+            with self._zip().open(member["member"]) as f:
+                df = read_metric_csv(ProgressReader(f, progress))
+        except Exception as exc:
+            progress.update(state=FAILED, error=str(exc))
+            raise
+        progress.update(state=READY, rows=len(df))
+        self._store(type_name, df)
+        with self._lock:
+            counted = member["rows"] is None
+            if counted:
+                member["rows"] = len(df)
+        if counted:
+            self._save_index()
+        return df
+
+    def _store(self, type_name, df):
+        # Disk önbelleğine yazılamaması okumayı bozmaz; tablo bellekte kullanılır, sonraki okumada yeniden yazılır
+        try:
+            store_frame(self.key, type_name, df)
+        except OSError:
+            pass
+
+    def _load_xml(self, since=None, types=None, evict=True):
+        # evict=False: arka plan okuması, bellekte yer yoksa istenen tabloları çıkarmaz (bkz. _put)
+        xml = self.index["xml"]
+        # Artımlı okumanın ilerlemesi tam okumanınkini bozmasın diye ayrı tutulur
+        progress = self.progress[xml["member"]] if types is None else None
+        if progress is not None:
+            progress.update(state=READING, bytes=0, rows=0)
+        try:
+            with profile_span("export.xml", "ingest") as event:
+                frames, self.xml_stats = read_export_xml(
+                    self._zip(), xml["member"], since=since, types=types, progress=progress
+                )
+                if event is not None:
+                    event["rows_out"] = sum(len(df) for df in frames.values())
+        except Exception as exc:
+            if progress is not None:
+                progress.update(state=FAILED, error=str(exc))
+            raise
+        if types is not None:
+            # Artımlı okuma: kısmi tablolar önbelleğe yazılmaz
+            return frames
+        # export.xml tek seferde okunur; tüm tipler diske yazılır, bellekte sınır kadarı kalır
+        with self._lock:
+            xml["types"] = {type_name: len(df) for type_name, df in frames.items()}
+        for type_name, df in frames.items():
+            self._store(type_name, df)
+        self._save_index()
+        for type_name, df in frames.items():
+            if type_name not in self.index["members"] and type_name not in self._frames:
+                self._put(type_name, df, evict=evict)
+        progress.update(state=READY, bytes=progress["size"], types=list(xml["types"]))
+        return frames
+
+    def load_in_background(self, first=(), max_workers=None):
+        """Tüm tipleri arka plan iş parçacıklarında okur ve hemen döner; first'teki tipler önce okunur.
+
+        Okunan tablolar disk önbelleğine yazılır; bellekte LRU sınırı kadarı kalır. İlerleme progress'tedir.
+        """
+        with self._lock:
+            if self._background is not None:
+                return
+            self._background = ThreadPoolExecutor(
+                max_workers=max_workers or BACKGROUND_WORKERS, thread_name_prefix="health-ingest"
+            )
+        members = self.index["members"]
+        order = [t for t in first if t in members] + [t for t in members if t not in first]
+        xml = self.index["xml"]
+        # export.xml tek akıştır; önce okunacak tiplerden biri CSV'de yoksa XML en başa alınır
+        if xml is not None and any(t not in members for t in first):
+            self._background.submit(self._warm_xml)
+        for type_name in order:
+            self._background.submit(self._warm, type_name)
+        if xml is not None and all(t in members for t in first):
+            self._background.submit(self._warm_xml)
+        # Kuyruk bitince iş parçacıkları kendiliğinden kapanır
+        self._background.shutdown(wait=False)
+
+    def _warm(self, type_name):
+        # Arka plan okumasında hatalar yutulur; tip istendiğinde yeniden denenir ve hata orada görünür
+        try:
+            if type_name not in self._frames:
+                self._once(type_name, lambda: self._fetch(type_name, evict=False))
+        except Exception:
+            pass
+
+    def _warm_xml(self):
+        xml = self.index["xml"]
+        progress = self.progress[xml["member"]]
+        try:
+            # Tipler bilinmiyorsa export.xml ayrıştırılır; biliniyorsa tipler disk önbelleğinden okunur
+            for type_name in self._xml_types(evict=False):
+                if type_name not in self.index["members"]:
+                    self._warm(type_name)
+        except Exception:
+            return
+        if progress["state"] != READY:
+            progress.update(state=READY, bytes=progress["size"], rows=sum(xml["types"].values()),
+                            types=list(xml["types"]))
+
+    def cancel_background(self):
+        """Henüz başlamamış arka plan okumalarını iptal eder; süren okuma tamamlanır."""
+        with self._lock:
+            if self._background is not None:
+                self._background.shutdown(wait=False, cancel_futures=True)
+
+    def loading(self):
+        """Arka planda okunmakta ya da sırada bekleyen üye var mı."""
+        return self._background is not None and any(
+            p["state"] not in (READY, FAILED) for p in self.progress.values()
+        )
+
+    def ready(self, types):
+        """Verilen tiplerin hepsi en az bir kez okunmuşsa ya da dışa aktarımda yoksa True; okuma başlatmaz."""
+        xml = self.index["xml"]
+        with self._lock:
+            for type_name in types:
+                if type_name in self._read_types or type_name in self._frames:
+                    continue
+                if type_name in self.index["members"]:
+                    return False
+                if xml is not None and (xml["types"] is None or type_name in xml["types"]):
+                    return False
+        return True
+
+    def absorb(self, previous):
+        """Önceki yüklemede bellekte olan tipleri bu zip'in yalnızca yeni kayıtlarıyla günceller.
+
+        Diğer tipler bu zip'ten tembel okunur. {tip adı: eklenen satırlar} döner.
+        """
+        current = previous.loaded() if isinstance(previous, DatasetRegistry) else dict(previous)
+        since = ingest_since(current)
+        incoming = {}
+        csv_names = [self.index["members"][t]["member"] for t in current if t in self.index["members"]]
+        incoming.update(read_csv_members(self._zip(), csv_names, since=since))
+        xml_types = [t for t in current if t not in self.index["members"]]
+        if self.index["xml"] is not None and xml_types:
+            incoming.update(self._load_xml(since=since, types=set(xml_types)))
+        frames, appended = merge_incremental(current, incoming, since)
+        for type_name, df in frames.items():
+            if type_name in current:
+                self._put(type_name, df)
+        return appended
+
+    def summary(self):
+        """Dizin tablosu için satırlar: tip, üye, boyut, satır sayısı ve bellekte olup olmadığı."""
+        rows = []
+        for type_name, member in self.index["members"].items():
+            rows.append((type_name, member["member"], member["size"], member["rows"]))
+        xml = self.index["xml"]
+        if xml is not None:
+            for type_name, count in (xml["types"] or {}).items():
+                if type_name not in self.index["members"]:
+                    rows.append((type_name, xml["member"], None, count))
+        return [
+            {"Tip": t, "Üye": m, "Boyut (MB)": s / 1024 ** 2 if s is not None else None,
+             "Satır": n, "Bellekte": t in self._frames}
+            for t, m, s, n in rows
+        ]
+
+    def progress_table(self):
+        """Üye başına okuma ilerlemesi: üye, durum, okunan/toplam bayt ve ayrıştırılan satır."""
+        return [dict(p) for p in self.progress.values()]
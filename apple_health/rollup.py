@@ -0,0 +1,121 @@
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from apple_health.compact import frame_nbytes
+from apple_health.memo import frame_fingerprint, frame_identity, register_frame
+
+DAILY_KEYS = ["day", "sourceName"]
+HOURLY_KEYS = ["day", "hour", "sourceName"]
+
+
+def build_rollup(df, keys):
+    """Ham örnekleri anahtar başına sum/mean/min/max/count özetine indirger."""
+    rollup = df.groupby(keys, observed=True)["value"].agg(["sum", "count", "min", "max"]).reset_index()
+    rollup["sum"] = rollup["sum"].astype("float64")
+    rollup["mean"] = rollup["sum"] / rollup["count"]
+    return rollup
+
+
+def merge_rollups(old, new, keys):
+    # Yalnızca yeni satırların düştüğü günler yeniden birleştirilir
+    affected = old["day"].isin(new["day"].unique())
+    touched = (
+        pd.concat([old[affected], new], ignore_index=True)
+        .groupby(keys, observed=True)
+        .agg(sum=("sum", "sum"), count=("count", "sum"), min=("min", "min"), max=("max", "max"))
+        .reset_index()
+    )
+    touched["mean"] = touched["sum"] / touched["count"]
+    return pd.concat([old[~affected], touched], ignore_index=True).sort_values(keys, ignore_index=True)
+
+
+def _select_sources(rollup, sources):
+    if sources is None:
+        return rollup
+    return rollup[rollup["sourceName"].isin(sources)]
+
+
+def daily_totals(rollup, sources=None):
+    """Seçili kaynakların günlük toplamı (gün -> değer)."""
+    return _select_sources(rollup, sources).groupby("day")["sum"].sum()
+
+
+def daily_means(rollup, sources=None):
+    """Seçili kaynakların ham örnek ortalaması (gün -> değer)."""
+    daily = _select_sources(rollup, sources).groupby("day")[["sum", "count"]].sum()
+    return daily["sum"] / daily["count"]
+
+
+class RollupStore:
+    """Her metrik tipi için günlük ve saatlik özet tabloları; yükleme başına bir kez hesaplanır.
+
+    Kaynak tembel bir sözlükse (DatasetRegistry) özetler tipe ilk erişimde çıkarılır; ham tablolar
+    tutulmaz, tipler parmak izleriyle izlenir.
+    """
+
+    def __init__(self):
+        self._daily = {}
+        self._hourly = {}
+        self._identities = {}
+        self._source = {}
+
+    def sync(self, frames):
+        # Bellekteki yeni ya da değiştirilmiş tipler yeniden hesaplanır, kaldırılanlar silinir
+        self._source = frames
+        loaded = frames.loaded() if hasattr(frames, "loaded") else frames
+        for type_name, df in loaded.items():
+            if self._identities.get(type_name) != frame_identity(df):
+                self.replace(type_name, df)
+        for type_name in [t for t in self._identities if t not in frames]:
+            self._identities.pop(type_name)
+            self._daily.pop(type_name, None)
+            self._hourly.pop(type_name, None)
+
+    def replace(self, type_name, df):
+        self._identities[type_name] = frame_identity(df)
+        if "value" not in df or "day" not in df or not is_numeric_dtype(df["value"]):
+            self._daily.pop(type_name, None)
+            self._hourly.pop(type_name, None)
+            return
+        self._daily[type_name] = build_rollup(df, DAILY_KEYS)
+        self._hourly[type_name] = build_rollup(df, HOURLY_KEYS)
+        self._register(type_name, df)
+
+    def append(self, type_name, rows, frame):
+        """Yeni satırları özetlere ekler; frame, satırlar eklenmiş tam DataFrame'dir."""
+        if type_name not in self._daily:
+            self.replace(type_name, frame)
+            return
+        self._identities[type_name] = frame_identity(frame)
+        if rows.empty:
+            return
+        self._daily[type_name] = merge_rollups(self._daily[type_name], build_rollup(rows, DAILY_KEYS), DAILY_KEYS)
+        self._hourly[type_name] = merge_rollups(self._hourly[type_name], build_rollup(rows, HOURLY_KEYS), HOURLY_KEYS)
+        self._register(type_name, frame)
+
+    def _register(self, type_name, df):
+        # Özetler kaynak tablonun parmak iziyle anahtarlanır; önbellekte içerikleri özetlenmez
+        fingerprint = frame_fingerprint(df)
+        if fingerprint is not None:
+            register_frame(self._daily[type_name], (fingerprint, "daily"))
+            register_frame(self._hourly[type_name], (fingerprint, "hourly"))
+
+    def _ensure(self, type_name):
+        # Henüz okunmamış tip kaynaktan istenir; özet çıkarıldıktan sonra ham tablo LRU'dan düşebilir
+        if type_name not in self._identities and type_name in self._source:
+            self.replace(type_name, self._source[type_name])
+
+    def daily(self, type_name):
+        self._ensure(type_name)
+        return self._daily.get(type_name)
+
+    def hourly(self, type_name):
+        self._ensure(type_name)
+        return self._hourly.get(type_name)
+
+    def nbytes(self):
+        return frame_nbytes(list(self._daily.values()) + list(self._hourly.values()))
+
+    def __contains__(self, type_name):
+        self._ensure(type_name)
+        return type_name in self._daily
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+from apple_health.normalize import NS_PER_DAY, NS_PER_HOUR
+from apple_health.partition import select_rows
+
+# Çakışmada öncelik sırası: aynı anı birden çok kaynak farklı evreyle bildirirse ilk evre sayılır
+SLEEP_STAGES = ["AsleepDeep", "AsleepREM", "AsleepCore", "AsleepUnspecified", "Asleep", "Awake", "InBed"]
+ASLEEP_STAGES = [s for s in SLEEP_STAGES if s.startswith("Asleep")]
+SLEEP_STAGE_DTYPE = pd.CategoricalDtype(SLEEP_STAGES)
+SLEEP_PREFIX = "HKCategoryValueSleepAnalysis"
+_STAGE_INDEX = {stage: i for i, stage in enumerate(SLEEP_STAGES)}
+_STAGE_BY_KEY = {stage.lower(): stage for stage in SLEEP_STAGES}
+# Gece, bu saatten ertesi gün aynı saate kadardır; gece uyanılan günün tarihiyle anılır
+NIGHT_BOUNDARY_HOUR = 12
+
+
+def _stage_label(label):
+    # CSV'lerde HealthKit öneki kalmış ya da büyük/küçük harfi farklı evreler kanonik ada eşlenir
+    name = str(label).strip()
+    if name.lower().startswith(SLEEP_PREFIX.lower()):
+        name = name[len(SLEEP_PREFIX):]
+    return _STAGE_BY_KEY.get(name.lower(), name)
+
+
+def encode_stages(col):
+    """Uyku evrelerini sabit sıralı kategoriye çevirir; bilinmeyen evreler sona eklenir.
+
+    Etiketler (önek, büyük/küçük harf) burada bir kez normalleşir; yalnızca kategoriler taranır.
+    """
+    col = col.astype("category") if not isinstance(col.dtype, pd.CategoricalDtype) else col
+    labels = [_stage_label(c) for c in col.cat.categories]
+    categories = SLEEP_STAGES + list(dict.fromkeys(label for label in labels if label not in SLEEP_STAGES))
+    position = {label: i for i, label in enumerate(categories)}
+    # Eksik değerin kodu -1'dir, lookup'ın son elemanına düşer
+    lookup = np.array([position[label] for label in labels] + [-1])
+    codes = pd.Categorical.from_codes(lookup[col.cat.codes.to_numpy()], categories=categories)
+    return pd.Series(codes, index=col.index, name=col.name)
+
+
+def stage_codes(col):
+    """Evre kolonunu SLEEP_STAGES indekslerine çevirir (bilinmeyen: -1); yalnızca kategoriler taranır."""
+    col = col.astype("category") if not isinstance(col.dtype, pd.CategoricalDtype) else col
+    lookup = np.array([_STAGE_INDEX.get(_stage_label(c), -1) for c in col.cat.categories] + [-1])
+    # Eksik değerin kodu -1'dir, lookup'ın son elemanına düşer
+    return lookup[col.cat.codes.to_numpy()].astype(np.int8)
+
+
+def night_keys(start, boundary_hour=NIGHT_BOUNDARY_HOUR):
+    """Başlangıç zamanlarından gece anahtarı (uyanılan günün 1970'ten beri gün sayısı)."""
+    ns = np.asarray(start, dtype="datetime64[ns]").view("i8")
+    return ((ns - boundary_hour * NS_PER_HOUR) // NS_PER_DAY + 1).astype(np.int32)
+
+
+def _segments(night, start, end, stage):
+    # Tüm kaynakların aralıkları gece içinde zamana göre sıralanıp taranır (O(n log n)); ardışık iki
+    # olay arasındaki her parçaya onu kapsayan en öncelikli evre atanır
+    n = len(start)
+    times = np.concatenate([start, end])
+    nights = np.concatenate([night, night])
+    order = np.lexsort((times, nights))
+    times, nights = times[order], nights[order]
+    delta = np.zeros((2 * n, len(SLEEP_STAGES)), dtype=np.int32)
+    rows = np.arange(n)
+    delta[rows, stage] = 1
+    delta[rows + n, stage] = -1
+    coverage = np.cumsum(delta[order], axis=0)[:-1]
+    length = np.diff(times)
+    covered = coverage > 0
+    keep = (nights[1:] == nights[:-1]) & (length > 0) & covered.any(axis=1)
+    return nights[:-1][keep], times[:-1][keep], times[1:][keep], covered[keep].argmax(axis=1)
+
+
+def sleep_nights(df, sources=None, boundary_hour=NIGHT_BOUNDARY_HOUR):
+    """Kaynaklar arası çakışan uyku aralıklarını gece başına birleştirir.
+
+    Her gece için yatakta geçen süre (tüm aralıkların birleşimi), uyku süresi, evre dağılımı
+    (saat), uykuya dalma süresi (dakika) ve uyku verimliliği döner. Aynı anı bildiren kaynaklar
+    tek sayılır; evre çakışmalarında SLEEP_STAGES sırası geçerlidir.
+    """
+    df = select_rows(df, sources)
+    stage = stage_codes(df["sleep_type"])
+    known = stage >= 0
+    start = df["startDate"].to_numpy().view("i8")[known]
+    end = df["endDate"].to_numpy().view("i8")[known]
+    stage = stage[known]
+    valid = end > start
+    start, end, stage = start[valid], end[valid], stage[valid]
+    columns = ["day", "weekday", "bed_start", "sleep_start", "sleep_end", "in_bed_hours", "asleep_hours",
+               "latency_minutes", "efficiency", *SLEEP_STAGES]
+    if not len(start):
+        return pd.DataFrame(columns=columns)
+
+    night, seg_start, seg_end, seg_stage = _segments(night_keys(start.view("datetime64[ns]"), boundary_hour),
+                                                     start, end, stage)
+    hours = (seg_end - seg_start) / NS_PER_HOUR
+    asleep = seg_stage < len(ASLEEP_STAGES)
+    nights, index = np.unique(night, return_inverse=True)
+    k = len(nights)
+
+    by_stage = np.zeros((k, len(SLEEP_STAGES)))
+    np.add.at(by_stage, (index, seg_stage), hours)
+    bed_start = np.full(k, np.iinfo(np.int64).max)
+    np.minimum.at(bed_start, index, seg_start)
+    sleep_start = np.full(k, np.iinfo(np.int64).max)
+    np.minimum.at(sleep_start, index[asleep], seg_start[asleep])
+    sleep_end = np.full(k, np.iinfo(np.int64).min)
+    np.maximum.at(sleep_end, index[asleep], seg_end[asleep])
+
+    slept = sleep_end > np.iinfo(np.int64).min
+    in_bed = by_stage.sum(axis=1)
+    asleep_hours = by_stage[:, :len(ASLEEP_STAGES)].sum(axis=1)
+    result = pd.DataFrame({
+        "day": nights.astype(np.int32),
+        # 1970-01-01 Perşembe (3) gününe denk gelir
+        "weekday": ((nights.astype(np.int64) + 3) % 7).astype(np.int8),
+        "bed_start": bed_start.view("datetime64[ns]"),
+        "sleep_start": np.where(slept, sleep_start, np.iinfo(np.int64).min).view("datetime64[ns]"),
+        "sleep_end": np.where(slept, sleep_end, np.iinfo(np.int64).min).view("datetime64[ns]"),
+        "in_bed_hours": in_bed,
+        "asleep_hours": asleep_hours,
+        "latency_minutes": np.where(slept, (sleep_start - bed_start) / (60 * 1e9), np.nan),
+        "efficiency": asleep_hours / in_bed,
+    })
+    for j, name in enumerate(SLEEP_STAGES):
+        result[name] = by_stage[:, j]
+    return result
+
+
+def stage_totals(nights, stages=None):
+    """Gecelerin evre sütunlarını evre başına toplam saate indirger (büyükten küçüğe)."""
+    stages = stages or ASLEEP_STAGES
+    totals = nights[stages].sum()
+    totals = totals[totals > 0].sort_values(ascending=False)
+    return totals.rename_axis("sleep_type").reset_index(name="value")
@@ -0,0 +1,99 @@
+import pandas as pd
+
+from apple_health.dedup import deduplicate_sources
+from apple_health.normalize import day_dates, group_values
+from apple_health.rollup import DAILY_KEYS, build_rollup, daily_means
+from apple_health.sleep import sleep_nights
+
+# Günlük tablo kolonu -> (tip adı, birleştirme); "sum" kaynak önceliğiyle tekilleştirilir,
+# "mean" tüm kaynakların ham örnek ortalamasıdır (panel özet tablolarıyla aynı)
+DAILY_METRICS = {
+    "steps": ("StepCount", "sum"),
+    "distance_km": ("DistanceWalkingRunner", "sum"),
+    "active_energy_kcal": ("ActiveEnergyBurned", "sum"),
+    "basal_energy_kcal": ("BasalEnergyBurned", "sum"),
+    "heart_rate_bpm": ("HeartRate", "mean"),
+    "walking_speed_kmh": ("WalkingSpeed", "mean"),
+}
+# Genel Bakış sayfasındaki metrikler: özet adı -> günlük tablo kolonu
+SUMMARY_METRICS = {
+    "heart_rate_bpm": "heart_rate_bpm",
+    "steps_per_day": "steps",
+    "calories_per_day": "total_energy_kcal",
+    "sleep_hours": "sleep_hours",
+    "walking_speed_kmh": "walking_speed_kmh",
+}
+
+
+def deduplicated_daily(df, priority=None, agg="sum"):
+    """Kaynak önceliğiyle tekilleştirilmiş günlük seri (date, value)."""
+    return group_values(deduplicate_sources(df, priority), "date", agg, by=())
+
+
+def combine_energy(active_daily, basal_daily):
+    """Günlük aktif ve bazal enerji tablolarını toplam enerjiye birleştirir (date, active, basal, value)."""
+    total = pd.merge(
+        active_daily.rename(columns={"value": "active"}),
+        basal_daily.rename(columns={"value": "basal"}),
+        on="date",
+        how="outer"
+    )
+    total["value"] = total["active"].fillna(0) + total["basal"].fillna(0)
+    return total
+
+
+def _daily_series(df, agg, priority):
+    if agg == "sum":
+        daily = deduplicated_daily(df, priority)
+        return pd.Series(daily["value"].to_numpy(dtype="float64"), index=daily["date"])
+    means = daily_means(build_rollup(df, DAILY_KEYS))
+    return pd.Series(means.to_numpy(), index=day_dates(means.index))
+
+
+def daily_metrics(frames, priority=None):
+    """Panelin kullandığı günlük değerler: gün başına bir satır, metrik başına bir kolon.
+
+    frames yalnızca gereken tipleri okunan bir sözlük ya da DatasetRegistry olabilir.
+    """
+    columns = {}
+    for name, (type_name, agg) in DAILY_METRICS.items():
+        if type_name in frames:
+            columns[name] = _daily_series(frames[type_name], agg, priority)
+    if "active_energy_kcal" in columns and "basal_energy_kcal" in columns:
+        energy = pd.concat([columns["active_energy_kcal"], columns["basal_energy_kcal"]], axis=1)
+        columns["total_energy_kcal"] = energy.sum(axis=1, min_count=1)
+    if "SleepAnalysis" in frames:
+        nights = sleep_nights(frames["SleepAnalysis"])
+        columns["sleep_hours"] = pd.Series(nights["asleep_hours"].to_numpy(), index=day_dates(nights["day"]))
+    daily = pd.DataFrame(columns)
+    daily.index.name = "date"
+    return daily.sort_index().reset_index()
+
+
+def summary_metrics(daily):
+    """Genel Bakış metrikleri: günlük değerlerin ortalaması; veri yoksa None."""
+    summary = {}
+    for name, column in SUMMARY_METRICS.items():
+        value = daily[column].mean() if column in daily else None
+        summary[name] = None if value is None or pd.isna(value) else float(value)
+    summary["days"] = int(len(daily))
+    return summary
+
+
+def rollup_table(frames, types=None):
+    """Tüm (ya da verilen) sayısal tiplerin günlük kaynak özetlerini tek uzun tabloda birleştirir."""
+    pieces = []
+    for type_name in types or list(frames):
+        df = frames[type_name]
+        if "value" not in df or "day" not in df or not pd.api.types.is_numeric_dtype(df["value"]):
+            continue
+        rollup = build_rollup(df, DAILY_KEYS)
+        rollup.insert(0, "type", type_name)
+        rollup["sourceName"] = rollup["sourceName"].astype(str)
+        pieces.append(rollup)
+    if not pieces:
+        return pd.DataFrame(columns=["type", "date", "sourceName", "sum", "count", "min", "max", "mean"])
+    table = pd.concat(pieces, ignore_index=True)
+    table.insert(1, "date", day_dates(table.pop("day")))
+    table["type"] = table["type"].astype("category")
+    return table
@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from apple_health.cache import content_key
+from apple_health.progress import FAILED
+from apple_health.registry import DatasetRegistry
+from apple_health.summary import daily_metrics
+
+# Ortam değişkenleriyle ayarlanabilir: HEALTH_WORKSPACE_WORKERS, HEALTH_UPLOAD_DIR, HEALTH_UPLOAD_MAX_BYTES,
+# HEALTH_WORKSPACE_MAX_JOBS
+WORKSPACE_WORKERS = int(os.environ.get("HEALTH_WORKSPACE_WORKERS", min(4, os.cpu_count() or 1)))
+# Yüklenen zip'ler süreçlere yol olarak verilir; disk önbelleği dizininin dışında tutulur ki LRU silmesine girmesin
+UPLOAD_DIR = os.environ.get("HEALTH_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "health_dashboard_uploads"))
+UPLOAD_MAX_BYTES = int(os.environ.get("HEALTH_UPLOAD_MAX_BYTES", 4 * 1024 ** 3))
+# Paylaşımlı önbellekte tutulacak en fazla tamamlanmış iş; günlük tablolar dışa aktarım başına birkaç yüz KB'dır
+WORKSPACE_MAX_JOBS = int(os.environ.get("HEALTH_WORKSPACE_MAX_JOBS", 256))
+
+PENDING, RUNNING, DONE = "pending", "running", "done"
+
+# Süreç geneli: tüm oturumlar aynı havuzu ve aynı iş tablosunu kullanır
+_lock = threading.Lock()
+_pool = None
+# (içerik anahtarı, kaynak önceliği) -> Future; aynı dışa aktarımı açan oturumlar aynı işi bekler
+_jobs = OrderedDict()
+
+
+def ingest_export(path, key, priority=None):
+    """Süreç havuzunda çalışır: dışa aktarımı okur ve günlük değer tablosunu (daily_metrics) döndürür.
+
+    Okunan tablolar disk önbelleğine yazılır; aynı zip sonradan panelde açıldığında yeniden ayrıştırılmaz.
+    """
+    with open(path, "rb") as f:
+        return daily_metrics(DatasetRegistry(f, key), priority)
+
+
+def shared_pool():
+    """Süreç geneli işçi havuzu; ilk kullanımda açılır, çöken havuz yenisiyle değiştirilir."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            # Streamlit sunucusu çok iş parçacıklıdır; fork yerine spawn ile temiz süreçler başlatılır
+            _pool = ProcessPoolExecutor(max_workers=WORKSPACE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _lock:
+        _pool = None
+
+
+def store_upload(fileobj, key, upload_dir=None, max_bytes=None):
+    """Yüklenen zip'i içerik anahtarıyla adlandırılmış dosyaya yazar (varsa yeniden yazmaz); yolu döndürür.
+
+    Dizin max_bytes'ı (varsayılan UPLOAD_MAX_BYTES) aşarsa en uzun süredir kullanılmayan zip'ler silinir.
+    """
+    upload_dir = upload_dir or UPLOAD_DIR
+    os.makedirs(upload_dir, exist_ok=True)
+    path = os.path.join(upload_dir, key + ".zip")
+    try:
+        # Kullanım zamanı güncellenir; LRU silmesi en eski zip'ten başlar
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+    fd, staging = tempfile.mkstemp(prefix=".staging-", dir=upload_dir)
+    with os.fdopen(fd, "wb") as f:
+        fileobj.seek(0)
+        for chunk in iter(lambda: fileobj.read(8 * 1024 * 1024), b""):
+            f.write(chunk)
+    fileobj.seek(0)
+    os.replace(staging, path)
+    prune_uploads(UPLOAD_MAX_BYTES if max_bytes is None else max_bytes, upload_dir, keep=[path])
+    return path
+
+
+def prune_uploads(max_bytes, upload_dir=None, keep=()):
+    """Toplam boyut sınırı aşılırsa en uzun süredir kullanılmayan zip'leri siler.
+
+    keep'teki yollar ve okuması sürmekte ya da sırada bekleyen işlerin zip'leri silinmez.
+    """
+    upload_dir = upload_dir or UPLOAD_DIR
+    with _lock:
+        busy = {key for (key, _), future in _jobs.items() if not future.done()}
+    keep = {os.path.abspath(p) for p in keep}
+    entries = []
+    for entry in os.scandir(upload_dir):
+        if entry.name.startswith(".staging-") or not entry.name.endswith(".zip"):
+            continue
+        try:
+            entries.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+        except FileNotFoundError:
+            # Eşzamanlı bir silme zip'i zaten kaldırmış
+            continue
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep or os.path.basename(path).removesuffix(".zip") in busy:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def submit_export(path, key, priority=None, retry=False):
+    """Dışa aktarımı havuza gönderir; aynı (anahtar, öncelik) için çalışan ya da biten iş yeniden kullanılır.
+
+    Hata veren iş yalnızca retry ile yeniden gönderilir.
+    """
+    job = (key, tuple(priority) if priority is not None else None)
+    with _lock:
+        future = _jobs.get(job)
+        if future is not None and not (retry and future.done() and future.exception() is not None):
+            _jobs.move_to_end(job)
+            return future
+    try:
+        future = shared_pool().submit(ingest_export, path, key, priority)
+    except BrokenProcessPool:
+        _reset_pool()
+        future = shared_pool().submit(ingest_export, path, key, priority)
+    with _lock:
+        _jobs[job] = future
+        done = [k for k, f in _jobs.items() if f.done()]
+        for k in done[:max(len(_jobs) - WORKSPACE_MAX_JOBS, 0)]:
+            del _jobs[k]
+    return future
+
+
+def job_status(future):
+    if future.running():
+        return RUNNING
+    if not future.done():
+        return PENDING
+    return FAILED if future.exception() is not None else DONE
+
+
+def shared_stats():
+    """Paylaşımlı önbellek: iş sayıları ve tamamlanan günlük tabloların toplam boyutu."""
+    with _lock:
+        futures = list(_jobs.values())
+    statuses = [job_status(f) for f in futures]
+    nbytes = sum(
+        int(f.result().memory_usage(deep=True).sum()) for f, s in zip(futures, statuses) if s == DONE
+    )
+    return {"jobs": len(futures), "done": statuses.count(DONE), "bytes": nbytes}
+
+
+class Workspace:
+    """Bir oturumda karşılaştırılan dışa aktarımlar: üye adı -> içerik anahtarı.
+
+    Oturum yalnızca adları ve anahtarları tutar. Zip'ler süreç havuzunda okunur; günlük tablolar süreç
+    genelindeki iş tablosunda tek kopyadır, böylece bellek izleyici sayısıyla değil dışa aktarım sayısıyla büyür.
+    """
+
+    def __init__(self, priority=None):
+        self.priority = priority
+        self.members = OrderedDict()
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def __len__(self):
+        return len(self.members)
+
+    def add(self, name, fileobj):
+        """Zip'i çalışma alanına ekler ve okumayı başlatır; verilen ad kullanılıyorsa numaralanır.
+
+        Aynı içerik zaten ekliyse yeni üye açılmaz; üyenin adı döner.
+        """
+        key = content_key(fileobj)
+        for existing, member in self.members.items():
+            if member["key"] == key:
+                submit_export(member["path"], key, self.priority, retry=True)
+                return existing
+        base, n = name, 2
+        while name in self.members:
+            name, n = f"{base} ({n})", n + 1
+        path = store_upload(fileobj, key)
+        self.members[name] = {"key": key, "path": path}
+        submit_export(path, key, self.priority, retry=True)
+        return name
+
+    def remove(self, name):
+        self.members.pop(name, None)
+
+    def clear(self):
+        self.members.clear()
+
+    def _future(self, name):
+        member = self.members[name]
+        return submit_export(member["path"], member["key"], self.priority)
+
+    def status(self):
+        """{üye: (durum, hata iletisi ya da None)}."""
+        result = {}
+        for name in self.members:
+            future = self._future(name)
+            state = job_status(future)
+            result[name] = (state, str(future.exception()) if state == FAILED else None)
+        return result
+
+    def pending(self):
+        return any(state in (PENDING, RUNNING) for state, _ in self.status().values())
+
+    def dailies(self):
+        """Okuması bitmiş üyelerin günlük tabloları, ekleme sırasıyla; beklemez."""
+        ready = {}
+        for name in self.members:
+            future = self._future(name)
+            if job_status(future) == DONE:
+                ready[name] = future.result()
+        return ready
@@ -2,8 +2,19 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import zipfile
-import io
+import json
+import time
+
+from apple_health import (
+    ASLEEP_STAGES, BOUT_METRICS, DEFAULT_MAX_HR, DONE, FAILED, HOME_TZ, MIN_BOUT_MINUTES, NIGHT_BOUNDARY_HOUR, PENDING,
+    PROFILE_ENABLED, READING, READY, RUNNING, ZONE_BOUNDS, ZONE_COLUMNS, DatasetRegistry, HeartRateEngine, Profiler,
+    RollupStore, Workspace, bout_summary, build_daily_matrix, cohort_summary, cohort_table, cohort_trend,
+    combine_energy, compute_cache, content_key, corr_frame, daily_means, daily_totals, day_dates, day_range_from_dates,
+    deduplicated_daily, detect_bouts, dow_labels, downsample, frame_fingerprint, frame_nbytes, group_values,
+    intraday_heart_rate, lagged_corr, pairwise_corr, partition_by_source, preferred_source, profile_span, profiled,
+    register_frame, rolling_corr, select_rows, shared_stats, sleep_nights, source_priority, stage_totals,
+    strongest_lags, workout_bouts,
+)
 
 
 st.set_page_config(
@@ -11,51 +22,423 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-tab1, tab2, tab3, tab4, tab5= st.tabs([ "Genel Bakış :compass:","Aktivite Sayfası :woman-running:", "Kalp & Vucüt Sağlığı :anatomical_heart:", "Uyku Sayfası :sleeping:", "İlişkisel Analiz 📊"])
+# Sayfa -> alt görünümler. st.tabs her yeniden çalıştırmada tüm sekmeleri çalıştırır; burada yalnızca
+# seçili görünümün hesap ve grafik kodu çalışır
+PAGES = {
+    "Genel Bakış :compass:": [],
+    "Aktivite Sayfası :woman-running:": [
+        "Adım Sayısı", "Yürüme Mesafesi", "Yürüme Hızı / Adım Uzunluğu", "Antrenmanlar & Yürüyüşler"
+    ],
+    "Kalp & Vucüt Sağlığı :anatomical_heart:": [
+        "Nabız", "Kilo & Boy", "Kalori", "VO2Max", "HRV", "Solunum", "Yürüyüş Kalp Yükü"
+    ],
+    "Uyku Sayfası :sleeping:": [],
+    "İlişkisel Analiz 📊": [],
+    "Karşılaştırma 👥": [],
+}
+OVERVIEW, ACTIVITY, HEALTH, SLEEP, RELATIONS, COHORT = PAGES
+SUBPAGE_KEYS = {ACTIVITY: "activity_view", HEALTH: "health_view"}
+# Genel Bakış bu tipler okununca çizilir; arka plan okuması bunlarla başlar
+OVERVIEW_TYPES = ["StepCount", "HeartRate", "ActiveEnergyBurned", "BasalEnergyBurned", "SleepAnalysis", "WalkingSpeed"]
+# Arka plan okuması sürerken ilerleme bölümleri bu aralıkla kendini yeniler
+PROGRESS_REFRESH_SECONDS = 1
+# Görünüm -> seçimleri sayfa değişiminde korunacak widget anahtarları
+VIEW_STATE_KEYS = {
+    (ACTIVITY, "Adım Sayısı"): ["selected_sources", "view_mode"],
+    (ACTIVITY, "Yürüme Mesafesi"): ["dw_selected_sources", "dw_view_mode"],
+    (ACTIVITY, "Yürüme Hızı / Adım Uzunluğu"): ["wl_selected_sources", "wl_view_mode"],
+    (ACTIVITY, "Antrenmanlar & Yürüyüşler"): ["bout_origin", "bout_min_minutes"],
+    (HEALTH, "Nabız"): ["hr_selected_sources", "hr_view", "hr_max", "hr_day"],
+    (HEALTH, "Kilo & Boy"): ["bm_sources", "bm_view_mode"],
+    (HEALTH, "Kalori"): ["energy_selected_sources", "energy_view_mode"],
+    (SLEEP, None): ["sleep_sources", "sleep_view", "sleep_boundary"],
+    (RELATIONS, None): ["correlation_multiselect", "correlation_mode"],
+    (COHORT, None): ["cohort_metric"],
+}
+
+
+def current_view():
+    page = st.session_state.get("page", OVERVIEW)
+    subpages = PAGES[page]
+    return page, st.session_state.get(SUBPAGE_KEYS[page], subpages[0]) if subpages else None
+
+
+def keep_widget_state(active):
+    # Streamlit çizilmeyen widget'ların durumunu siler; diğer görünümlerin seçimleri yeniden yazılarak
+    # korunur. Açık görünümün anahtarlarına dokunulmaz, yoksa varsayılan değer uyarısı çıkar
+    for view, keys in VIEW_STATE_KEYS.items():
+        if view == active:
+            continue
+        for key in keys:
+            if key in st.session_state:
+                st.session_state[key] = st.session_state[key]
+    for page, key in SUBPAGE_KEYS.items():
+        if page != active[0] and key in st.session_state:
+            st.session_state[key] = st.session_state[key]
+
+
+def show_ingest_progress(registry, polling, types=None):
+    # Üye başına açılmış bayt ve ayrıştırılan satır; types verilirse yalnızca o tiplerin üyeleri
+    if polling and not registry.loading():
+        # Okuma bitti; sayfa yenilenip otomatik yenileme kapatılır
+        st.rerun()
+    members = [
+        p for p in registry.progress_table()
+        if types is None or not p["types"] or any(t in types for t in p["types"])
+    ]
+    done = sum(p["bytes"] for p in members)
+    total = sum(p["size"] for p in members) or 1
+    ready = sum(p["state"] == READY for p in members)
+    st.progress(min(done / total, 1.0), text=f"{ready} / {len(members)} üye okundu · {done / 1024 ** 2:,.1f} MB")
+    for p in members:
+        if p["state"] == READING:
+            name = ", ".join(p["types"]) or p["member"]
+            st.progress(
+                min(p["bytes"] / (p["size"] or 1), 1.0),
+                text=f"{name}: {p['bytes'] / 1024 ** 2:,.1f} / {p['size'] / 1024 ** 2:,.1f} MB · {p['rows']:,} satır"
+            )
+        elif p["state"] == FAILED:
+            st.error(f"{p['member']} okunamadı: {p['error']}")
+
+
+keep_widget_state(current_view())
+page = st.radio("Sayfa", list(PAGES), horizontal=True, key="page", label_visibility="collapsed")
+# Profil ölçümü kenar çubuğundan ya da HEALTH_PROFILE=1 ile açılır; ölçümler yeniden çalıştırma başına tutulur
+profiler = st.session_state.setdefault("profiler", Profiler())
+profiler.enabled = st.session_state.get("profiling", PROFILE_ENABLED)
+profiler.start_run()
+profiler.activate()
 
 with st.sidebar:
     st.sidebar.title("Veri Yükle")
     zip_file = st.sidebar.file_uploader("Verileri zip formatında yükleyiniz." ,type="zip")
     if zip_file is not None:
-        if "uploaded_data" not in st.session_state:
-            st.session_state.uploaded_data = {}
         if "last_uploaded_zip" not in  st.session_state or st.session_state.last_uploaded_zip != zip_file:
-            with zipfile.ZipFile(zip_file) as z:
-                file_names = z.namelist()
-                st.write("Zip içerisindeki dosyalar:", file_names)
-                for name in file_names:
-                    if name.endswith(".csv"):
-                        type_name = name.replace(".csv", "")  # örn: "StepCount"
-                        with z.open(name) as f:
-                            df = pd.read_csv(f)
-                            st.session_state.uploaded_data[type_name] = df
+            zip_key = content_key(zip_file)
+            previous = st.session_state.get("uploaded_data")
+            # Yüklemede yalnızca zip üyeleri dizinlenir; tipler sekmeler istedikçe okunur (önce disk önbelleği)
+            registry = DatasetRegistry(zip_file, zip_key)
+            if isinstance(previous, DatasetRegistry):
+                previous.cancel_background()
+            if previous is not None:
+                # Önceki yüklemede okunmuş tiplere yalnızca yeni kayıtlar eklenir
+                with profile_span("absorb", "ingest"):
+                    appended = registry.absorb(previous)
+                st.session_state.pending_rows = appended
+                st.write(f"Artımlı yükleme: {sum(len(rows) for rows in appended.values()):,} yeni kayıt", sorted(appended))
+            # Tipler arka planda okunur (önce Genel Bakış tipleri); arayüz okuma bitmeden çizilir
+            registry.load_in_background(first=OVERVIEW_TYPES)
+            st.session_state.uploaded_data = registry
             st.session_state.last_uploaded_zip = zip_file
+            st.session_state.zip_key = zip_key
+        registry = st.session_state.uploaded_data
+        if isinstance(registry, DatasetRegistry):
+            if registry.loading():
+                st.fragment(show_ingest_progress, run_every=PROGRESS_REFRESH_SECONDS)(registry, True)
+            with st.expander("Zip dizini"):
+                st.dataframe(pd.DataFrame(registry.summary()), hide_index=True, use_container_width=True)
+                st.caption(f"{registry.loads} tablo okundu · {registry.evictions} tablo bellekten çıkarıldı")
+                st.caption(
+                    f"Gün sınırları: {HOME_TZ} yerel saati" if HOME_TZ
+                    else "Gün sınırları: her kaydın kendi yerel saati"
+                )
+                stats = registry.xml_stats
+                if stats is not None:
+                    st.caption(
+                        f"export.xml: {stats['records']:,} kayıt, {stats['workouts']:,} antrenman, "
+                        f"{stats['skipped']:,} eski kayıt atlandı, "
+                        f"{stats['seconds']:.1f} sn ({stats['records_per_sec']:,.0f} kayıt/sn)"
+                    )
     else:
         st.write("Lütfen zip dosyası yükleyiniz.")
-if "uploaded_data" not in st.session_state or not st.session_state.uploaded_data:
-    st.warning("Lütfen analiz yapmadan önce zip dosyası yükleyin.")
-    st.stop()
+    st.toggle("Profil ölçümü", value=PROFILE_ENABLED, key="profiling")
 # Grafikler
 height = 176
 custom_colors =  ["#fd7f6f", "#7eb0d5", "#b2e061", "#bd7ebe", "#ffb55a", "#ffee65", "#beb9db", "#fdcce5", "#8bd3c7"]
+downsample_methods = {"LTTB": "lttb", "Min-Max": "minmax"}
+
+
+def plotly_chart(fig):
+    # Profil açıkken Plotly serileştirmesi ve grafiğin gönderimi ayrı ölçülür; serileştirilmiş boyut (bayt)
+    # döner, profil kapalıyken grafik fazladan serileştirilmez ve None döner
+    name = fig.layout.title.text or "grafik"
+    payload = None
+    with profile_span(f"to_json {name}", "serialize") as event:
+        if event is not None:
+            payload = event["bytes"] = len(fig.to_json().encode())
+            # Pasta gibi x ekseni olmayan izler sayılmaz
+            event["rows_out"] = sum(len(x) for x in (getattr(trace, "x", None) for trace in fig.data) if x is not None)
+    with profile_span(name, "chart"):
+        st.plotly_chart(fig, use_container_width=True)
+    return payload
+
+
+def loaded_frames(data):
+    # Tembel kayıtta yalnızca bellekteki tablolar; düz sözlükte hepsi
+    return data.loaded() if isinstance(data, DatasetRegistry) else data
+
+
+# Karşılaştırma metrikleri: etiket -> günlük tablo (daily_metrics) kolonu
+COHORT_METRICS = {
+    "Adım Sayısı": "steps",
+    "Nabız (BPM)": "heart_rate_bpm",
+    "Uyku Süresi (saat)": "sleep_hours",
+    "Toplam Enerji (kcal)": "total_energy_kcal",
+    "Yürüme Hızı (km/h)": "walking_speed_kmh",
+    "Yürünen Mesafe (km)": "distance_km",
+}
+COHORT_STATUS = {PENDING: "Sırada", RUNNING: "Okunuyor", DONE: "Hazır", FAILED: "Hata"}
+# Okuma sürerken karşılaştırma bölümü bu aralıkla kendini yeniler; sayfanın geri kalanı beklemez
+COHORT_REFRESH_SECONDS = 2
+
+
+@profiled
+@compute_cache.memoize
+def get_cohort_table(dailies):
+    return cohort_table(dailies)
+
+@profiled
+@compute_cache.memoize
+def get_cohort_summary(table):
+    return cohort_summary(table)
+
+@profiled
+@compute_cache.memoize
+def get_cohort_trend(table, column):
+    return cohort_trend(table, column)
+
+def plot_cohort_distribution(table, column, label):
+    fig = px.box(
+        table, x="member", y=column, color="member",
+        labels={"member": "Üye", column: label},
+        title=f"Günlük {label} Dağılımı",
+        color_discrete_sequence=custom_colors
+    )
+    fig.update_layout(showlegend=False)
+    plotly_chart(fig)
+
+def plot_cohort_average(summary, column, label):
+    fig = px.bar(
+        summary, x="member", y=column, color="member",
+        labels={"member": "Üye", column: label},
+        title=f"Ortalama {label}",
+        color_discrete_sequence=custom_colors
+    )
+    fig.update_layout(showlegend=False)
+    plotly_chart(fig)
 
+def plot_cohort_trend(trend, label):
+    fig = px.line(
+        trend, x="date", y="value", color="member", markers=True,
+        labels={"date": "Hafta", "value": label, "member": "Üye"},
+        title=f"Haftalık Ortalama {label}",
+        color_discrete_sequence=custom_colors
+    )
+    plotly_chart(fig)
+
+def render_cohort_views(workspace, polling):
+    status = workspace.status()
+    pending = any(state in (PENDING, RUNNING) for state, _ in status.values())
+    if polling and not pending:
+        # Son okuma bitti; sayfa yenilenip otomatik yenileme kapatılır
+        st.rerun()
+    st.dataframe(
+        pd.DataFrame([
+            {"Üye": name, "Durum": COHORT_STATUS[state], "Hata": error} for name, (state, error) in status.items()
+        ]),
+        hide_index=True, use_container_width=True
+    )
+    shared = shared_stats()
+    st.caption(
+        f"Paylaşımlı önbellek (tüm oturumlar): {shared['done']} / {shared['jobs']} dışa aktarım hazır · "
+        f"{shared['bytes'] / 1024 ** 2:,.1f} MB günlük tablo"
+    )
+    dailies = workspace.dailies()
+    if not dailies:
+        st.info("Dışa aktarımlar arka planda okunuyor; hazır olanlar burada görünecek.")
+        return
+
+    table = get_cohort_table(dailies)
+    summary = get_cohort_summary(table)
+    st.subheader("Üye Özeti")
+    st.dataframe(
+        summary.rename(columns={
+            "member": "Üye", "days": "Gün", "steps": "Adım", "heart_rate_bpm": "Nabız (BPM)",
+            "total_energy_kcal": "Enerji (kcal)", "sleep_hours": "Uyku (saat)", "walking_speed_kmh": "Hız (km/h)",
+            "steps_p25": "Adım %25", "steps_p50": "Adım medyan", "steps_p75": "Adım %75",
+        }),
+        hide_index=True, use_container_width=True
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        if "heart_rate_bpm" in summary:
+            plot_cohort_average(summary, "heart_rate_bpm", "Nabız (BPM)")
+    with col2:
+        if "sleep_hours" in summary:
+            plot_cohort_average(summary, "sleep_hours", "Uyku Süresi (saat)")
+
+    available = [label for label, column in COHORT_METRICS.items() if column in table]
+    if not available:
+        return
+    label = st.selectbox("Metrik", available, key="cohort_metric")
+    plot_cohort_distribution(table, COHORT_METRICS[label], label)
+    plot_cohort_trend(get_cohort_trend(table, COHORT_METRICS[label]), label)
+
+def render_cohort():
+    # Dışa aktarımlar süreç havuzunda okunur; oturum yalnızca üye adlarını ve içerik anahtarlarını tutar
+    # Kaynak önceliği kenar çubuğundaki seçimdir; değişirse işler yeni öncelikle yeniden gönderilir
+    priority = st.session_state.get("source_priority")
+    workspace = st.session_state.setdefault("workspace", Workspace(priority))
+    workspace.priority = priority
+    # Temizlemede yükleyici anahtarı değiştirilir; Streamlit yükleyicinin dosyalarını koddan silmeye izin vermez
+    generation = st.session_state.setdefault("cohort_generation", 0)
+    files = st.file_uploader(
+        "Karşılaştırılacak dışa aktarımlar (zip)", type="zip", accept_multiple_files=True,
+        key=f"cohort_files_{generation}",
+    )
+    # Üyeler yükleyicideki dosyalarla eşlenir: dosya kimliği -> üye adı (aynı içerik tek üyedir)
+    members = st.session_state.setdefault("cohort_file_ids", {})
+    current = {f.file_id: f for f in files or []}
+    for file_id in [i for i in members if i not in current]:
+        name = members.pop(file_id)
+        if name not in members.values():
+            workspace.remove(name)
+    for file_id, f in current.items():
+        if file_id not in members:
+            members[file_id] = workspace.add(f.name.removesuffix(".zip"), f)
+    if not len(workspace):
+        st.info("Karşılaştırma için bir ya da daha fazla zip dosyası yükleyiniz.")
+        return
+    if st.button("Çalışma alanını temizle"):
+        workspace.clear()
+        members.clear()
+        st.session_state.cohort_generation = generation + 1
+        st.rerun()
+    polling = workspace.pending()
+    st.fragment(render_cohort_views, run_every=COHORT_REFRESH_SECONDS if polling else None)(workspace, polling)
+
+
+if page == COHORT:
+    # Karşılaştırma sayfası oturumun kendi yüklemesinden bağımsızdır; kenar çubuğundaki kaynak önceliği
+    # burada çizilmez, seçim yeniden yazılarak korunur (bkz. keep_widget_state)
+    if "source_priority" in st.session_state:
+        st.session_state.source_priority = st.session_state.source_priority
+    render_cohort()
+    st.stop()
+if st.session_state.get("uploaded_data") is None:
+    st.warning("Lütfen analiz yapmadan önce zip dosyası yükleyin.")
+    st.stop()
+# Yüklenen tablolar önbellek anahtarlarında içerikleri yerine (veri kümesi, sürüm) ile temsil edilir;
+# DatasetRegistry bunu tablo okunurken kendisi yapar
+for type_name, df in list(loaded_frames(st.session_state.uploaded_data).items()):
+    if frame_fingerprint(df) is None:
+        # Kaynak filtreleri satır aralığı dilimlemesiyle çalışsın diye tablo kaynağa göre sıralı tutulur
+        with profile_span(f"partition {type_name}", "ingest", rows_in=len(df)):
+            df = st.session_state.uploaded_data[type_name] = partition_by_source(df)
+        register_frame(df, f"{st.session_state.get('zip_key', id(df))}/{type_name}")
+# Yeni yüklenen ya da değişen metrik tipleri için günlük/saatlik özetler bir kez hesaplanır;
+# henüz okunmamış tiplerin özetleri ilk istendiklerinde çıkarılır
+if "rollups" not in st.session_state:
+    st.session_state.rollups = RollupStore()
+rollups = st.session_state.rollups
+with profile_span("rollups", "ingest"):
+    for type_name, rows in st.session_state.pop("pending_rows", {}).items():
+        rollups.append(type_name, rows, st.session_state.uploaded_data[type_name])
+    rollups.sync(st.session_state.uploaded_data)
+# Gün içi nabız analizi gün gün önbelleklenir; tarih aralığı genişledikçe yalnızca yeni günler hesaplanır
+if "heart_rate" not in st.session_state:
+    st.session_state.heart_rate = HeartRateEngine()
+# Kaynak önceliği bu birikimli tiplerin kaynaklarından seçilir; aynı anı bildiren kaynaklar tek sayılır
+PRIORITY_TYPES = ["StepCount", "DistanceWalkingRunner", "ActiveEnergyBurned", "BasalEnergyBurned"]
+
+def priority_sources(data):
+    # Tembel kayıtta kaynaklar tip okunurken dizine yazılan adlardır; bellekten düşen tablo listeyi küçültmez
+    if isinstance(data, DatasetRegistry):
+        for type_name in PRIORITY_TYPES:
+            if type_name in data and not data.ready([type_name]):
+                data[type_name]
+        return data.sources(PRIORITY_TYPES)
+    return sorted({
+        source
+        for type_name in PRIORITY_TYPES if type_name in data
+        for source in data[type_name]["sourceName"].cat.categories
+    })
 
-@st.cache_data
-def get_step_grouped_data(df, x_column):
-    df = df.copy()
-    if x_column == "dow":
-        ordered_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        df["dow"] = pd.Categorical(df["dow"], categories=ordered_days, ordered=True)
-    elif x_column == "month_name":
-        ordered_months = [
-            "January", "February", "March", "April", "May", "June",
-            "July", "August", "September", "October", "November", "December"
-        ]
-        df["month_name"] = pd.Categorical(df["month_name"], categories=ordered_months, ordered=True)
 
-    return df.groupby([x_column, "sourceName"])["value"].sum().reset_index()
+with st.sidebar:
+    # Zaman serisi grafiklerinde iz başına gönderilecek en fazla nokta grafik genişliği kadardır
+    st.number_input("Grafik genişliği (piksel)", min_value=300, max_value=4000, value=1200, step=100, key="chart_width")
+    st.selectbox("Örnekleme yöntemi", list(downsample_methods), key="downsample_method")
+    data = st.session_state.uploaded_data
+    if isinstance(data, DatasetRegistry) and data.loading() and not data.ready(PRIORITY_TYPES):
+        # Seçenekler değişirse Streamlit widget'ı yeniden kurar ve seçilen sıra kaybolur; liste tamamlanınca çizilir
+        st.caption("Kaynak önceliği, kaynaklar okununca seçilebilir.")
+        if "source_priority" in st.session_state:
+            st.session_state.source_priority = st.session_state.source_priority
+    else:
+        priority_options = priority_sources(data)
+        # Seçim sırası önceliktir; seçilmeyen kaynaklar sona (önce saatler) eklenir
+        st.multiselect(
+            "Kaynak önceliği", priority_options, default=source_priority(priority_options), key="source_priority"
+        )
+    cache_stats = compute_cache.stats()
+    st.caption(
+        f"Hesap önbelleği: {cache_stats['hits']:,} isabet / {cache_stats['misses']:,} ıska · "
+        f"{cache_stats['entries']} kayıt · {cache_stats['bytes'] / 1024 ** 2:,.1f} MB"
+    )
+    # Oturuma ait bellek: şu an bellekte olan tablolar ve onlardan türetilen özetler
+    st.caption(
+        f"Oturum belleği: {frame_nbytes(loaded_frames(st.session_state.uploaded_data).values()) / 1024 ** 2:,.1f} MB veri · "
+        f"{rollups.nbytes() / 1024 ** 2:,.1f} MB özet"
+    )
+
+
+def reduce_points(df, x, y, color=None):
+    df = df.sort_values(x)
+    return downsample(
+        df, x, y,
+        max_points=st.session_state.chart_width,
+        method=downsample_methods[st.session_state.downsample_method],
+        group=color
+    )
+
+def show_chart(fig, n_points):
+    payload = plotly_chart(fig)
+    sent = sum(len(trace.x) for trace in fig.data if trace.x is not None)
+    caption = f"{sent:,} / {n_points:,} nokta gönderildi"
+    # Boyut yalnızca profil açıkken (grafik zaten ölçüm için serileştirildiğinde) gösterilir
+    if payload is not None:
+        payload_kb = payload / 1024
+        full_kb = payload_kb * n_points / sent if sent else payload_kb
+        caption += f" · {payload_kb:,.0f} KB (örneklemesiz ~{full_kb:,.0f} KB)"
+    st.caption(caption)
+
+def date_window(dates, key):
+    # Aralık daraltıldıkça örnekleme aynı piksel bütçesini daha kısa bir döneme harcar
+    min_dt = pd.Timestamp(dates.min()).to_pydatetime()
+    max_dt = pd.Timestamp(dates.max()).to_pydatetime()
+    if min_dt >= max_dt:
+        return min_dt, max_dt
+    return st.slider(
+        "Tarih Aralığı",
+        min_value=min_dt,
+        max_value=max_dt,
+        value=(min_dt, max_dt),
+        format="YYYY-MM-DD",
+        key=key
+    )
+
+
+@profiled
+@compute_cache.memoize
+def get_step_grouped_data(df, x_column, sources=None, date_range=None):
+    # Gruplama tamsayı anahtar kolonu üzerinde yapılır, gün/ay adları yalnızca sonuca eklenir
+    return group_values(select_rows(df, sources, date_range), x_column, "sum")
 
 def plot_step_chart(grouped_df, x_column, title="Adım Verisi"):
+    n_points = len(grouped_df)
+    if x_column == "date":
+        grouped_df = reduce_points(grouped_df, "date", "value", color="sourceName")
     fig = px.line(
         grouped_df,
         x=x_column,
@@ -70,40 +453,16 @@ def plot_step_chart(grouped_df, x_column, title="Adım Verisi"):
         color_discrete_sequence=custom_colors,
     )
     fig.update_traces(mode="lines+markers")
-    st.plotly_chart(fig, use_container_width=True)
-
-@st.cache_data
-def get_grouped_distance(df, group_col):
-    df = df.copy()
-    df["startDate"] = pd.to_datetime(df["startDate"])
-
-    if group_col == "dow":
-        df["dow"] = df["startDate"].dt.day_name()
-        df["dow"] = pd.Categorical(
-            df["dow"],
-            categories=["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
-            ordered=True
-        )
-    elif group_col == "month_name":
-        df["month_name"] = df["startDate"].dt.strftime("%B")
-        df["month_name"] = pd.Categorical(
-            df["month_name"],
-            categories=[
-                "January", "February", "March", "April", "May", "June",
-                "July", "August", "September", "October", "November", "December"
-            ],
-            ordered=True
-        )
-    elif group_col == "year":
-        df["year"] = df["startDate"].dt.year
-    elif group_col == "hour":
-        df["hour"] = df["startDate"].dt.hour
-    elif group_col == "date":
-        df["date"] = df["startDate"].dt.date
+    if x_column == "date":
+        show_chart(fig, n_points)
     else:
-        raise ValueError(f"'{group_col}' desteklenmeyen bir grup kolonudur.")
+        plotly_chart(fig)
+
+@profiled
+@compute_cache.memoize
+def get_grouped_distance(df, sources, group_col):
+    return group_values(select_rows(df, sources), group_col, "sum")
 
-    return df.groupby([group_col, "sourceName"])["value"].sum().reset_index()
 
 def plot_monthly_distance(df_grouped):
     fig = px.bar(
@@ -117,7 +476,7 @@ def plot_monthly_distance(df_grouped):
         color_discrete_sequence=custom_colors
     )
     fig.update_layout(xaxis_tickangle=-45)
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
 
 def plot_daily_distance(df_grouped):
     fig = px.line(
@@ -131,7 +490,7 @@ def plot_daily_distance(df_grouped):
         color_discrete_sequence=custom_colors
     )
     fig.update_layout(xaxis_title="Tarih", yaxis_title="Mesafe")
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
 
 def plot_dow_distance(grouped_df):
     fig = px.bar(
@@ -145,24 +504,32 @@ def plot_dow_distance(grouped_df):
         color_discrete_sequence=custom_colors
     )
     fig.update_layout(xaxis_tickangle=-45)
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
 
 
-@st.cache_data
-def get_metric_grouped(df, group_col):
-    df = df.copy()
-    df["startDate"] = pd.to_datetime(df["startDate"])
+def daily_source_means(daily):
+    # Özet tablosunun yalnızca üç kolonu okunur
+    return pd.DataFrame({
+        "date": day_dates(daily["day"].to_numpy()),
+        "sourceName": daily["sourceName"].to_numpy(),
+        "value": daily["mean"].to_numpy(),
+    })
+
+@profiled
+@compute_cache.memoize
+def get_metric_grouped(rollup, sources, group_col):
+    daily = rollup[rollup["sourceName"].isin(sources)]
 
     if group_col == "date":
-        df["date"] = df["startDate"].dt.date
-        return df.groupby(["date", "sourceName"])["value"].mean().reset_index()
+        return daily_source_means(daily)
 
     elif group_col == "dow":
-        df["dow"] = df["startDate"].dt.day_name()
-        df["dow"] = pd.Categorical(df["dow"], categories=[
-            "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"
-        ], ordered=True)
-        return df.groupby(["dow", "sourceName"])["value"].mean().reset_index()
+        # Günlük toplam ve sayılar haftanın gününe göre birleştirilerek ham ortalama elde edilir
+        weekday = ((daily["day"] + 3) % 7).rename("weekday")
+        grouped = daily.groupby([weekday, "sourceName"], observed=True)[["sum", "count"]].sum()
+        value = (grouped["sum"] / grouped["count"]).rename("value").reset_index()
+        value.insert(0, "dow", dow_labels(value.pop("weekday")))
+        return value
 
     else:
         raise ValueError("Desteklenmeyen grup kolon adı.")
@@ -179,7 +546,7 @@ def plot_speed_daily(df_grouped):
     )
     fig.update_traces(mode="lines+markers")
     fig.update_layout(hovermode="x unified")
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
 
 def plot_speed_by_dow(df_grouped):
     fig = px.bar(
@@ -192,7 +559,7 @@ def plot_speed_by_dow(df_grouped):
         color_discrete_sequence=custom_colors
     )
     fig.update_layout(xaxis_title="Gün", yaxis_title="Hız (km/h)")
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
 
 def plot_step_length_daily(df_grouped):
     fig = px.line(
@@ -205,18 +572,69 @@ def plot_step_length_daily(df_grouped):
         color_discrete_sequence=custom_colors
     )
     fig.update_layout(xaxis_title="Tarih", yaxis_title="Adım Uzunluğu (cm)")
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
+
+# Bout: tek bir antrenman ya da kesintisiz yürüyüş/koşu aralığı
+BOUT_TYPES = sorted({type_name for type_name, _ in BOUT_METRICS.values()})
+ACTIVITY_LABELS = {"Walking": "Yürüyüş", "Running": "Koşu", "Cycling": "Bisiklet", "Hiking": "Doğa Yürüyüşü"}
+
+@profiled
+@compute_cache.memoize
+def get_workout_bouts(workouts):
+    return workout_bouts(workouts)
+
+@profiled
+@compute_cache.memoize
+def get_detected_bouts(steps, speed, min_minutes):
+    # Tempo ya da hız eşiğini aşan aralıklar kısa boşluklar kapatılarak birleştirilir
+    return detect_bouts(steps, speed, min_minutes=min_minutes)
+
+@profiled
+@compute_cache.memoize
+def get_bout_summary(bouts, frames, priority):
+    # Örnekler bout'lara ikili aramayla bağlanır; çapraz birleştirme yapılmaz
+    summary = bout_summary(bouts, frames, priority)
+    summary["activity"] = summary["activity"].map(lambda a: ACTIVITY_LABELS.get(a, a))
+    return summary
+
+def plot_bout_scatter(summary):
+    # Yoğunluk ekseni verisi olan ilk kolondur; adım yoksa tempo kolonu hiç oluşmaz
+    intensity = ["heart_rate_bpm", "cadence", "walking_speed_kmh"]
+    y = next((c for c in intensity if c in summary and summary[c].notna().any()), None)
+    if y is None:
+        return
+    fig = px.scatter(
+        summary.assign(size=summary.get("active_energy_kcal", pd.Series(1.0, index=summary.index)).fillna(0)),
+        x="minutes", y=y, color="activity", size="size", hover_data=["start"],
+        title="Bout Süresi ve Yoğunluğu",
+        labels={"minutes": "Süre (dk)", "heart_rate_bpm": "Ortalama Nabız (BPM)", "cadence": "Tempo (adım/dk)",
+                "walking_speed_kmh": "Ortalama Hız (km/h)", "activity": "Etkinlik", "size": "Aktif Enerji (kcal)",
+                "start": "Başlangıç"},
+        color_discrete_sequence=custom_colors
+    )
+    plotly_chart(fig)
 
-@st.cache_data
-def get_heart_rate_grouped(df):
-    df = df.copy()
-    df["startDate"] = pd.to_datetime(df["startDate"])
-    df["date"] = df["startDate"].dt.date
-    return df.groupby(["date", "sourceName"])["value"].mean().reset_index()
+def plot_daily_bout_minutes(summary):
+    daily = summary.groupby(["day", "activity"])["minutes"].sum().reset_index()
+    daily.insert(0, "date", day_dates(daily.pop("day").to_numpy()))
+    fig = px.bar(
+        daily, x="date", y="minutes", color="activity",
+        title="Günlük Antrenman / Yürüyüş Süresi",
+        labels={"date": "Tarih", "minutes": "Süre (dk)", "activity": "Etkinlik"},
+        color_discrete_sequence=custom_colors
+    )
+    fig.update_layout(barmode="stack")
+    plotly_chart(fig)
+
+@profiled
+@compute_cache.memoize
+def get_heart_rate_grouped(rollup, sources):
+    return daily_source_means(rollup[rollup["sourceName"].isin(sources)])
 
 def plot_heart_rate_daily(df_grouped):
+    n_points = len(df_grouped)
     fig = px.line(
-        df_grouped,
+        reduce_points(df_grouped, "date", "value", color="sourceName"),
         x="date",
         y="value",
         color="sourceName",
@@ -226,14 +644,78 @@ def plot_heart_rate_daily(df_grouped):
         labels={"value": "BPM", "date": "Tarih", "sourceName": "Kaynak"}
     )
     fig.update_layout(xaxis_title="Tarih", yaxis_title="BPM", hovermode="x unified")
-    st.plotly_chart(fig, use_container_width=True)
-
-@st.cache_data
-def get_weight_monthly_avg(df):
-    df = df.copy()
-    df["startDate"] = pd.to_datetime(df["startDate"], errors="coerce")
-    df["month"] = df["startDate"].dt.month
-    df = df.sort_values("startDate")
+    show_chart(fig, n_points)
+
+def zone_labels(max_hr):
+    # Bölge kolonu -> "Bölge 2 (114-133 BPM)" gibi etiketler
+    bounds = [round(b * max_hr) for b in ZONE_BOUNDS]
+    labels = {ZONE_COLUMNS[0]: f"Dinlenme (<{bounds[0]} BPM)"}
+    for i, lo in enumerate(bounds, start=1):
+        hi = bounds[i] if i < len(bounds) else None
+        labels[ZONE_COLUMNS[i]] = f"Bölge {i} ({lo}-{hi} BPM)" if hi else f"Bölge {i} (≥{lo} BPM)"
+    return labels
+
+@profiled
+def get_heart_rate_days(df, sources, date_range, max_hr):
+    # Motor kendi gün önbelleğini tutar; tarih aralığı genişletildiğinde yalnızca yeni günler taranır
+    return st.session_state.heart_rate.daily(df, sources, day_range_from_dates(date_range), max_hr)
+
+@profiled
+@compute_cache.memoize
+def get_intraday_heart_rate(df, day, sources, max_hr):
+    return intraday_heart_rate(df, day, sources, max_hr)
+
+def plot_heart_rate_zones(days, max_hr):
+    labels = zone_labels(max_hr)
+    zones = days[["day", *ZONE_COLUMNS]].melt(id_vars="day", var_name="zone", value_name="minutes")
+    zones.insert(0, "date", day_dates(zones.pop("day").to_numpy()))
+    zones["zone"] = zones["zone"].map(labels)
+    fig = px.bar(
+        zones, x="date", y="minutes", color="zone",
+        title="Günlük Nabız Bölgelerinde Geçen Süre",
+        labels={"date": "Tarih", "minutes": "Süre (dk)", "zone": "Bölge"},
+        category_orders={"zone": list(labels.values())},
+        color_discrete_sequence=custom_colors
+    )
+    fig.update_layout(barmode="stack", hovermode="x unified")
+    plotly_chart(fig)
+
+def plot_resting_baseline(days):
+    dates = day_dates(days["day"].to_numpy())
+    anomalies = days["anomaly"].to_numpy()
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=dates, y=days["resting_bpm"], mode="lines+markers", name="Dinlenme Nabzı"))
+    fig.add_trace(go.Scatter(x=dates, y=days["baseline_bpm"], mode="lines", name="Taban", line=dict(dash="dash")))
+    fig.add_trace(go.Scatter(
+        x=dates[anomalies], y=days["resting_bpm"][anomalies], mode="markers", name="Anomali",
+        marker=dict(color="#d62728", size=11, symbol="x")
+    ))
+    fig.update_layout(
+        title="Dinlenme Nabzı ve Kayan Taban", xaxis_title="Tarih", yaxis_title="BPM", hovermode="x unified"
+    )
+    plotly_chart(fig)
+
+def plot_intraday_heart_rate(samples, max_hr):
+    labels = zone_labels(max_hr)
+    samples = samples.assign(zone=[labels[ZONE_COLUMNS[z]] for z in samples["zone"]])
+    fig = px.scatter(
+        samples, x="time", y="value", color="zone",
+        title="Gün İçi Nabız",
+        labels={"time": "Saat", "value": "BPM", "zone": "Bölge"},
+        category_orders={"zone": list(labels.values())},
+        color_discrete_sequence=custom_colors
+    )
+    spikes = samples[samples["spike"]]
+    fig.add_trace(go.Scatter(
+        x=spikes["time"], y=spikes["value"], mode="markers", name="Sıçrama",
+        marker=dict(color="#d62728", size=12, symbol="x-open")
+    ))
+    plotly_chart(fig)
+
+@profiled
+@compute_cache.memoize
+def get_weight_monthly_avg(df, sources):
+    df = select_rows(df, sources)
     return df.groupby("month")["value"].mean().reset_index()
 
 def plot_weight_by_month(grouped):
@@ -243,14 +725,15 @@ def plot_weight_by_month(grouped):
         color_discrete_sequence=custom_colors
     )
     fig.update_layout(xaxis_title="Ay", yaxis_title="Kilo (kg)")
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
 
-@st.cache_data
-def calculate_bmi(df, height):
-    df = df.copy()
-    df["BMI"] = df["value"] / ((height / 100) ** 2)
-    df["date"] = pd.to_datetime(df["startDate"]).dt.date
-    return df
+@profiled
+@compute_cache.memoize
+def calculate_bmi(df, sources, height):
+    df = select_rows(df, sources)
+    bmi = pd.DataFrame({"date": day_dates(df["day"].to_numpy()), "BMI": df["value"].to_numpy() / ((height / 100) ** 2)})
+    # Tablo kaynağa göre bölümlü; çizgi grafiği için kronolojik sıra
+    return bmi.sort_values("date", kind="stable")
 
 def plot_bmi_line(df):
     fig = px.line(
@@ -259,27 +742,27 @@ def plot_bmi_line(df):
         color_discrete_sequence=custom_colors
     )
     fig.update_layout(xaxis_title="Tarih", yaxis_title="BMI")
-    st.plotly_chart(fig, use_container_width=True)
-
-@st.cache_data
-def get_daily_total_energy(active_df, basal_df):
-    active_df = active_df.copy()
-    basal_df = basal_df.copy()
-    active_df["startDate"] = pd.to_datetime(active_df["startDate"], errors="coerce")
-    basal_df["startDate"] = pd.to_datetime(basal_df["startDate"], errors="coerce")
-
-    active_daily = active_df.groupby(active_df["startDate"].dt.date)["value"].sum().reset_index(name="Aktif Kalori")
-    basal_daily = basal_df.groupby(basal_df["startDate"].dt.date)["value"].sum().reset_index(name="Bazal Kalori")
-
-    combined = pd.merge(active_daily, basal_daily, on="startDate", how="outer").fillna(0)
+    plotly_chart(fig)
+
+@profiled
+@compute_cache.memoize
+def get_daily_total_energy(active_rollup, basal_rollup, sources):
+    combined = pd.concat(
+        {"Aktif Kalori": daily_totals(active_rollup, sources), "Bazal Kalori": daily_totals(basal_rollup, sources)},
+        axis=1,
+    ).fillna(0).sort_index()
     combined["Toplam Kalori"] = combined["Aktif Kalori"] + combined["Bazal Kalori"]
-    return combined.sort_values("startDate")
+    combined["startDate"] = day_dates(combined.index)
+    return combined.reset_index()
 
 def plot_daily_total_energy(combined):
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=combined["startDate"], y=combined["Aktif Kalori"], mode="lines+markers", name="Aktif Kalori"))
-    fig.add_trace(go.Scatter(x=combined["startDate"], y=combined["Bazal Kalori"], mode="lines+markers", name="Bazal Kalori"))
-    fig.add_trace(go.Scatter(x=combined["startDate"], y=combined["Toplam Kalori"], mode="lines+markers", name="Toplam Kalori", line=dict(width=3, dash="dash")))
+    active = reduce_points(combined, "startDate", "Aktif Kalori")
+    basal = reduce_points(combined, "startDate", "Bazal Kalori")
+    total = reduce_points(combined, "startDate", "Toplam Kalori")
+    fig.add_trace(go.Scatter(x=active["startDate"], y=active["Aktif Kalori"], mode="lines+markers", name="Aktif Kalori"))
+    fig.add_trace(go.Scatter(x=basal["startDate"], y=basal["Bazal Kalori"], mode="lines+markers", name="Bazal Kalori"))
+    fig.add_trace(go.Scatter(x=total["startDate"], y=total["Toplam Kalori"], mode="lines+markers", name="Toplam Kalori", line=dict(width=3, dash="dash")))
 
     fig.update_layout(
         title="🔥 Günlük Toplam Kalori Harcaması",
@@ -288,17 +771,12 @@ def plot_daily_total_energy(combined):
         hovermode="x unified",
         template="plotly_white"
     )
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(fig, 3 * len(combined))
 
-@st.cache_data
-def get_active_energy_by_dow(df):
-    df = df.copy()
-    df["startDate"] = pd.to_datetime(df["startDate"], errors="coerce")
-    df["dow"] = df["startDate"].dt.day_name()
-    df["dow"] = pd.Categorical(df["dow"], categories=[
-        "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"
-    ], ordered=True)
-    return df.groupby("dow")["value"].mean().reset_index()
+@profiled
+@compute_cache.memoize
+def get_active_energy_by_dow(df, sources):
+    return group_values(select_rows(df, sources), "dow", "mean", by=())
 
 def plot_active_energy_by_dow(grouped_df):
     fig = px.bar(
@@ -310,35 +788,44 @@ def plot_active_energy_by_dow(grouped_df):
         color_discrete_sequence=custom_colors
     )
     fig.update_layout(xaxis_title="Gün", yaxis_title="Ortalama Kalori (kcal)")
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
 
 
-def plot_vo2max(df):
-    df["date"] = pd.to_datetime(df["startDate"], errors="coerce").dt.date
-    vo2_avg = df.groupby("date")["value"].mean().reset_index()
+def plot_vo2max(rollup):
+    vo2_avg = daily_means(rollup).reset_index(name="value")
+    vo2_avg["date"] = day_dates(vo2_avg["day"])
     fig = px.line(vo2_avg, x="date", y="value", title="VO2Max Zaman Serisi", labels={"value": "VO2Max", "date": "Tarih"})
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
 
-def plot_single_metric(df, title, label):
-    df["date"] = pd.to_datetime(df["startDate"], errors="coerce").dt.date
-    daily = df.groupby("date")["value"].mean().reset_index()
+def plot_single_metric(rollup, title, label):
+    daily = daily_means(rollup).reset_index(name="value")
+    daily["date"] = day_dates(daily["day"])
     fig = px.line(daily, x="date", y="value", title=f"{title}", labels={"value": label, "date": "Tarih"})
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
 
 
-@st.cache_data
-def get_sleep_metrics(df):
-    # sadece uyku segmentlerini al
-    asleep_df = df[df["sleep_type"].str.contains("Asleep", case=False)]
-    asleep_df["value"] = asleep_df["sleep_duration_hours"]  # sistemle uyumlu hale getiriyoruz
-    sleep_by_day = asleep_df.groupby(["date", "dow"])["value"].sum().reset_index()
-    avg_by_dow = sleep_by_day.groupby("dow")["value"].mean().reset_index()
-    sleep_type_dist = (
-        asleep_df.groupby("sleep_type")["value"]
-        .sum()
-        .sort_values(ascending=False)
-        .reset_index()
-    )
+@profiled
+@compute_cache.memoize
+def get_deduplicated_daily(df, priority, agg="sum"):
+    # Kaynaklar arası çakışmalar öncelik sırasıyla çözülür, tek günlük seri döner
+    return deduplicated_daily(df, priority, agg)
+
+@profiled
+def get_preferred_daily(df, priority, agg="mean"):
+    # Ortalama gibi birikimli olmayan ölçümlerde en öncelikli kaynağın serisi kullanılır
+    return normalize_metric_df(df, agg, source=preferred_source(df, priority))
+
+@profiled
+@compute_cache.memoize
+def get_sleep_nights(df, sources=None, boundary_hour=NIGHT_BOUNDARY_HOUR):
+    # Kaynaklar arası çakışan aralıklar gece başına bir kez birleştirilir; sayfalar bu tabloyu paylaşır
+    return sleep_nights(df, sources, boundary_hour)
+
+@profiled
+def get_sleep_metrics(nights):
+    avg_by_dow = nights.groupby("weekday")["asleep_hours"].mean().reset_index(name="value")
+    avg_by_dow.insert(0, "dow", dow_labels(avg_by_dow.pop("weekday")))
+    sleep_type_dist = stage_totals(nights)
 
     return avg_by_dow, sleep_type_dist
 
@@ -357,7 +844,26 @@ def plot_avg_sleep_by_dow(avg_by_dow):
         labels={"dow": "Gün", "value": "Ortalama Uyku (saat)"},
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
+
+def plot_sleep_nights(nights):
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Ortalama Uyku", f"{nights['asleep_hours'].mean():.2f} saat")
+    col2.metric("Uyku Verimliliği", f"%{nights['efficiency'].mean() * 100:.0f}")
+    col3.metric("Uykuya Dalma Süresi", f"{nights['latency_minutes'].mean():.0f} dk")
+    stages = nights[["day", *ASLEEP_STAGES]].melt(id_vars="day", var_name="sleep_type", value_name="value")
+    stages = stages[stages["value"] > 0]
+    stages.insert(0, "date", day_dates(stages.pop("day")))
+    fig = px.bar(
+        stages,
+        x="date",
+        y="value",
+        color="sleep_type",
+        title="Gece Başına Uyku Evreleri",
+        labels={"date": "Gece", "value": "Süre (saat)", "sleep_type": "Evre"},
+        color_discrete_sequence=custom_colors
+    )
+    plotly_chart(fig)
 
 def plot_sleep_type_pie(df_grouped):
     fig = px.pie(
@@ -367,41 +873,41 @@ def plot_sleep_type_pie(df_grouped):
         title="Uyku Evrelerine Göre Dağılım",
         color_discrete_sequence=custom_colors
     )
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig)
 
 
 
-@st.cache_data
-def normalize_date(df):
-    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.tz_localize(None).dt.floor("D")
-    return df
+def total_energy_daily(active_df, basal_df, priority):
+    # Genel Bakış metrikleri apple_health.summary ile aynı fonksiyonlardan hesaplanır (CLI ile aynı sayılar)
+    return combine_energy(get_deduplicated_daily(active_df, priority), get_deduplicated_daily(basal_df, priority))
 
+def sleep_hours_daily(sleep_df):
+    # Gece, uyanılan günün değeri olarak diğer metriklerle aynı gün eksenine oturur
+    return get_sleep_nights(sleep_df)[["day", "asleep_hours"]].rename(columns={"asleep_hours": "value"})
+
+def wait_for_overview(registry):
+    if registry.ready(OVERVIEW_TYPES) or not registry.loading():
+        st.rerun()
+    show_ingest_progress(registry, False, OVERVIEW_TYPES)
 
 def render_dashboard():
-    if "uploaded_data" not in st.session_state:
-        st.session_state["uploaded_data"] = {}
-
-    step_df = st.session_state.get("step_count")
-    if step_df is not None:
-        step_df = step_df[step_df["sourceName"] == "Ali Haydar Akca’s iPhone"]
-    heart_df = normalize_date(st.session_state.uploaded_data.get("HeartRate")) if st.session_state.uploaded_data.get("HeartRate") is not None else None
-    active_df = normalize_date(st.session_state.uploaded_data.get("ActiveEnergyBurned")) if st.session_state.uploaded_data.get("ActiveEnergyBurned") is not None else None
-    basal_df = normalize_date(st.session_state.uploaded_data.get("BasalEnergyBurned")) if st.session_state.uploaded_data.get("BasalEnergyBurned") is not None else None
-    sleep_df = normalize_date(st.session_state.uploaded_data.get("SleepAnalysis")) if st.session_state.uploaded_data.get("SleepAnalysis") is not None else None
-    if sleep_df is not None:
-        sleep_df = sleep_df[sleep_df["sourceName"] == "Ali Haydar Akca’s iPhone"]
-    speed_df = normalize_date(st.session_state.uploaded_data.get("WalkingSpeed")) if st.session_state.uploaded_data.get("WalkingSpeed") is not None else None
-
-    step_avg = step_df.groupby("date")["value"].sum().mean() if step_df is not None else 0
-    heart_rate_mean = heart_df.groupby("date")["value"].mean().mean() if heart_df is not None else 0
-    sleep_avg = sleep_df.groupby("date")["sleep_duration_hours"].sum().mean() if sleep_df is not None else 0
-    speed_avg = speed_df.groupby("date")["value"].mean().mean() if speed_df is not None else 0
-
-    if active_df is not None and basal_df is not None:
-        active_daily = active_df.groupby("date")["value"].sum()
-        basal_daily = basal_df.groupby("date")["value"].sum()
-        total_daily = active_daily.add(basal_daily, fill_value=0)
-        avg_daily_calories = total_daily.mean()
+    # Ortalamalar özet tablolarından, toplamlar kaynak önceliğiyle tekilleştirilmiş serilerden okunur
+    data = st.session_state.uploaded_data
+    priority = st.session_state.get("source_priority")
+    heart_rollup = rollups.daily("HeartRate")
+    sleep_df = data.get("SleepAnalysis")
+    sleep_nights_df = get_sleep_nights(sleep_df) if sleep_df is not None else None
+    speed_rollup = rollups.daily("WalkingSpeed")
+
+    step_daily = get_deduplicated_daily(data["StepCount"], priority) if "StepCount" in data else None
+    step_avg = step_daily["value"].mean() if step_daily is not None else 0
+    heart_rate_mean = daily_means(heart_rollup).mean() if heart_rollup is not None else 0
+    sleep_avg = sleep_nights_df["asleep_hours"].mean() if sleep_nights_df is not None and len(sleep_nights_df) else 0
+    speed_avg = daily_means(speed_rollup).mean() if speed_rollup is not None else 0
+
+    if "ActiveEnergyBurned" in data and "BasalEnergyBurned" in data:
+        total_daily = total_energy_daily(data["ActiveEnergyBurned"], data["BasalEnergyBurned"], priority)
+        avg_daily_calories = total_daily["value"].mean()
     else:
         avg_daily_calories = 0
 
@@ -416,53 +922,117 @@ def render_dashboard():
     col5.metric("🚶 Ortalama Yürüme Hızı", f"{speed_avg:.2f} km/h")
 
     # GRAFİK: Adım Sayısı (Son 7 Gün)
-    if step_df is not None:
-        daily_steps = step_df.groupby("date")["value"].sum().reset_index()
+    if step_daily is not None:
         fig = px.bar(
-            daily_steps.tail(7),
+            step_daily.tail(7),
             x="date",
             y="value",
             title="🦶 Son 7 Günlük Adım Dağılımı",
             color_discrete_sequence=custom_colors
         )
         fig.update_layout(xaxis_title="Tarih", yaxis_title="Adım Sayısı")
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig)
+
+@profiled
+@compute_cache.memoize
+def normalize_metric_df(df, agg="mean", value_col="value", source=None):
+    # Seçili kaynağın günlük değeri; ham tablo kopyalanmadan gün anahtarı üzerinde toplanır
+    return group_values(select_rows(df, [source] if source else None), "date", agg, by=(), value_col=value_col)
+
+@profiled
+@compute_cache.memoize
+def get_daily_matrix(metrics):
+    # Her metrik bir kez günlük seriye indirgenir ve ortak gün eksenindeki tek bloğa yazılır
+    series = {}
+    for name, df in metrics.items():
+        if "day" in df:
+            series[name] = df.groupby("day")["value"].mean()
+        else:
+            # normalize_metric_df çıktısı zaten gün başına tek satırdır
+            day = df["date"].to_numpy().astype("datetime64[D]").view("i8")
+            series[name] = pd.Series(df["value"].to_numpy(), index=day)
+    return build_daily_matrix(series)
+
+def selected_metrics(data, names):
+    # Yalnızca seçili metriklerin tipleri okunur
+    priority = st.session_state.get("source_priority")
+    return {name: CORRELATION_METRICS[name][1](data, priority) for name in names}
+
+def plot_lagged_correlation(matrix, selected_vars):
+    # Gecikmeler takvim günüdür: boş günler atılmaz, NaN olarak çift bazında dışlanır
+    covered = matrix.covered_days(selected_vars)
+    if len(covered) < 2:
+        st.warning("Seçilen değişkenler için yeterli günlük veri bulunamadı.")
+        return
+    date_range = date_window(day_dates(covered), key="lag_date_slider")
+    days, block = matrix.select(selected_vars, date_range=date_range, complete=False)
 
-@st.cache_data
-def preprocess_step_count(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["startDate"] = pd.to_datetime(df["startDate"], errors="coerce")
-    df["date"] = df["startDate"].dt.floor("D")
-    df["month_name"] = df["startDate"].dt.strftime("%B")
-    df["year"] = df["startDate"].dt.year
-    df["hour"] = df["startDate"].dt.hour
-    df["dow"] = df["startDate"].dt.day_name()
-    return df
-
-@st.cache_data
-def normalize_metric_df(df, value_col="value", source=None):
-    df = df.copy()
-    df["date"] = pd.to_datetime(df.get("startDate", df.get("date", pd.NaT)), errors="coerce").dt.tz_localize(None).dt.floor("D")
-    if source:
-        df = df[df["sourceName"] == source]
-    return df[["date", value_col]]
-
-with tab1:
-    render_dashboard()
-
-with tab2:
-    sub_tab1, sub_tab2, sub_tab3 = st.tabs([
-        "Adım Sayısı",
-        "Yürüme Mesafesi",
-        "Yürüme Hızı / Adım Uzunluğu"
-    ])
-
-    with sub_tab1:
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        leader = st.selectbox("Öncü değişken", selected_vars, key="lag_leader")
+    with col2:
+        follower = st.selectbox("Takip eden değişken", selected_vars, index=1, key="lag_follower")
+    with col3:
+        max_lag = st.slider("En fazla gecikme (gün)", min_value=1, max_value=30, value=30, key="lag_max")
+    i, j = selected_vars.index(leader), selected_vars.index(follower)
+
+    lags, corr, counts = lagged_corr(block, max_lag)
+    fig = go.Figure(go.Bar(
+        x=lags, y=corr[:, i, j], customdata=counts[:, i, j],
+        hovertemplate="Gecikme: %{x} gün<br>r = %{y:.2f}<br>%{customdata} ortak gün<extra></extra>",
+        marker_color=custom_colors[1],
+    ))
+    fig.update_layout(
+        title=f"{leader} (t) ile {follower} (t + gecikme) Korelasyonu",
+        xaxis_title="Gecikme (gün)", yaxis_title="Korelasyon (r)", yaxis_range=[-1, 1]
+    )
+    plotly_chart(fig)
+
+    st.subheader("En Güçlü Gecikmeler")
+    best = strongest_lags(selected_vars, lags, corr, counts).rename(columns={
+        "x": "Değişken 1", "y": "Değişken 2", "lag": "Gecikme (gün)", "r": "Korelasyon (r)", "n": "Ortak gün"
+    })
+    st.caption("Pozitif gecikme, Değişken 1'in Değişken 2'den önce geldiği anlamına gelir.")
+    st.dataframe(best, use_container_width=True)
+
+    st.subheader("Kayan Pencere Korelasyonu")
+    col1, col2 = st.columns(2)
+    with col1:
+        window = st.slider("Pencere (gün)", min_value=7, max_value=180, value=30, key="rolling_window")
+    with col2:
+        lag = st.slider("Gecikme (gün)", min_value=-max_lag, max_value=max_lag, value=0, key="rolling_lag")
+    rolling = pd.DataFrame({"date": day_dates(days), "r": rolling_corr(block, window, lag=lag)[:, i, j]})
+    rolling = rolling[rolling["r"].notna()]
+    n_points = len(rolling)
+    fig = px.line(
+        reduce_points(rolling, "date", "r"), x="date", y="r",
+        title=f"{leader} ~ {follower}: {window} günlük kayan korelasyon (gecikme {lag} gün)",
+        labels={"date": "Tarih", "r": "Korelasyon (r)"},
+        color_discrete_sequence=custom_colors
+    )
+    fig.update_layout(yaxis_range=[-1, 1])
+    show_chart(fig, n_points)
+
+def select_subpage(page):
+    return st.radio("Görünüm", PAGES[page], horizontal=True, key=SUBPAGE_KEYS[page], label_visibility="collapsed")
+
+# Görünüm süresi yalnızca seçili görünümün çalışmasını kapsar
+view = (page, select_subpage(page) if PAGES[page] else None)
+view_started = time.perf_counter()
+
+if page == OVERVIEW:
+    data = st.session_state.uploaded_data
+    if isinstance(data, DatasetRegistry) and data.loading() and not data.ready(OVERVIEW_TYPES):
+        # Diğer sayfalar ve kenar çubuğu çalışmaya devam eder; tipler hazır olunca sayfa yeniden çizilir
+        st.info("Genel Bakış metrikleri okunuyor...")
+        st.fragment(wait_for_overview, run_every=PROGRESS_REFRESH_SECONDS)(data)
+    else:
+        render_dashboard()
+
+if page == ACTIVITY:
+    if view[1] == "Adım Sayısı":
         if "StepCount" in st.session_state.uploaded_data:
-            step_count = preprocess_step_count(st.session_state.uploaded_data["StepCount"])
-            st.session_state.step_count = step_count
-        elif "step_count" in st.session_state:
-            step_count = st.session_state["step_count"]
+            step_count = st.session_state.uploaded_data["StepCount"]
         else:
             st.warning("Adım verisi bulunamadı.")
             step_count = None
@@ -479,10 +1049,10 @@ with tab2:
             view_options = ["Genel", "Aylık", "Yıllık", "Saatlik", "Haftanın Günü"]
             view_mode = st.selectbox("Zaman Görünümünü Seç", view_options, key="view_mode")
 
-        filtered_df = step_count[step_count["sourceName"].isin(st.session_state.selected_sources)]
+        filtered_df = select_rows(step_count, st.session_state.selected_sources)
         if st.session_state.view_mode == "Genel":
-                min_dt = filtered_df["date"].min().to_pydatetime()
-                max_dt = filtered_df["date"].max().to_pydatetime()
+                min_dt = day_dates(filtered_df["day"].min()).to_pydatetime()
+                max_dt = day_dates(filtered_df["day"].max()).to_pydatetime()
                 date_range = st.slider(
                     "Tarih Aralığı",
                     min_value=min_dt,
@@ -491,16 +1061,19 @@ with tab2:
                     format="YYYY-MM-DD",
                     key = "activity_date_slider"
                 )
-                filtered = step_count[
-                    (step_count["date"] >= date_range[0]) &
-                    (step_count["date"] <= date_range[1])
-                ]
-                plot_step_chart(filtered, "date", title="Genel Adım Verisi")
-                source_avg = step_count.groupby("sourceName")["value"].mean().reset_index().sort_values(by="value",ascending=False)
+                filtered = select_rows(step_count, date_range=date_range)
+                # Grafik yalnızca üç kolonu kullanır
+                samples = pd.DataFrame({
+                    "date": day_dates(filtered["day"].to_numpy()),
+                    "sourceName": filtered["sourceName"].to_numpy(),
+                    "value": filtered["value"].to_numpy(),
+                })
+                plot_step_chart(samples, "date", title="Genel Adım Verisi")
+                source_avg = step_count.groupby("sourceName", observed=True)["value"].mean().reset_index().sort_values(by="value",ascending=False)
                 st.dataframe(source_avg, use_container_width=True)
         elif st.session_state.view_mode == "Aylık":
-                min_dt = filtered_df["date"].min().to_pydatetime()
-                max_dt = filtered_df["date"].max().to_pydatetime()
+                min_dt = day_dates(filtered_df["day"].min()).to_pydatetime()
+                max_dt = day_dates(filtered_df["day"].max()).to_pydatetime()
                 date_range = st.slider(
                     "Tarih Aralığı",
                     min_value=min_dt,
@@ -509,27 +1082,22 @@ with tab2:
                     format="YYYY-MM-DD",
                     key="activity_date_slider_month"
                 )
-                filtered = step_count[
-                    (step_count["date"] >= date_range[0]) &
-                    (step_count["date"] <= date_range[1])
-                    ]
-
-                grouped = get_step_grouped_data(filtered, "month_name")
+                grouped = get_step_grouped_data(step_count, "month_name", date_range=date_range)
                 plot_step_chart(grouped, "month_name", title="Aylık Adım Verisi")
 
 
         elif st.session_state.view_mode == "Yıllık":
-                grouped = get_step_grouped_data(filtered_df, "year")
+                grouped = get_step_grouped_data(step_count, "year", sources=st.session_state.selected_sources)
                 plot_step_chart(grouped, "year", title="Yıllık Adım Verisi")
         elif st.session_state.view_mode == "Saatlik":
-                grouped = get_step_grouped_data(filtered_df, "hour")
+                grouped = get_step_grouped_data(step_count, "hour", sources=st.session_state.selected_sources)
                 plot_step_chart(grouped, "hour", title="Saatlik Adım Verisi")
         elif st.session_state.view_mode == "Haftanın Günü":
-                grouped = get_step_grouped_data(filtered_df, "dow")
+                grouped = get_step_grouped_data(step_count, "dow", sources=st.session_state.selected_sources)
                 plot_step_chart(grouped, "dow", title="Güne Göre Adım Verisi")
 
 
-    with sub_tab2:
+    if view[1] == "Yürüme Mesafesi":
         if "DistanceWalkingRunner" in st.session_state.uploaded_data:
             distance_walking_runner = st.session_state.uploaded_data["DistanceWalkingRunner"] #km
             source_options = distance_walking_runner["sourceName"].dropna().unique().tolist()
@@ -548,25 +1116,23 @@ with tab2:
                     ["Aylık Yürüyüş Mesafesi", "Günlük Yürüyüş Zaman Serisi", "Haftanın Gününe Göre"],
                     key= "dw_view_mode"
                 )
-            filtered = distance_walking_runner[distance_walking_runner["sourceName"].isin(st.session_state.dw_selected_sources)]
 
             if st.session_state.dw_view_mode == "Aylık Yürüyüş Mesafesi":
-                grouped = get_grouped_distance(filtered, group_col="month_name")
+                grouped = get_grouped_distance(distance_walking_runner, st.session_state.dw_selected_sources, group_col="month_name")
                 plot_monthly_distance(grouped)
             elif st.session_state.dw_view_mode == "Günlük Yürüyüş Zaman Serisi":
-                grouped = get_grouped_distance(filtered, group_col="date") #kontrol et
+                grouped = get_grouped_distance(distance_walking_runner, st.session_state.dw_selected_sources, group_col="date") #kontrol et
                 plot_daily_distance(grouped)
             elif st.session_state.dw_view_mode == "Haftanın Gününe Göre":
-                grouped = get_grouped_distance(filtered, group_col="dow")
+                grouped = get_grouped_distance(distance_walking_runner, st.session_state.dw_selected_sources, group_col="dow")
                 plot_dow_distance(grouped)
 
-    with sub_tab3:
+    if view[1] == "Yürüme Hızı / Adım Uzunluğu":
         if "WalkingSpeed" in st.session_state.uploaded_data and "WalkingStepLength" in st.session_state.uploaded_data:
             walking_speed = st.session_state.uploaded_data["WalkingSpeed"]
             walking_length = st.session_state.uploaded_data["WalkingStepLength"]
             speed_sources = walking_speed["sourceName"].dropna().unique().tolist()
             length_sources = walking_length["sourceName"].dropna().unique().tolist()
-            st.session_state["walking_speed"] = walking_speed
             all_sources = list(set(speed_sources + length_sources))
 
             col1, col2 = st.columns(2)
@@ -585,14 +1151,13 @@ with tab2:
                      "Zamana Dayalı Adım Uzunluğu"],
                     key="wl_view_mode"
                 )
-            filtered_speed = walking_speed[walking_speed["sourceName"].isin(st.session_state.wl_selected_sources)]
-            filtered_length = walking_length[walking_length["sourceName"].isin(st.session_state.wl_selected_sources)]
+            filtered_speed = select_rows(walking_speed, st.session_state.wl_selected_sources)
 
             if st.session_state.wl_view_mode == "Günlük Yürüme Hızı":
-                grouped = get_metric_grouped(filtered_speed, "date")
+                grouped = get_metric_grouped(rollups.daily("WalkingSpeed"), st.session_state.wl_selected_sources, "date")
                 plot_speed_daily(grouped)
                 avg_speed = (
-                    filtered_speed.groupby("sourceName")["value"]
+                    filtered_speed.groupby("sourceName", observed=True)["value"]
                     .mean()
                     .reset_index()
                     .rename(columns={"value": "Ortalama Hız (km/h)", "sourceName": "Kaynak"})
@@ -600,13 +1165,13 @@ with tab2:
                 )
                 st.dataframe(avg_speed, use_container_width=True)
             elif st.session_state.wl_view_mode == "Haftanın Gününe Göre Hız":
-                grouped = get_metric_grouped(filtered_speed, "dow")
+                grouped = get_metric_grouped(rollups.daily("WalkingSpeed"), st.session_state.wl_selected_sources, "dow")
                 plot_speed_by_dow(grouped)
             elif st.session_state.wl_view_mode == "Zamana Dayalı Adım Uzunluğu":
-                grouped = get_metric_grouped(filtered_length, "date")
+                grouped = get_metric_grouped(rollups.daily("WalkingStepLength"), st.session_state.wl_selected_sources, "date")
                 plot_step_length_daily(grouped)
                 avg_length = (
-                    walking_length.groupby("sourceName")["value"]
+                    walking_length.groupby("sourceName", observed=True)["value"]
                     .mean()
                     .reset_index()
                     .rename(columns={"sourceName": "Kaynak", "value": "Ortalama Adım Uzunluğu (cm)"})
@@ -615,17 +1180,47 @@ with tab2:
 
                 st.dataframe(avg_length, use_container_width=True)
 
-with tab3:
-    sub_tab1, sub_tab2, sub_tab3, sub_tab4, sub_tab5, sub_tab6,sub_tab7  = st.tabs([
-        "Nabız",
-        "Kilo & Boy",
-        "Kalori",
-        "VO2Max",
-        "HRV",
-        "Solunum",
-        "Yürüyüş Kalp Yükü"
-    ])
-    with sub_tab1:
+    if view[1] == "Antrenmanlar & Yürüyüşler":
+        data = st.session_state.uploaded_data
+        origins = (["Antrenman Kayıtları"] if "Workout" in data else []) + ["Adım / Hızdan Algılanan"]
+        origin = st.radio("Bout kaynağı", origins, horizontal=True, key="bout_origin")
+        if origin == "Antrenman Kayıtları":
+            bouts = get_workout_bouts(data["Workout"])
+        else:
+            st.number_input(
+                "En kısa bout (dk)", min_value=1, max_value=120, value=MIN_BOUT_MINUTES, step=1, key="bout_min_minutes"
+            )
+            bouts = get_detected_bouts(
+                data["StepCount"] if "StepCount" in data else None,
+                data["WalkingSpeed"] if "WalkingSpeed" in data else None,
+                st.session_state.bout_min_minutes
+            )
+        summary = get_bout_summary(
+            bouts, {t: data[t] for t in BOUT_TYPES if t in data}, st.session_state.get("source_priority")
+        )
+        if summary.empty:
+            st.info("Bu kaynakta antrenman ya da yürüyüş bulunamadı.")
+        else:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Bout Sayısı", f"{len(summary):,}")
+            col2.metric("Toplam Süre", f"{summary['minutes'].sum() / 60:,.1f} saat")
+            if "active_energy_kcal" in summary:
+                col3.metric("Aktif Enerji", f"{summary['active_energy_kcal'].sum():,.0f} kcal")
+            plot_bout_scatter(summary)
+            plot_daily_bout_minutes(summary)
+            bout_columns = {
+                "start": "Başlangıç", "end": "Bitiş", "minutes": "Süre (dk)", "activity": "Etkinlik",
+                "steps": "Adım", "distance_km": "Mesafe (km)", "active_energy_kcal": "Aktif Enerji (kcal)",
+                "heart_rate_bpm": "Ort. Nabız", "heart_rate_max": "En Yüksek Nabız",
+                "walking_speed_kmh": "Ort. Hız (km/h)", "cadence": "Tempo (adım/dk)",
+            }
+            st.dataframe(
+                summary[[c for c in bout_columns if c in summary]].rename(columns=bout_columns),
+                hide_index=True, use_container_width=True
+            )
+
+if page == HEALTH:
+    if view[1] == "Nabız":
         if "HeartRate" in st.session_state.uploaded_data:
             heart_rate = st.session_state.uploaded_data["HeartRate"]
             source_options = heart_rate["sourceName"].dropna().unique().tolist()
@@ -635,13 +1230,68 @@ with tab3:
                 default=source_options,
                 key = "hr_selected_sources"
             )
-            filtered = heart_rate[heart_rate["sourceName"].isin(st.session_state.hr_selected_sources)]
-            grouped = get_heart_rate_grouped(filtered)
-            plot_heart_rate_daily(grouped)
-    with sub_tab2:
+            hr_view = st.radio(
+                "Görünüm", ["Günlük Ortalama", "Nabız Bölgeleri", "Dinlenme Nabzı & Anomaliler", "Gün İçi"],
+                horizontal=True, key="hr_view"
+            )
+            grouped = get_heart_rate_grouped(rollups.daily("HeartRate"), st.session_state.hr_selected_sources)
+            if not grouped.empty:
+                date_range = date_window(grouped["date"], key="hr_date_slider")
+                grouped = grouped[(grouped["date"] >= date_range[0]) & (grouped["date"] <= date_range[1])]
+            if hr_view == "Günlük Ortalama":
+                plot_heart_rate_daily(grouped)
+            elif not grouped.empty:
+                # Bölgeler maksimum nabzın yüzdesidir; örnek süreleri ardışık ölçümler arasındaki boşluktur
+                st.number_input(
+                    "Maksimum nabız (BPM)", min_value=100, max_value=240, value=DEFAULT_MAX_HR, step=1, key="hr_max"
+                )
+                engine = st.session_state.heart_rate
+                days = get_heart_rate_days(
+                    heart_rate, st.session_state.hr_selected_sources, date_range, st.session_state.hr_max
+                )
+                st.caption(
+                    f"{len(days):,} gün · toplam {engine.computed_days:,} gün hesaplandı, "
+                    f"{engine.scanned_rows:,} örnek tarandı"
+                )
+                if days.empty:
+                    st.info("Seçilen aralıkta nabız örneği bulunamadı.")
+                elif hr_view == "Nabız Bölgeleri":
+                    plot_heart_rate_zones(days, st.session_state.hr_max)
+                    totals = days[ZONE_COLUMNS].sum() / 60
+                    st.dataframe(
+                        pd.DataFrame({"Bölge": list(zone_labels(st.session_state.hr_max).values()),
+                                      "Süre (saat)": totals.to_numpy()}),
+                        hide_index=True, use_container_width=True
+                    )
+                elif hr_view == "Dinlenme Nabzı & Anomaliler":
+                    plot_resting_baseline(days)
+                    flagged = days[days["anomaly"] | (days["spikes"] > 0)]
+                    st.dataframe(
+                        pd.DataFrame({
+                            "Tarih": day_dates(flagged["day"].to_numpy()),
+                            "Dinlenme Nabzı": flagged["resting_bpm"].to_numpy(),
+                            "Taban": flagged["baseline_bpm"].to_numpy(),
+                            "z": flagged["baseline_z"].to_numpy(),
+                            "Anomali": flagged["anomaly"].to_numpy(),
+                            "Sıçrama": flagged["spikes"].to_numpy(),
+                        }),
+                        hide_index=True, use_container_width=True
+                    )
+                else:
+                    first_day, last_day = (d.date() for d in day_dates(days["day"].to_numpy()[[0, -1]]))
+                    if not first_day <= st.session_state.get("hr_day", first_day) <= last_day:
+                        del st.session_state["hr_day"]
+                    if "hr_day" not in st.session_state:
+                        st.session_state.hr_day = last_day
+                    st.date_input("Gün", min_value=first_day, max_value=last_day, key="hr_day")
+                    day = day_range_from_dates((st.session_state.hr_day, st.session_state.hr_day))[0]
+                    samples = get_intraday_heart_rate(
+                        heart_rate, day, st.session_state.hr_selected_sources, st.session_state.hr_max
+                    )
+                    plot_intraday_heart_rate(samples, st.session_state.hr_max)
+    if view[1] == "Kilo & Boy":
         if "BodyMass" in st.session_state.uploaded_data:
             body_mass = st.session_state.uploaded_data["BodyMass"]
-            body_mass["BMI"] = body_mass["value"] / ((height / 100) ** 2)
             col1, col2 = st.columns(2)
             with col1:
                 source_options = body_mass["sourceName"].dropna().unique().tolist()
@@ -656,15 +1306,14 @@ with tab3:
                 key = "bm_view_mode"
                 )
 
-            filtered = body_mass[body_mass["sourceName"].isin(st.session_state.bm_sources)]
 
             if st.session_state.bm_view_mode == "Aylık Kilo":
-                grouped = get_weight_monthly_avg(filtered)
+                grouped = get_weight_monthly_avg(body_mass, st.session_state.bm_sources)
                 plot_weight_by_month(grouped)
             elif st.session_state.bm_view_mode == "BMI":
-                bmi_df = calculate_bmi(filtered, height)
+                bmi_df = calculate_bmi(body_mass, st.session_state.bm_sources, height)
                 plot_bmi_line(bmi_df)
-    with sub_tab3:
+    if view[1] == "Kalori":
         if "ActiveEnergyBurned" in st.session_state.uploaded_data and "BasalEnergyBurned" in st.session_state.uploaded_data:
             active_df = st.session_state.uploaded_data["ActiveEnergyBurned"]
             basal_df = st.session_state.uploaded_data["BasalEnergyBurned"]
@@ -685,60 +1334,57 @@ with tab3:
                     ["Toplam Kalori (Günlük)", "Haftanın Günlerine Göre Aktif Kalori"],
                     key = "energy_view_mode"
                 )
-            active_filtered = active_df[active_df["sourceName"].isin(st.session_state.energy_selected_sources)]
-            basal_filtered = basal_df[basal_df["sourceName"].isin(st.session_state.energy_selected_sources)]
             if st.session_state.energy_view_mode == "Toplam Kalori (Günlük)":
-                combined = get_daily_total_energy(active_filtered, basal_filtered)
+                combined = get_daily_total_energy(
+                    rollups.daily("ActiveEnergyBurned"),
+                    rollups.daily("BasalEnergyBurned"),
+                    st.session_state.energy_selected_sources
+                )
+                if not combined.empty:
+                    date_range = date_window(combined["startDate"], key="energy_date_slider")
+                    combined = combined[(combined["startDate"] >= date_range[0]) & (combined["startDate"] <= date_range[1])]
                 plot_daily_total_energy(combined)
             elif st.session_state.energy_view_mode == "Haftanın Günlerine Göre Aktif Kalori":
-                grouped = get_active_energy_by_dow(active_filtered)
+                grouped = get_active_energy_by_dow(active_df, st.session_state.energy_selected_sources)
                 plot_active_energy_by_dow(grouped)
-    with sub_tab4:
+    if view[1] == "VO2Max":
         if "VO2Max" in st.session_state.uploaded_data:
-            vo2max= st.session_state.uploaded_data["VO2Max"]
-            plot_vo2max(vo2max)
+            plot_vo2max(rollups.daily("VO2Max"))
         else:
             st.info("VO2Max verisi yüklenmemiştir.")
 
-    with sub_tab5:
+    if view[1] == "HRV":
         if "HeartRateVariabilitySDNN" in st.session_state.uploaded_data:
-            hrv = st.session_state.uploaded_data["HeartRateVariabilitySDNN"]
-            plot_single_metric(hrv, "HRV Zaman Serisi", "HRV")
+            plot_single_metric(rollups.daily("HeartRateVariabilitySDNN"), "HRV Zaman Serisi", "HRV")
         else:
             st.info("HRV verisi yüklenmemiştir.")
 
-    with sub_tab6:
+    if view[1] == "Solunum":
         if "OxygenSaturation" in st.session_state.uploaded_data and "RespiratoryRate" in st.session_state.uploaded_data:
-            spo2 = st.session_state.uploaded_data["OxygenSaturation"]
-            respiratory = st.session_state.uploaded_data["RespiratoryRate"]
-            plot_single_metric(spo2, "SpO2 Zaman Serisi", "SpO2")
-            plot_single_metric(respiratory, "Solunum Hızı Zaman Serisi", "Solunum Hızı")
+            plot_single_metric(rollups.daily("OxygenSaturation"), "SpO2 Zaman Serisi", "SpO2")
+            plot_single_metric(rollups.daily("RespiratoryRate"), "Solunum Hızı Zaman Serisi", "Solunum Hızı")
         else:
             st.info("SpO2 veya Solunum Hızı verisi yüklenmemiştir.")
 
-    with sub_tab7:
+    if view[1] == "Yürüyüş Kalp Yükü":
         if "WalkingHeartRateAverage" in st.session_state.uploaded_data:
-            walking_hr = st.session_state.uploaded_data["WalkingHeartRateAverage"]
-            plot_single_metric(walking_hr, "Yürüyüş Nabzı Ortalaması", "Yürüyüş HR")
+            plot_single_metric(rollups.daily("WalkingHeartRateAverage"), "Yürüyüş Nabzı Ortalaması", "Yürüyüş HR")
         else:
             st.info("WalkingHeartRateAverage verisi yüklenmemiştir.")
 
         if "RestingHeartRate" in st.session_state.uploaded_data:
-            resting_hr = st.session_state.uploaded_data["RestingHeartRate"]
-            plot_single_metric(resting_hr, "Dinlenik Nabız Zaman Serisi", "Resting HR")
+            plot_single_metric(rollups.daily("RestingHeartRate"), "Dinlenik Nabız Zaman Serisi", "Resting HR")
         else:
             st.info("RestingHeartRate verisi yüklenmemiştir.")
 
         if "HeartRateRecoveryOneMinute" in st.session_state.uploaded_data:
-            hr_recovery = st.session_state.uploaded_data["HeartRateRecoveryOneMinute"]
-            plot_single_metric(hr_recovery, "Egzersiz Sonrası Toparlanma",
+            plot_single_metric(rollups.daily("HeartRateRecoveryOneMinute"), "Egzersiz Sonrası Toparlanma",
                                "HR Recovery")
         else:
             st.info("HeartRateRecoveryOneMinute verisi yüklenmemiştir.")
-with tab4:
+if page == SLEEP:
         if "SleepAnalysis" in st.session_state.uploaded_data:
             sleep_df = st.session_state.uploaded_data["SleepAnalysis"]
-            sleep_df["value"] = sleep_df["sleep_duration_hours"]
             source_options = sleep_df["sourceName"].dropna().unique().tolist()
             col1, col2 = st.columns(2)
             with col1:
@@ -751,129 +1397,90 @@ with tab4:
             with col2:
                 view_option = st.selectbox(
                     "Görünüm Seçiniz",
-                    ["Haftalık Ortalama Uyuma Saatleri", "Uyku Evrelerine Göre Dağılım"],
+                    ["Haftalık Ortalama Uyuma Saatleri", "Uyku Evrelerine Göre Dağılım", "Gece Özeti"],
                     key = "sleep_view"
                 )
+            # Gece bu saatte başlar ve ertesi gün aynı saatte biter (varsayılan öğleden öğleye)
+            st.number_input(
+                "Gece sınırı (saat)", min_value=0, max_value=23, value=NIGHT_BOUNDARY_HOUR, key="sleep_boundary"
+            )
 
-            filtered_df = sleep_df[sleep_df["sourceName"].isin(st.session_state.sleep_sources)]
-            avg_by_dow, sleep_type_dist = get_sleep_metrics(filtered_df)
+            nights = get_sleep_nights(sleep_df, st.session_state.sleep_sources, st.session_state.sleep_boundary)
+            avg_by_dow, sleep_type_dist = get_sleep_metrics(nights)
 
-            if st.session_state.sleep_view == "Haftalık Ortalama Uyuma Saatleri":
+            if nights.empty:
+                st.info("Seçilen kaynaklar için uyku kaydı bulunamadı.")
+            elif st.session_state.sleep_view == "Haftalık Ortalama Uyuma Saatleri":
                 plot_avg_sleep_by_dow(avg_by_dow)
             elif st.session_state.sleep_view == "Uyku Evrelerine Göre Dağılım":
                 plot_sleep_type_pie(sleep_type_dist)
-
-with tab5:
-
-    active_df = st.session_state.uploaded_data.get("ActiveEnergyBurned")
-    basal_df = st.session_state.uploaded_data.get("BasalEnergyBurned")
-
-    if active_df is not None and basal_df is not None:
-        active_df = active_df.copy()
-        basal_df = basal_df.copy()
-
-        active_df = active_df[active_df["sourceName"] == "Ali Haydar’s Apple Watch"]
-        basal_df = basal_df[basal_df["sourceName"] == "Ali Haydar’s Apple Watch"]
-
-        active_df["startDate"] = pd.to_datetime(active_df["startDate"]).dt.floor("D")
-        basal_df["startDate"] = pd.to_datetime(basal_df["startDate"]).dt.floor("D")
-
-        total_df = pd.merge(
-            active_df.groupby("startDate")["value"].sum().reset_index(name="active"),
-            basal_df.groupby("startDate")["value"].sum().reset_index(name="basal"),
-            on="startDate",
-            how="outer"
-        )
-        total_df["value"] = total_df["active"].fillna(0) + total_df["basal"].fillna(0)
-        total_df["date"] = total_df["startDate"]
-    else:
-        total_df = None
-    sum_vars = [
-        "Adım Sayısı", "Yürünen Mesafe",
-        "Aktif Enerji (kcal)", "Bazal Enerji (kcal)", "Toplam Enerji (kcal)",
+            elif st.session_state.sleep_view == "Gece Özeti":
+                plot_sleep_nights(nights)
+
+# Metrik adı -> (gerekli tipler, günlük tablo); tablolar yalnızca metrik seçildiğinde okunur.
+# Birikimli ölçümler kaynak önceliğiyle tekilleştirilir, ortalamalarda en öncelikli kaynak kullanılır
+CORRELATION_METRICS = {
+    "Adım Sayısı": (["StepCount"], lambda d, p: get_deduplicated_daily(d["StepCount"], p)),
+    "Yürünen Mesafe": (["DistanceWalkingRunner"], lambda d, p: get_deduplicated_daily(d["DistanceWalkingRunner"], p)),
+    "Yürüme Hızı": (["WalkingSpeed"], lambda d, p: get_preferred_daily(d["WalkingSpeed"], p)),
+    "Aktif Enerji (kcal)": (["ActiveEnergyBurned"], lambda d, p: get_deduplicated_daily(d["ActiveEnergyBurned"], p)),
+    "Bazal Enerji (kcal)": (["BasalEnergyBurned"], lambda d, p: get_deduplicated_daily(d["BasalEnergyBurned"], p)),
+    "Toplam Enerji (kcal)": (
+        ["ActiveEnergyBurned", "BasalEnergyBurned"],
+        lambda d, p: total_energy_daily(d["ActiveEnergyBurned"], d["BasalEnergyBurned"], p),
+    ),
+    "Uyku Süresi (saat)": (["SleepAnalysis"], lambda d, p: sleep_hours_daily(d["SleepAnalysis"])),
+    "Nabız": (["HeartRate"], lambda d, p: get_preferred_daily(d["HeartRate"], p)),
+    "VO2Max": (["VO2Max"], lambda d, p: d["VO2Max"]),
+    "HRV": (["HeartRateVariabilitySDNN"], lambda d, p: d["HeartRateVariabilitySDNN"]),
+    "SpO2": (["OxygenSaturation"], lambda d, p: get_preferred_daily(d["OxygenSaturation"], p)),
+    "Solunum Hızı": (["RespiratoryRate"], lambda d, p: d["RespiratoryRate"]),
+    "Yürüyüş Nabzı": (["WalkingHeartRateAverage"], lambda d, p: d["WalkingHeartRateAverage"]),
+    "Dinlenik Nabız": (["RestingHeartRate"], lambda d, p: d["RestingHeartRate"]),
+    "Egzersiz Sonrası Toparlanma (Kalp Atış Toparlanması)": (
+        ["HeartRateRecoveryOneMinute"], lambda d, p: d["HeartRateRecoveryOneMinute"]
+    ),
+}
+
+if page == RELATIONS:
+    data = st.session_state.uploaded_data
+    # Seçenekler yalnızca zip dizininden belirlenir; hiçbir tablo okunmaz
+    available_metrics = [
+        name for name, (types, _) in CORRELATION_METRICS.items() if all(t in data for t in types)
     ]
-    step_df = st.session_state.uploaded_data.get("StepCount")
-    if step_df is not None:
-        step_df = normalize_metric_df(step_df, source="Ali Haydar Akca’s iPhone")
-        step_df = step_df.groupby("date")["value"].sum().reset_index(name="value")
-        st.session_state["step_count_normalized"] = step_df
-    heart_rate_df = st.session_state.uploaded_data.get("HeartRate")
-    if heart_rate_df is not None:
-        heart_rate_df = normalize_metric_df(heart_rate_df, source= "Ali Haydar’s Apple Watch")
-        heart_rate_df = heart_rate_df.groupby("date")["value"].mean().reset_index(name="value")
-        st.session_state["heart_rate_filtered"] = heart_rate_df
-    dwr_df = st.session_state.uploaded_data.get("DistanceWalkingRunner")
-    if dwr_df is not None:
-        dwr_df = normalize_metric_df(dwr_df, source= "Ali Haydar Akca’s iPhone")
-        dwr_df = dwr_df.groupby("date")["value"].sum().reset_index(name="value")
-        st.session_state["distance_walking_filtered"] = dwr_df
-    ws_df = st.session_state.uploaded_data.get("WalkingSpeed")
-    if ws_df is not None:
-        ws_df = normalize_metric_df(ws_df, source= "Ali Haydar Akca’s iPhone")
-        ws_df = ws_df.groupby("date")["value"].mean().reset_index(name="value")
-        st.session_state["walking_speed_filtered"] = ws_df
-    sleep_df = st.session_state.uploaded_data.get("SleepAnalysis")
-    if sleep_df is not None:
-        sleep_df = sleep_df[sleep_df["sourceName"] == "Ali Haydar’s Apple Watch"]
-        sleep_df = sleep_df[sleep_df["sleep_type"].str.contains("Asleep", case=False)]
-        sleep_daily = sleep_df.groupby("date")["sleep_duration_hours"].sum().reset_index(name="value")
-        st.session_state["sleep_df_filtered"] = sleep_df
-    spo2_df = st.session_state.uploaded_data.get("OxygenSaturation")
-    if spo2_df is not None:
-        spo2_df = spo2_df[spo2_df["sourceName"] == "Ali Haydar’s Apple Watch"]
-        spo2_df = spo2_df.groupby("date")["value"].mean().reset_index(name="value")
-        st.session_state["spo2_df_filtered"] = spo2_df
-    available_metrics = {
-        "Adım Sayısı": st.session_state.get("step_count_normalized"),
-        "Yürünen Mesafe": st.session_state.get("distance_walking_filtered"),
-        "Yürüme Hızı": st.session_state.get("walking_speed_filtered"),
-        "Aktif Enerji (kcal)": active_df,
-        "Bazal Enerji (kcal)": basal_df,
-        "Toplam Enerji (kcal)": total_df,
-        "Uyku Süresi (saat)": sleep_daily,
-        "Nabız": st.session_state.get("heart_rate_filtered"),
-        "VO2Max": st.session_state.uploaded_data.get("VO2Max"),
-        "HRV": st.session_state.uploaded_data.get("HeartRateVariabilitySDNN"),
-        "SpO2": st.session_state.get("spo2_df_filtered"),
-        "Solunum Hızı": st.session_state.uploaded_data.get("RespiratoryRate"),
-        "Yürüyüş Nabzı": st.session_state.uploaded_data.get("WalkingHeartRateAverage"),
-        "Dinlenik Nabız": st.session_state.uploaded_data.get("RestingHeartRate"),
-        "Egzersiz Sonrası Toparlanma (Kalp Atış Toparlanması)": st.session_state.uploaded_data.get(
-            "HeartRateRecoveryOneMinute")
-    }
 
     selected_vars = st.multiselect(
         "İncelenecek Değişkenler (en az 2 adet seçiniz)",
-        options=[k for k, v in available_metrics.items() if v is not None],
+        options=available_metrics,
         default=["Nabız", "Adım Sayısı"],
         key="correlation_multiselect"
     )
-
-
-    if len(selected_vars) >= 2:
-        merged = None
-        for var in selected_vars:
-            df = available_metrics[var]
-            if df is None:
-                continue
-            df = df.copy()
-            df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.tz_localize(None).dt.floor("D")
-            df_grouped = df.groupby("date")["value"].mean().reset_index(name=var)
-
-            if merged is None:
-                merged = df_grouped
-            else:
-                merged = pd.merge(merged, df_grouped, on="date", how="inner")
-
-        if merged is not None and not merged.empty:
+    st.selectbox("Analiz Modu", ["Aynı Gün Korelasyonu", "Gecikmeli / Kayan Korelasyon"], key="correlation_mode")
+
+
+    if len(selected_vars) >= 2 and st.session_state.correlation_mode == "Gecikmeli / Kayan Korelasyon":
+        plot_lagged_correlation(get_daily_matrix(selected_metrics(data, selected_vars)), selected_vars)
+    elif len(selected_vars) >= 2:
+        matrix = get_daily_matrix(selected_metrics(data, selected_vars))
+        # Grafikler tüm seçili metriklerin dolu olduğu günleri kullanır (iç birleştirme)
+        days, block = matrix.select(selected_vars)
+
+        if len(days):
+            date_range = date_window(day_dates(days), key="correlation_date_slider")
+            days, block = matrix.select(selected_vars, date_range=date_range)
+            merged = pd.DataFrame(block, columns=selected_vars)
+            merged.insert(0, "date", day_dates(days))
+            # Korelasyonlar her çift için ortak dolu günler üzerinden tek çağrıda hesaplanır
+            corr, counts = pairwise_corr(matrix.select(selected_vars, date_range=date_range, complete=False)[1])
             # Eğer sadece 2 değişken varsa korelasyon hesapla ve çift eksenli çiz
             if len(selected_vars) == 2:
-                corr = merged[selected_vars[0]].corr(merged[selected_vars[1]])
-                st.metric("Korelasyon (r)", f"{corr:.2f}")
+                st.metric("Korelasyon (r)", f"{corr[0, 1]:.2f}", help=f"{counts[0, 1]:,} ortak gün")
 
                 fig = go.Figure()
-                fig.add_trace(go.Scatter(x=merged["date"], y=merged[selected_vars[0]], name=selected_vars[0], yaxis="y1"))
-                fig.add_trace(go.Scatter(x=merged["date"], y=merged[selected_vars[1]], name=selected_vars[1], yaxis="y2"))
+                first = reduce_points(merged, "date", selected_vars[0])
+                second = reduce_points(merged, "date", selected_vars[1])
+                fig.add_trace(go.Scatter(x=first["date"], y=first[selected_vars[0]], name=selected_vars[0], yaxis="y1"))
+                fig.add_trace(go.Scatter(x=second["date"], y=second[selected_vars[1]], name=selected_vars[1], yaxis="y2"))
 
                 fig.update_layout(
                     title=f"{selected_vars[0]} ve {selected_vars[1]} Zaman Serisi",
@@ -883,14 +1490,25 @@ with tab5:
                     legend=dict(x=0.5, y=1.1, orientation="h"),
                     hovermode="x unified"
                 )
-                st.plotly_chart(fig, use_container_width=True)
+                show_chart(fig, 2 * len(merged))
 
             else:
+                corr_df, counts_df = corr_frame(selected_vars, corr, counts)
+                st.subheader("Korelasyon Matrisi")
+                fig = px.imshow(
+                    corr_df, text_auto=".2f", zmin=-1, zmax=1,
+                    color_continuous_scale="RdBu_r", aspect="auto"
+                )
+                plotly_chart(fig)
+                with st.expander("Ortak gün sayıları"):
+                    st.dataframe(counts_df, use_container_width=True)
+
                 st.subheader("Zaman Serisi Karşılaştırma")
 
                 fig = go.Figure()
                 for var in selected_vars:
-                    fig.add_trace(go.Scatter(x=merged["date"], y=merged[var], name=var))
+                    reduced = reduce_points(merged, "date", var)
+                    fig.add_trace(go.Scatter(x=reduced["date"], y=reduced[var], name=var))
 
                 fig.update_layout(
                     xaxis=dict(title="Tarih"),
@@ -898,6 +1516,36 @@ with tab5:
                     legend=dict(orientation="h", y=1.1, x=0.5, xanchor="center"),
                     hovermode="x unified"
                 )
-                st.plotly_chart(fig, use_container_width=True)
+                show_chart(fig, len(selected_vars) * len(merged))
         else:
             st.warning("Seçilen değişkenler için ortak tarihli veri bulunamadı.")
+
+# Görünüm başına son çizim süresi; sayfa değiştirmenin kazancı buradan izlenir
+view_seconds = time.perf_counter() - view_started
+render_times = st.session_state.setdefault("render_times", {})
+render_times[" / ".join(v for v in view if v)] = view_seconds
+with st.sidebar:
+    st.caption(f"Bu görünüm {view_seconds * 1000:,.0f} ms'de çizildi")
+    with st.expander("Görünüm süreleri"):
+        st.dataframe(
+            pd.DataFrame({"Görünüm": list(render_times), "Süre (ms)": [t * 1000 for t in render_times.values()]}),
+            hide_index=True, use_container_width=True
+        )
+
+if profiler.enabled:
+    # Bu yeniden çalıştırmanın aşamaları; iz dosyası son çalıştırmaları da içerir (chrome://tracing, Perfetto)
+    with st.expander("Profil ölçümleri"):
+        profile_columns = {
+            "name": "Aşama", "kind": "Tür", "depth": "Derinlik", "start_ms": "Başlangıç (ms)", "ms": "Süre (ms)",
+            "count": "Çağrı", "rows_in": "Giren satır", "rows_out": "Çıkan satır", "cache_hits": "Önbellek isabet",
+            "cache_misses": "Önbellek ıska", "bytes": "Bayt",
+        }
+        st.dataframe(profiler.totals().rename(columns=profile_columns), hide_index=True, use_container_width=True)
+        st.dataframe(
+            profiler.table().drop(columns="run").rename(columns=profile_columns),
+            hide_index=True, use_container_width=True
+        )
+        st.download_button(
+            "İz dosyasını indir", json.dumps(profiler.trace(), ensure_ascii=False),
+            file_name=f"health_trace_{profiler.run}.json", mime="application/json"
+        )
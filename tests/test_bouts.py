@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apple_health.bouts import bout_summary, detect_bouts, interval_join
+
+NS_PER_MINUTE = 60_000_000_000
+DAY = np.datetime64("2024-03-04", "m").astype(np.int64)
+
+
+def minute_frame(start, end, value):
+    # Dakika cinsinden aralıklardan tablo; day kolonu select_rows'un tarih filtresi için
+    start = (DAY + np.asarray(start)) * NS_PER_MINUTE
+    end = (DAY + np.asarray(end)) * NS_PER_MINUTE
+    return pd.DataFrame({
+        "sourceName": "Watch",
+        "startDate": start.view("datetime64[ns]"),
+        "endDate": end.view("datetime64[ns]"),
+        "value": np.asarray(value, dtype=np.float64),
+        "day": (start // (24 * 60 * NS_PER_MINUTE)).astype(np.int32),
+    })
+
+
+def join_reference(start, end, bout_start, bout_end):
+    # Örnek başına tüm bout'lar taranır; anlık örnek [başlangıç, bitiş) içindeyse oranı 1'dir
+    index = np.full(len(start), -1)
+    fraction = np.zeros(len(start))
+    for i, (s, e) in enumerate(zip(start, end)):
+        for j, (bs, be) in enumerate(zip(bout_start, bout_end)):
+            if e <= s:
+                if bs <= s < be:
+                    index[i], fraction[i] = j, 1.0
+                    break
+            elif min(e, be) - max(s, bs) > 0:
+                index[i], fraction[i] = j, (min(e, be) - max(s, bs)) / (e - s)
+                break
+    return index, fraction
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_interval_join_matches_scan(seed):
+    rng = np.random.default_rng(seed)
+    edges = np.sort(rng.choice(np.arange(0, 500), 2 * rng.integers(0, 8), replace=False))
+    bout_start, bout_end = edges[0::2], edges[1::2]
+    start = rng.integers(-20, 520, 200)
+    end = start + rng.integers(0, 60, 200) * (rng.random(200) > 0.3)
+    index, fraction = interval_join(start, end, bout_start, bout_end)
+    expected_index, expected_fraction = join_reference(start, end, bout_start, bout_end)
+    np.testing.assert_array_equal(index, expected_index)
+    np.testing.assert_allclose(fraction, expected_fraction)
+
+
+def test_detect_bouts_bridges_short_gaps_and_drops_short_bouts():
+    # 0-12 ve 14-20 arası tempolu (2 dk boşluk kapanır), 40-45 kısa, 60-80 yavaş
+    minutes = [*range(0, 12), *range(14, 20), *range(40, 45), *range(60, 80)]
+    cadence = [100] * 23 + [30] * 20
+    steps = minute_frame(minutes, [m + 1 for m in minutes], cadence)
+    bouts = detect_bouts(steps)
+    assert len(bouts) == 1
+    assert bouts["minutes"].tolist() == [20.0]
+    assert bouts["start"].iloc[0] == pd.Timestamp("2024-03-04 00:00")
+    assert bouts["origin"].iloc[0] == "detected"
+
+
+def test_detect_bouts_without_inputs_is_empty():
+    bouts = detect_bouts()
+    assert bouts.empty
+    assert list(bouts.columns) == ["start", "end", "day", "minutes", "activity", "origin"]
+
+
+def test_bout_summary_with_steps_assigns_activity_by_cadence():
+    steps = minute_frame([0, 10, 30, 40], [10, 20, 40, 50], [1600, 1600, 900, 900])
+    bouts = detect_bouts(steps)
+    summary = bout_summary(bouts, {"StepCount": steps})
+    assert summary["steps"].tolist() == [3200.0, 1800.0]
+    assert summary["cadence"].tolist() == [160.0, 90.0]
+    assert summary["activity"].tolist() == ["Running", "Walking"]
+
+
+def test_bout_summary_without_step_counts():
+    speed = minute_frame(range(0, 15), range(1, 16), [4.5] * 15)
+    bouts = detect_bouts(speed=speed)
+    summary = bout_summary(bouts, {"WalkingSpeed": speed})
+    assert len(summary) == 1
+    assert "steps" not in summary and "cadence" not in summary
+    assert summary["activity"].tolist() == ["Walking"]
+    assert summary["walking_speed_kmh"].tolist() == [pytest.approx(4.5)]
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apple_health.dedup import deduplicate_sources, source_priority
+from apple_health.partition import partition_by_source
+
+SOURCES = ["Watch", "iPhone", "Scale"]
+
+
+def random_samples(seed, n=80):
+    # Dakika ızgarasında aralıklar ve anlık (süresiz) örnekler; aynı kaynağın örnekleri de çakışabilir
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-01-01", "m").astype(np.int64) + rng.integers(0, 600, n)
+    end = start + rng.integers(0, 40, n) * (rng.random(n) > 0.2)
+    return pd.DataFrame({
+        "sourceName": rng.choice(SOURCES, n),
+        "startDate": (start * 60_000_000_000).view("datetime64[ns]"),
+        "endDate": (end * 60_000_000_000).view("datetime64[ns]"),
+        "value": rng.integers(1, 100, n).astype(np.float64),
+    })
+
+
+def reference(df, priority):
+    # Kaynaklar öncelik sırasıyla; her örneğin daha öncelikli kaynakların kapsamadığı dakikaları sayılır
+    start = df["startDate"].to_numpy().view("i8") // 60_000_000_000
+    end = df["endDate"].to_numpy().view("i8") // 60_000_000_000
+    kept = np.ones(len(df))
+    covered = set()
+    for source in source_priority(list(pd.unique(df["sourceName"])), priority):
+        rows = np.flatnonzero((df["sourceName"] == source).to_numpy())
+        for i in rows:
+            if end[i] > start[i]:
+                minutes = range(start[i], end[i])
+                kept[i] = sum(m not in covered for m in minutes) / len(minutes)
+            else:
+                kept[i] = 0.0 if start[i] in covered else 1.0
+        for i in rows:
+            covered.update(range(start[i], end[i]))
+    result = df[kept > 0].reset_index(drop=True)
+    result["value"] = result["value"] * kept[kept > 0]
+    return result
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("priority", [None, ["iPhone", "Watch"], ["Scale"]])
+def test_deduplicate_sources_prorates_like_minute_scan(seed, priority):
+    df = random_samples(seed)
+    pd.testing.assert_frame_equal(deduplicate_sources(df, priority), reference(df, priority))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_deduplicate_sources_partitioned(seed):
+    # Kaynağa göre bölümlenmiş (kategori kodları sıralı) tablo satır aralığı yolundan geçer
+    df = partition_by_source(random_samples(seed).assign(sourceName=lambda d: d["sourceName"].astype("category")))
+    expected = reference(df.assign(sourceName=df["sourceName"].astype(str)), None)
+    result = deduplicate_sources(df)
+    pd.testing.assert_frame_equal(result.assign(sourceName=result["sourceName"].astype(str)), expected)
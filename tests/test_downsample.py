@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apple_health.downsample import downsample, lttb_indices, minmax_indices
+
+
+def lttb_reference(x, y, threshold):
+    # Steinarsson'un özgün, nokta nokta LTTB algoritması; kova sınırları floor(i * (n - 2) / (threshold - 2)) + 1
+    n = len(x)
+
+    def edge(i):
+        return i * (n - 2) // (threshold - 2) + 1
+
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = edge(i + 1)
+        avg_end = min(edge(i + 2), n)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+        best, best_area = None, -1.0
+        for j in range(edge(i), edge(i + 1)):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def minmax_reference(y, n_buckets):
+    n = len(y)
+    kept = set()
+    for b in range(n_buckets):
+        rows = [i for i in range(n) if i * n_buckets // n == b]
+        if rows:
+            kept.add(min(rows, key=lambda i: (y[i], i)))
+            kept.add(max(rows, key=lambda i: (y[i], -i)))
+    return sorted(kept)
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("n,threshold", [(100, 10), (997, 50), (500, 499), (64, 3)])
+def test_lttb_matches_reference(seed, n, threshold):
+    rng = np.random.default_rng(seed)
+    x = np.sort(rng.random(n)) * 1000
+    y = np.cumsum(rng.normal(size=n))
+    assert lttb_indices(x, y, threshold).tolist() == lttb_reference(x.tolist(), y.tolist(), threshold)
+
+
+def test_lttb_keeps_short_series():
+    assert lttb_indices(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
+    assert lttb_indices(np.arange(5), np.arange(5), 2).tolist() == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("n,n_buckets", [(100, 10), (997, 50), (30, 14)])
+def test_minmax_matches_reference(seed, n, n_buckets):
+    rng = np.random.default_rng(seed)
+    y = rng.integers(0, 20, n).astype(np.float64)
+    indices = minmax_indices(y, n_buckets)
+    assert indices.tolist() == minmax_reference(y.tolist(), n_buckets)
+    assert y.argmax() in indices and y.argmin() in indices
+
+
+def test_downsample_per_trace():
+    dates = pd.date_range("2024-01-01", periods=300, freq="h")
+    df = pd.DataFrame({
+        "startDate": np.tile(dates, 2),
+        "value": np.sin(np.arange(600) / 7.0),
+        "sourceName": ["Watch"] * 300 + ["iPhone"] * 300,
+    })
+    for method in ("lttb", "minmax"):
+        sampled = downsample(df, "startDate", "value", 40, method=method, group="sourceName")
+        assert sampled.groupby("sourceName").size().max() <= 40
+        assert set(sampled["sourceName"]) == {"Watch", "iPhone"}
+    with pytest.raises(ValueError):
+        downsample(df, "startDate", "value", 40, method="median")
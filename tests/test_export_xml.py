@@ -0,0 +1,70 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from apple_health import export_xml
+from apple_health.export_xml import read_export_xml
+
+MEMBER = "apple_health_export/export.xml"
+SOURCES = ["Watch", "iPhone", "Ring"]
+
+
+def make_zip(n=60):
+    # Kaynaklar ve uyku evreleri dosyada ilerledikçe çoğalır; parçaların kategori sözlükleri farklı olur
+    rows = ['<?xml version="1.0" encoding="UTF-8"?>', '<HealthData locale="en_US">',
+            ' <ExportDate value="2024-03-01 10:00:00 +0100"/>']
+    stages = ["AsleepCore", "AsleepDeep", "InBed", "Awake"]
+    for i in range(n):
+        day, source, offset = 1 + i % 28, SOURCES[i * len(SOURCES) // n], ["+0100", "-0500"][i % 2]
+        stamp = f"2024-02-{day:02d} 0{i % 10}:00:00 {offset}"
+        rows.append(f' <Record type="HKQuantityTypeIdentifierHeartRate" sourceName="{source}" unit="count/min" '
+                    f'startDate="{stamp}" endDate="{stamp}" value="{60 + i}">')
+        rows.append('  <MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="0"/>')
+        rows.append(' </Record>')
+        stage = stages[i * len(stages) // n]
+        rows.append(f' <Record type="HKCategoryTypeIdentifierSleepAnalysis" sourceName="{source}" '
+                    f'startDate="2024-02-{day:02d} 01:00:00 {offset}" endDate="2024-02-{day:02d} 02:30:00 {offset}" '
+                    f'value="HKCategoryValueSleepAnalysis{stage}"/>')
+        if i % 20 == 0:
+            rows.append(f' <Workout workoutActivityType="HKWorkoutActivityTypeRunning" duration="30" '
+                        f'durationUnit="min" sourceName="{source}" startDate="{stamp}" '
+                        f'endDate="2024-02-{day:02d} 09:30:00 {offset}">')
+            # Mesafe ve enerji yeni iOS sürümlerindeki gibi alt elemanlardadır
+            for stat_type, total, unit in (("ActiveEnergyBurned", 250, "kcal"), ("DistanceWalkingRunning", 5, "km")):
+                rows.append(
+                    f'  <WorkoutStatistics type="HKQuantityTypeIdentifier{stat_type}" sum="{total}" unit="{unit}"/>'
+                )
+            rows.append(' </Workout>')
+    rows.append('</HealthData>')
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        z.writestr(MEMBER, "\n".join(rows))
+    return zipfile.ZipFile(buffer)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 50])
+def test_chunked_read_matches_single_chunk(monkeypatch, chunk_rows):
+    zip_ref = make_zip()
+    expected, _ = read_export_xml(zip_ref, MEMBER)
+    monkeypatch.setattr(export_xml, "CHUNK_ROWS", chunk_rows)
+    frames, stats = read_export_xml(zip_ref, MEMBER)
+    assert sorted(frames) == sorted(expected)
+    for name, df in frames.items():
+        pd.testing.assert_frame_equal(df, expected[name])
+    assert stats["records"] == 120 and stats["workouts"] == 3
+
+
+def test_frames_are_compact():
+    frames, _ = read_export_xml(make_zip(), MEMBER)
+    heart = frames["HeartRate"]
+    assert isinstance(heart["sourceName"].dtype, pd.CategoricalDtype)
+    assert heart["sourceName"].cat.categories.tolist() == sorted(SOURCES)
+    assert heart["sourceName"].cat.codes.is_monotonic_increasing
+    assert heart["value"].dtype == "float32" and heart["day"].dtype == "int32"
+    assert frames["SleepAnalysis"]["sleep_type"].cat.categories[0] == "AsleepDeep"
+    workout = frames["Workout"]
+    assert workout["workoutActivityType"].tolist() == ["Running"] * 3
+    assert workout["totalEnergyBurned"].tolist() == [250] * 3
+    assert workout["totalDistance"].tolist() == [5] * 3
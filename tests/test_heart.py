@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apple_health.heart import MAX_SAMPLE_GAP_SECONDS, RESTING_QUANTILE, HeartRateEngine, daily_heart_rate
+from apple_health.memo import frame_fingerprint
+from apple_health.normalize import NS_PER_DAY
+
+NS_PER_SECOND = 1_000_000_000
+
+
+def random_heart_rate(seed, n=400):
+    # Birkaç güne yayılmış, düzensiz aralıklı ve tekrar eden değerli örnekler
+    rng = np.random.default_rng(seed)
+    start = np.sort(np.datetime64("2024-01-01", "ns").astype(np.int64) + rng.integers(0, 3 * 86400, n) * NS_PER_SECOND)
+    value = rng.integers(45, 180, n).astype(np.float32)
+    value[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({
+        "sourceName": rng.choice(["Watch", "Strap"], n),
+        "startDate": start.view("datetime64[ns]"),
+        "value": value,
+        "day": (start // NS_PER_DAY).astype(np.int32),
+    })
+
+
+def reference(df):
+    # Gün başına doğrudan: örnek süresi bir sonraki örneğe kadardır (en fazla MAX_SAMPLE_GAP_SECONDS, gün
+    # sonunda kesilir); dinlenme nabzı, değerle sıralı birikimli sürenin RESTING_QUANTILE'a ulaştığı değerdir
+    df = df[df["value"].notna()].sort_values("startDate", kind="stable")
+    rows = []
+    for day, group in df.groupby("day"):
+        start = group["startDate"].to_numpy().view("i8")
+        value = group["value"].to_numpy(dtype=np.float64)
+        until = np.append(start[1:], (day + 1) * NS_PER_DAY)
+        duration = np.minimum(until - start, MAX_SAMPLE_GAP_SECONDS * NS_PER_SECOND) / NS_PER_SECOND
+        order = np.argsort(value, kind="stable")
+        cumulative = np.cumsum(duration[order])
+        target = RESTING_QUANTILE * duration.sum()
+        resting = value[order][min(np.searchsorted(cumulative, target, side="left"), len(value) - 1)]
+        rows.append({
+            "day": day,
+            "samples": len(value),
+            "minutes": duration.sum() / 60,
+            "mean_bpm": (value * duration).sum() / duration.sum(),
+            "resting_bpm": resting,
+        })
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_daily_heart_rate_matches_per_day_scan(seed):
+    df = random_heart_rate(seed)
+    result = daily_heart_rate(df)
+    expected = reference(df)
+    assert result["day"].tolist() == expected["day"].tolist()
+    assert result["samples"].tolist() == expected["samples"].tolist()
+    for column in ["minutes", "mean_bpm", "resting_bpm"]:
+        np.testing.assert_allclose(result[column].to_numpy(), expected[column].to_numpy())
+
+
+def test_resting_bpm_weights_by_duration():
+    # İlk örnek toplam sürenin yarısıdır; sayıca az olsa da dinlenme nabzını o belirler
+    start = np.datetime64("2024-01-01T08:00", "ns") + np.array([0, 600, 601, 602, 603], dtype="timedelta64[s]")
+    df = pd.DataFrame({
+        "startDate": start,
+        "value": np.float32([50, 120, 121, 122, 123]),
+        "day": np.int32([19723] * 5),
+    })
+    assert daily_heart_rate(df)["resting_bpm"].tolist() == [50.0]
+
+
+def test_engine_keys_unregistered_frames_by_fingerprint():
+    engine = HeartRateEngine()
+    df = random_heart_rate(0)
+    first = engine.daily(df)
+    # Kayıtsız tablo ilk kullanımda kaydedilir; aynı tablo yeniden taranmaz
+    assert frame_fingerprint(df) is not None
+    scanned = engine.scanned_rows
+    pd.testing.assert_frame_equal(engine.daily(df), first)
+    assert engine.scanned_rows == scanned
+    # Kopya kendi kimliğini alır, parmak izini attrs üzerinden devralmaz
+    copy = df.copy()
+    engine.daily(copy)
+    assert frame_fingerprint(copy) not in (None, frame_fingerprint(df))
+    assert engine.scanned_rows > scanned
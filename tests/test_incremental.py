@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apple_health.incremental import OVERLAP, append_rows, new_rows
+from apple_health.partition import partition_by_source, source_ranges
+
+NS_PER_MINUTE = 60_000_000_000
+NS_PER_DAY = 24 * 60 * NS_PER_MINUTE
+
+
+def samples(minutes, sources, values):
+    start = (np.datetime64("2024-01-01", "m").astype(np.int64) + np.asarray(minutes)) * NS_PER_MINUTE
+    return pd.DataFrame({
+        "sourceName": pd.Categorical(sources),
+        "startDate": start.view("datetime64[ns]"),
+        "endDate": (start + 5 * NS_PER_MINUTE).view("datetime64[ns]"),
+        "value": np.asarray(values, dtype=np.float64),
+        "day": (start // NS_PER_DAY).astype(np.int32),
+    })
+
+
+def random_samples(rng, minutes, names):
+    return samples(minutes, rng.choice(names, len(minutes)), rng.integers(1, 50, len(minutes)))
+
+
+def keys(df):
+    return list(zip(df["sourceName"].astype(str), df["startDate"], df["endDate"], df["value"]))
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_new_rows_skips_known_and_old_rows(seed):
+    rng = np.random.default_rng(seed)
+    minutes = rng.choice(np.arange(0, 60 * 24 * 30), 400, replace=False)
+    old = partition_by_source(random_samples(rng, minutes, ["Watch", "iPhone"]))
+    # Yeni dışa aktarım eski satırları yeniden içerir; ek olarak geç eşitlenmiş ve eşik dışı eski satırlar vardır
+    extra_minutes = rng.choice(np.arange(0, 60 * 24 * 40), 200, replace=False)
+    extra = random_samples(rng, extra_minutes, ["Watch", "iPhone", "Ring"])
+    incoming = partition_by_source(pd.concat([old.astype({"sourceName": str}), extra], ignore_index=True))
+    since = old["startDate"].max() - OVERLAP
+    known = set(keys(old))
+    expected = [row for row, start in zip(keys(incoming), incoming["startDate"]) if start >= since and row not in known]
+    assert keys(new_rows(old, incoming)) == expected
+    assert keys(new_rows(old.iloc[0:0], incoming)) == keys(incoming)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_append_rows_keeps_source_partitions(seed):
+    rng = np.random.default_rng(seed)
+    minutes = rng.choice(np.arange(0, 60 * 24 * 40), 500, replace=False)
+    old = partition_by_source(random_samples(rng, np.sort(minutes[:400]), ["Watch", "iPhone"]))
+    # Yeni satırların bir kısmı mevcut bölümlerin son satırından öncedir; Ring yeni bir kaynaktır
+    rows = random_samples(rng, minutes[400:], ["Watch", "iPhone", "Ring"])
+    frame, aligned = append_rows(old, rows)
+    expected = pd.concat([old, rows.astype({"sourceName": str})], ignore_index=True).astype({"sourceName": str})
+    expected = expected.sort_values(["sourceName", "startDate"], ignore_index=True)
+    assert keys(frame) == keys(expected)
+    assert isinstance(frame["sourceName"].dtype, pd.CategoricalDtype)
+    assert source_ranges(frame) is not None
+    assert frame["day"].tolist() == expected["day"].tolist()
+    assert sorted(keys(aligned)) == sorted(keys(rows))
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apple_health.matrix import lagged_corr, pairwise_corr, rolling_corr
+
+
+def reference(values, max_lag, min_periods):
+    # Gecikme ve çift başına doğrudan: i(t) ~ j(t + lag), yalnızca ikisinin de dolu olduğu günler
+    n, k = values.shape
+    corr = np.full((2 * max_lag + 1, k, k), np.nan)
+    counts = np.zeros((2 * max_lag + 1, k, k), dtype=np.int64)
+    for a, lag in enumerate(range(-max_lag, max_lag + 1)):
+        for i in range(k):
+            for j in range(k):
+                t = np.arange(max(0, -lag), min(n, n - lag))
+                x, y = values[t, i], values[t + lag, j]
+                both = ~np.isnan(x) & ~np.isnan(y)
+                counts[a, i, j] = both.sum()
+                if both.sum() >= min_periods:
+                    corr[a, i, j] = np.corrcoef(x[both], y[both])[0, 1]
+    return corr, counts
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("max_lag", [0, 3, 10])
+def test_lagged_corr_matches_direct_pearson(seed, max_lag):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(40, 3)) * [1, 100, 0.01] + [0, 5000, 70]
+    values[rng.random(values.shape) < 0.25] = np.nan
+    lags, corr, counts = lagged_corr(values, max_lag, min_periods=3)
+    expected, expected_counts = reference(values, max_lag, 3)
+    assert lags.tolist() == list(range(-max_lag, max_lag + 1))
+    np.testing.assert_array_equal(counts, expected_counts)
+    np.testing.assert_allclose(corr, expected, atol=1e-9)
+
+
+def test_lagged_corr_clamps_lag_to_length():
+    values = np.arange(12, dtype=float).reshape(4, 3) ** 2
+    lags, corr, counts = lagged_corr(values, 30)
+    expected, expected_counts = reference(values, 3, 3)
+    assert lags.tolist() == list(range(-3, 4))
+    np.testing.assert_array_equal(counts, expected_counts)
+    np.testing.assert_allclose(corr, expected, atol=1e-9)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_pairwise_corr_matches_pandas(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(60, 4)) * [1, 100, 0.01, 3] + [0, 5000, 70, -2]
+    values[rng.random(values.shape) < 0.3] = np.nan
+    corr, counts = pairwise_corr(values)
+    frame = pd.DataFrame(values)
+    np.testing.assert_allclose(corr, frame.corr(min_periods=2).to_numpy(), atol=1e-9)
+    present = frame.notna().to_numpy().astype(np.int64)
+    np.testing.assert_array_equal(counts, present.T @ present)
+
+
+def test_pairwise_corr_needs_two_shared_days():
+    values = np.array([[1.0, np.nan], [2.0, 5.0], [3.0, np.nan], [4.0, np.nan]])
+    corr, counts = pairwise_corr(values)
+    assert counts.tolist() == [[4, 1], [1, 1]]
+    assert corr[0, 0] == pytest.approx(1.0)
+    assert np.isnan(corr[0, 1]) and np.isnan(corr[1, 1])
+
+
+def rolling_reference(values, window, lag, min_periods):
+    # t ile biten her pencere için doğrudan: i(t) ~ j(t + lag)
+    n, k = values.shape
+    corr = np.full((n, k, k), np.nan)
+    for t in range(window - 1, n):
+        rows = np.arange(t - window + 1, t + 1)
+        for i in range(k):
+            for j in range(k):
+                x = values[rows, i]
+                y = np.array([values[r + lag, j] if 0 <= r + lag < n else np.nan for r in rows])
+                both = ~np.isnan(x) & ~np.isnan(y)
+                if both.sum() >= min_periods:
+                    corr[t, i, j] = np.corrcoef(x[both], y[both])[0, 1]
+    return corr
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("window,lag", [(7, 0), (10, 2), (10, -3)])
+def test_rolling_corr_matches_direct_pearson(seed, window, lag):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(45, 3)) * [1, 100, 0.01] + [0, 5000, 70]
+    values[rng.random(values.shape) < 0.2] = np.nan
+    corr = rolling_corr(values, window, lag=lag)
+    expected = rolling_reference(values, window, lag, max(3, window // 2))
+    np.testing.assert_allclose(corr, expected, atol=1e-7)
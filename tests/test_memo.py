@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from apple_health.memo import ComputeCache, frame_fingerprint, register_frame
+
+
+def test_compute_cache_evicts_least_recently_used_by_bytes():
+    cache = ComputeCache(max_bytes=3000)
+    for key in "abc":
+        cache.put(key, np.zeros(100))
+    assert cache.stats() == {"hits": 0, "misses": 0, "entries": 3, "bytes": 2400}
+    # a yeniden kullanıldı; sınır aşılınca en eski kullanılan b düşer
+    assert cache.get("a") is not None
+    cache.put("d", np.zeros(100))
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in "acd"] == [True, True, True]
+    assert cache.stats() == {"hits": 4, "misses": 1, "entries": 3, "bytes": 2400}
+
+
+def test_compute_cache_replaces_entry_and_keeps_oversized_last():
+    cache = ComputeCache(max_bytes=1000)
+    cache.put("a", np.zeros(50))
+    cache.put("a", np.zeros(100))
+    assert cache.stats()["bytes"] == 800
+    # Sınırı tek başına aşan son değer tutulur, öncekiler düşer
+    cache.put("big", np.zeros(1000))
+    assert cache.stats() == {"hits": 0, "misses": 0, "entries": 1, "bytes": 8000}
+    assert cache.get("big") is not None and cache.get("a") is None
+
+
+def test_memoize_counts_hits_and_keys_registered_frames_by_fingerprint():
+    cache = ComputeCache()
+    calls = []
+
+    @cache.memoize
+    def total(df):
+        calls.append(1)
+        return df[["value"]].sum().to_frame().T
+
+    df = register_frame(pd.DataFrame({"value": [1.0, 2.0]}), "upload")
+    first = total(df)
+    second = total(df)
+    assert len(calls) == 1 and cache.hits == 1 and cache.misses == 1
+    assert first["value"].tolist() == second["value"].tolist() == [3.0]
+    assert first is not second
+    # Sonuç tabloları da parmak iziyle kaydedilir
+    assert frame_fingerprint(second) is not None
+    # Aynı kimlikli yeni sürüm yeniden hesaplanır
+    total(register_frame(pd.DataFrame({"value": [1.0, 2.0, 3.0]}), "upload", 1))
+    assert len(calls) == 2
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from apple_health.normalize import NAT, local_timestamps, parse_apple_dates
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATES = [
+    "2024-01-15 08:30:00 +0300",
+    # Avrupa yaz saati geçişi (31 Mart 02:00 -> 03:00, 27 Ekim 03:00 -> 02:00)
+    "2024-03-31 01:59:59 +0100",
+    "2024-03-31 03:00:00 +0200",
+    "2024-10-27 02:30:00 +0200",
+    "2024-10-27 02:30:00 +0100",
+    # Negatif ve yarım saatlik farklar; ABD yaz saati geçişi
+    "2024-03-10 01:59:00 -0500",
+    "2024-03-10 03:01:00 -0400",
+    "2023-12-31 23:59:59 -0930",
+    "2024-06-01 12:00:00 +0530",
+    "2024-02-29 00:00:00 +0000",
+    # Farkı olmayan metinler
+    "2024-05-05 10:10:10",
+    "2024-05-05T10:10:10",
+    # Çözülemeyen metinler
+    "not a date",
+    "",
+    "2024/05/05 10:10:10 +0000",
+    "2024-05-05 10:1x:10 +0000",
+    # Düzeni doğru ama takvimde olmayan tarih ve saatler
+    "2024-13-45 25:61:00 +0000",
+    "2024-00-10 10:00:00 +0000",
+    "2024-04-31 10:00:00 +0000",
+    "2023-02-29 10:00:00 +0000",
+    "1900-02-29 10:00:00 +0000",
+    "2024-05-00 10:00:00 +0000",
+    "2024-05-05 24:00:00 +0000",
+    "2024-05-05 23:60:00 +0000",
+    "2024-05-05 23:59:60 +0000",
+]
+
+
+def reference(text, home_tz=None):
+    # Satır satır strptime; çözülemeyen metin NaT
+    for fmt, with_offset in (("%Y-%m-%d %H:%M:%S %z", True), ("%Y-%m-%d %H:%M:%S", False),
+                             ("%Y-%m-%dT%H:%M:%S", False)):
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if not with_offset:
+            return np.datetime64(parsed, "ns"), 0, False
+        offset = int(parsed.utcoffset().total_seconds() // 60)
+        if home_tz is not None:
+            parsed = parsed.astimezone(ZoneInfo(home_tz))
+        return np.datetime64(parsed.replace(tzinfo=None), "ns"), offset, True
+    return np.datetime64("NaT", "ns"), 0, False
+
+
+def test_parse_apple_dates_matches_strptime():
+    local, offset, has_offset = parse_apple_dates(pd.Series(DATES))
+    expected = [reference(text) for text in DATES]
+    assert local.tolist() == [NAT if np.isnat(e[0]) else e[0].astype(np.int64) for e in expected]
+    assert offset.tolist() == [e[1] for e in expected]
+    assert has_offset.tolist() == [e[2] for e in expected]
+
+
+def test_parse_apple_dates_rejects_out_of_range_like_to_datetime():
+    dates = pd.Series(["2024-13-45 25:61:00 +0000", "2024-04-31 10:00:00 +0000", "2000-02-29 23:59:59 +0000"])
+    local, _, has_offset = parse_apple_dates(dates)
+    expected = pd.to_datetime(dates, format="%Y-%m-%d %H:%M:%S %z", errors="coerce")
+    assert (local == NAT).tolist() == expected.isna().tolist() == [True, True, False]
+    assert has_offset.tolist() == [False, False, True]
+
+
+@pytest.mark.parametrize("home_tz", [None, "Europe/Berlin", "America/New_York", "Asia/Kolkata"])
+def test_local_timestamps_matches_strptime(home_tz):
+    result, offset = local_timestamps(pd.Series(DATES), home_tz)
+    expected = pd.Series([reference(text, home_tz)[0] for text in DATES], dtype="datetime64[ns]")
+    pd.testing.assert_series_equal(result, expected)
+    assert offset.tolist() == [reference(text)[1] for text in DATES]
+
+
+def test_home_tz_from_environment():
+    # HOME_TZ içe aktarmada okunur; ortam değişkeni ayrı bir süreçte denenir
+    code = (
+        "import pandas as pd; from apple_health.normalize import HOME_TZ, local_timestamps; "
+        f"col = pd.Series({DATES!r}); "
+        "print(HOME_TZ, local_timestamps(col)[0].equals(local_timestamps(col, 'Europe/Berlin')[0]))"
+    )
+    env = dict(os.environ, HEALTH_HOME_TZ="Europe/Berlin")
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["Europe/Berlin", "True"]
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apple_health.partition import partition_by_source, select_rows
+
+SOURCES = ["Ring", "Watch", "iPhone"]
+NS_PER_DAY = 24 * 3_600_000_000_000
+
+
+def random_samples(seed, n=300):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-01-01", "ns").astype(np.int64) + rng.integers(0, 30 * NS_PER_DAY, n)
+    return pd.DataFrame({
+        "sourceName": pd.Categorical(rng.choice(SOURCES, n), categories=SOURCES),
+        "startDate": start.view("datetime64[ns]"),
+        "value": rng.random(n),
+        "day": (start // NS_PER_DAY).astype(np.int32),
+    })
+
+
+def reference(df, sources, date_range):
+    # Maske taraması: kaynak listesinde ve tarih aralığının kapsadığı günlerde olan satırlar
+    mask = np.ones(len(df), dtype=bool)
+    if sources is not None:
+        mask &= df["sourceName"].isin(sources).to_numpy()
+    if date_range is not None:
+        day = df["startDate"].dt.normalize()
+        mask &= ((day >= date_range[0].ceil("D")) & (day <= date_range[1])).to_numpy()
+    return df[mask]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("sources", [None, ["Watch"], ["iPhone", "Ring"], ["Scale"]])
+@pytest.mark.parametrize("date_range", [
+    None,
+    (pd.Timestamp("2024-01-05"), pd.Timestamp("2024-01-12 23:00")),
+    (pd.Timestamp("2024-01-03 12:00"), pd.Timestamp("2024-01-03 18:00")),
+])
+@pytest.mark.parametrize("partitioned", [True, False])
+def test_select_rows_matches_mask_scan(seed, sources, date_range, partitioned):
+    df = random_samples(seed)
+    if partitioned:
+        df = partition_by_source(df)
+    pd.testing.assert_frame_equal(select_rows(df, sources, date_range), reference(df, sources, date_range))
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apple_health.rollup import DAILY_KEYS, HOURLY_KEYS, build_rollup, merge_rollups
+
+
+def random_samples(rng, n, days):
+    return pd.DataFrame({
+        "sourceName": pd.Categorical(rng.choice(["Watch", "iPhone"], n), categories=["Watch", "iPhone"]),
+        "day": rng.integers(days[0], days[1], n).astype(np.int32),
+        "hour": rng.integers(0, 24, n).astype(np.int8),
+        "value": rng.random(n).astype(np.float32) * 100,
+    })
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("keys", [DAILY_KEYS, HOURLY_KEYS])
+def test_merge_rollups_matches_full_rebuild(seed, keys):
+    rng = np.random.default_rng(seed)
+    old = random_samples(rng, 300, (0, 30))
+    # Yeni satırlar hem mevcut günlere hem yeni günlere düşer
+    new = random_samples(rng, 80, (25, 35))
+    merged = merge_rollups(build_rollup(old, keys), build_rollup(new, keys), keys)
+    expected = build_rollup(pd.concat([old, new], ignore_index=True), keys).sort_values(keys, ignore_index=True)
+    pd.testing.assert_frame_equal(merged[expected.columns], expected, check_dtype=False, rtol=1e-6)
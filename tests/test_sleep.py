@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apple_health.normalize import NS_PER_HOUR
+from apple_health.sleep import ASLEEP_STAGES, NIGHT_BOUNDARY_HOUR, SLEEP_PREFIX, SLEEP_STAGES, sleep_nights
+
+NS_PER_MINUTE = NS_PER_HOUR // 60
+BASE = np.datetime64("2024-03-01T18:00", "ns").astype(np.int64)
+
+
+def random_sleep(seed, n=60):
+    # Dakika ızgarasında, kaynaklar arası çakışan aralıklar; bazı etiketler önekli ya da farklı harfli
+    rng = np.random.default_rng(seed)
+    start = BASE + rng.integers(0, 5 * 24 * 60, n) * NS_PER_MINUTE
+    end = start + rng.integers(0, 180, n) * NS_PER_MINUTE
+    labels = SLEEP_STAGES + ["Unknown"]
+    stage = rng.integers(0, len(labels), n)
+    forms = rng.integers(0, 3, n)
+    spelled = [[label, SLEEP_PREFIX + label, label.upper()][form] for label, form in zip(np.take(labels, stage), forms)]
+    return pd.DataFrame({
+        "sourceName": rng.choice(["Watch", "iPhone", "Ring"], n),
+        "sleep_type": spelled,
+        "startDate": start.view("datetime64[ns]"),
+        "endDate": end.view("datetime64[ns]"),
+    }), stage
+
+
+def reference(df, stage):
+    # Gece başına dakika dakika tarama: her dakikaya onu kapsayan en öncelikli evre atanır
+    start = df["startDate"].to_numpy().view("i8")
+    end = df["endDate"].to_numpy().view("i8")
+    night = (start - NIGHT_BOUNDARY_HOUR * NS_PER_HOUR) // (24 * NS_PER_HOUR) + 1
+    keep = (stage < len(SLEEP_STAGES)) & (end > start)
+    rows = []
+    for key in np.unique(night[keep]):
+        minutes = {}
+        for s, e, code in zip(start[keep & (night == key)], end[keep & (night == key)], stage[keep & (night == key)]):
+            for t in range(s, e, NS_PER_MINUTE):
+                minutes[t] = min(minutes.get(t, code), code)
+        times = sorted(minutes)
+        asleep = [t for t in times if minutes[t] < len(ASLEEP_STAGES)]
+        hours = {name: sum(minutes[t] == j for t in times) / 60 for j, name in enumerate(SLEEP_STAGES)}
+        in_bed = len(times) / 60
+        asleep_hours = len(asleep) / 60
+        rows.append({
+            "day": key,
+            "in_bed_hours": in_bed,
+            "asleep_hours": asleep_hours,
+            "bed_start": times[0],
+            "sleep_start": asleep[0] if asleep else None,
+            "sleep_end": asleep[-1] + NS_PER_MINUTE if asleep else None,
+            "latency_minutes": (asleep[0] - times[0]) / NS_PER_MINUTE if asleep else np.nan,
+            "efficiency": asleep_hours / in_bed,
+            **hours,
+        })
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sleep_nights_matches_minute_scan(seed):
+    df, stage = random_sleep(seed)
+    result = sleep_nights(df)
+    expected = reference(df, stage)
+    assert result["day"].tolist() == expected["day"].tolist()
+    assert result["bed_start"].to_numpy().view("i8").tolist() == expected["bed_start"].tolist()
+    slept = expected["sleep_start"].notna().to_numpy()
+    assert result["sleep_start"].notna().tolist() == slept.tolist()
+    assert result["sleep_start"][slept].to_numpy().view("i8").tolist() == expected["sleep_start"][slept].tolist()
+    assert result["sleep_end"][slept].to_numpy().view("i8").tolist() == expected["sleep_end"][slept].tolist()
+    for column in ["in_bed_hours", "asleep_hours", "latency_minutes", "efficiency", *SLEEP_STAGES]:
+        np.testing.assert_allclose(result[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float))
+
+
+def test_sleep_nights_empty():
+    df, _ = random_sleep(0, n=0)
+    assert sleep_nights(df).empty